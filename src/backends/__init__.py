@@ -0,0 +1,51 @@
+"""
+Platform backends for window lookup, input and screen capture.
+
+'win32' drives the real game (pywin32, interception-python, mss). 'fake'
+uses a pretend window and records input instead of sending it, with mss
+capture or, given replay, recorded screenshots, so the reroll engine can
+run headless off Windows. 'sim' is the fake window and input wired to a
+simulated flame window (src.backends.simulator) that reacts to them.
+"""
+import os
+import sys
+from typing import Optional
+
+from src.backends.base import Backends, CaptureBackend, Frame, InputBackend, WindowBackend
+from src.backends.capture import CaptureService, MssCapture, ReplayCapture
+
+# Overrides the platform default, e.g. FLAME_BACKEND=fake on a Linux CI machine
+BACKEND_ENV = 'FLAME_BACKEND'
+
+
+def default_backend_name() -> str:
+    return os.environ.get(BACKEND_ENV) or ('win32' if sys.platform == 'win32' else 'fake')
+
+
+def create_backends(name: Optional[str] = None, replay: Optional[str] = None) -> Backends:
+    """
+    Create the backends by name ('win32', 'fake' or 'sim'). replay is a directory or
+    list of screenshots to capture from instead of the screen; the fake
+    backend then shows the next screenshot after every click.
+    """
+    name = name or default_backend_name()
+    if name == 'sim':
+        from src.backends.simulator import create_simulator_backends
+        return create_simulator_backends()
+
+    capture = ReplayCapture(replay) if replay else MssCapture()
+
+    if name == 'win32':
+        # Only importable on Windows
+        from src.backends.win32 import InterceptionInputBackend, Win32WindowBackend
+        return Backends(Win32WindowBackend(), InterceptionInputBackend(), capture, name)
+
+    if name == 'fake':
+        from src.backends.fake import FakeInputBackend, FakeWindowBackend
+        window = FakeWindowBackend()
+        input_backend = FakeInputBackend()
+        if isinstance(capture, ReplayCapture):
+            input_backend.add_listener(lambda event: event[0] == 'click' and capture.advance())
+        return Backends(window, input_backend, capture, name)
+
+    raise ValueError(f"Unknown backend {name!r}, expected 'win32', 'fake' or 'sim'")
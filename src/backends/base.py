@@ -0,0 +1,147 @@
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    """
+    BGRA screen grab with the attributes of an mss ScreenShot this repo uses
+    (raw, width, height, size, rgb), so fake and replay captures can stand in
+    for mss anywhere.
+    """
+
+    __slots__ = ('raw', 'width', 'height')
+
+    def __init__(self, raw, width: int, height: int):
+        self.raw = raw
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_array(cls, pixels: np.ndarray) -> 'Frame':
+        """Frame from an RGB(A) array"""
+        height, width = pixels.shape[:2]
+        bgra = np.empty((height, width, 4), dtype=np.uint8)
+        bgra[..., :3] = pixels[..., 2::-1]
+        bgra[..., 3] = 255
+        return cls(bytearray(bgra.tobytes()), width, height)
+
+    @classmethod
+    def from_image(cls, image) -> 'Frame':
+        """Frame from a PIL image"""
+        return cls.from_array(np.asarray(image.convert('RGB')))
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def rgb(self) -> bytes:
+        return frame_array(self)[..., 2::-1].tobytes()
+
+
+def frame_array(shot) -> np.ndarray:
+    """
+    BGRA array over a grab's raw buffer (mss ScreenShot or Frame), without
+    copying. Arrays with 4 channels are BGRA grabs everywhere in this repo,
+    arrays with 3 channels are RGB.
+    """
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+def to_image(pixels) -> Image.Image:
+    """RGB PIL image of a grab or BGRA array, for the places that need PIL (previews, image files)"""
+    if not isinstance(pixels, np.ndarray):
+        pixels = frame_array(pixels)
+    height, width = pixels.shape[:2]
+    # Decoded straight from BGRA, one pass
+    return Image.frombuffer('RGB', (width, height), np.ascontiguousarray(pixels), 'raw', 'BGRX', 0, 1)
+
+
+class WindowBackend:
+    """Finds the game window and reports or changes its geometry and focus"""
+
+    def get_window(self, window_name: str):
+        """Handle of the first visible window whose title contains window_name, or None"""
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd) -> Optional[Dict]:
+        """{'window': rect, 'client': rect} in screen coordinates, or None"""
+        raise NotImplementedError
+
+    def get_outer_rect(self, hwnd):
+        """Window rectangle, or None if the handle no longer refers to a window. Cheap, no logging."""
+        raise NotImplementedError
+
+    def get_foreground(self):
+        """Handle of the focused window"""
+        raise NotImplementedError
+
+    def is_minimized(self, hwnd) -> bool:
+        raise NotImplementedError
+
+    def set_foreground(self, hwnd) -> bool:
+        """Restore the window if minimized and focus it"""
+        raise NotImplementedError
+
+
+class InputBackend:
+    """Sends mouse and keyboard input to the game"""
+
+    def capture_devices(self):
+        """Prepare the input devices; called once when the UI starts"""
+
+    def get_cursor_pos(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def move_to(self, x: int, y: int):
+        raise NotImplementedError
+
+    def click(self, x: int, y: int, button: str = 'left', delay: float = 0.0):
+        """Move to (x, y) and click, waiting delay seconds between press and release"""
+        raise NotImplementedError
+
+    def key_down(self, key: str):
+        raise NotImplementedError
+
+    def key_up(self, key: str):
+        raise NotImplementedError
+
+    def watch_key(self, key: str, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call callback, from a background thread, each time the user presses key
+        (e.g. 'esc'). Returns a function that stops watching.
+        """
+        raise NotImplementedError
+
+
+class CaptureBackend:
+    """Grabs screen regions as BGRA frames"""
+
+    # Whether a handle may only be used by the thread that created it (mss on Windows)
+    thread_bound = False
+
+    def grab(self, monitor: Dict):
+        """Grab an mss style monitor dict ({'left', 'top', 'width', 'height'})"""
+        raise NotImplementedError
+
+    def grab_array(self, monitor: Dict) -> np.ndarray:
+        """Grab as a BGRA array over the grab's own buffer"""
+        return frame_array(self.grab(monitor))
+
+    def close(self):
+        """Release the capture handle"""
+
+
+class Backends:
+    """The window, input and capture backends the controller and engine use"""
+
+    def __init__(self, window: WindowBackend, input: InputBackend, capture: CaptureBackend, name: str = ''):
+        self.window = window
+        self.input = input
+        self.capture = capture
+        self.name = name
+
+    def close(self):
+        self.capture.close()
@@ -0,0 +1,198 @@
+import glob
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from src.backends.base import CaptureBackend, Frame, frame_array
+
+IMAGE_PATTERNS = ('*.png', '*.bmp', '*.jpg', '*.jpeg', '*.npy')
+
+
+class MssCapture(CaptureBackend):
+    """
+    Screen capture with mss. The handle is created on first use; mss handles
+    are bound to the thread that created them on Windows, so an instance
+    should be used from one thread (CaptureService keeps one per thread).
+    """
+
+    thread_bound = True
+
+    def __init__(self):
+        self.sct = None
+
+    def grab(self, monitor: Dict):
+        if self.sct is None:
+            import mss
+            self.sct = mss.mss()
+        return self.sct.grab(monitor)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class CaptureService(CaptureBackend):
+    """
+    Long-lived capture shared by the reroll engine, its polling threads and
+    the UI. Handles stay open between grabs, so mss keeps its device context,
+    bitmap and pixel buffer instead of creating them for every capture.
+    Thread-bound backends get one handle per thread, created on the thread's
+    first grab and kept until the thread ends; other backends are shared.
+    Every grab is timed; stats() reports the latency.
+
+    Grabs are not written into reused output buffers: the archiver and the
+    debug sink hold zero-copy views of a grab while later grabs are taken,
+    so each grab keeps the buffer mss allocated for it.
+    """
+
+    def __init__(self, capture: Optional[CaptureBackend] = None, window: int = 256):
+        self.capture = capture if capture is not None else MssCapture()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Handle per thread for thread-bound backends
+        self._handles = {}
+        # Latency of the last `window` grabs, in seconds
+        self._latencies = deque(maxlen=window)
+        self.grabs = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    @classmethod
+    def wrap(cls, capture: Optional[CaptureBackend]) -> 'CaptureService':
+        """The capture itself if it already is a service, otherwise a service around it"""
+        return capture if isinstance(capture, cls) else cls(capture)
+
+    def _handle(self) -> CaptureBackend:
+        if not self.capture.thread_bound:
+            return self.capture
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            with self._lock:
+                # Handles of finished threads (e.g. an earlier run's worker) are released. The
+                # wrapped instance is closed too, so it rebuilds its handle on the next thread
+                for thread in [t for t in self._handles if not t.is_alive()]:
+                    self._handles.pop(thread).close()
+                # The wrapped instance goes to the first thread that grabs
+                in_use = any(h is self.capture for h in self._handles.values())
+                handle = type(self.capture)() if in_use else self.capture
+                self._handles[threading.current_thread()] = handle
+            self._local.handle = handle
+        return handle
+
+    def grab(self, monitor: Dict):
+        handle = self._handle()
+        start = time.perf_counter()
+        shot = handle.grab(monitor)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.grabs += 1
+            self._total += elapsed
+            self._max = max(self._max, elapsed)
+        return shot
+
+    def stats(self) -> Dict:
+        """Grab count and latency (ms): mean and max over all grabs, p50/p95 over the recent ones"""
+        with self._lock:
+            recent = sorted(self._latencies)
+            grabs, total, longest = self.grabs, self._total, self._max
+            handles = len(self._handles) or 1
+        if not grabs:
+            return {'grabs': 0, 'handles': handles}
+        return {
+            'grabs': grabs,
+            'handles': handles,
+            'mean_ms': total * 1000.0 / grabs,
+            'p50_ms': recent[len(recent) // 2] * 1000.0,
+            'p95_ms': recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000.0,
+            'max_ms': longest * 1000.0,
+        }
+
+    def close(self):
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles = {}
+            self._local = threading.local()
+        for handle in handles:
+            if handle is not self.capture:
+                handle.close()
+        self.capture.close()
+
+
+def load_frame(path: str) -> Frame:
+    """Load a screenshot file (image or .npy RGB array) as a Frame"""
+    if path.endswith('.npy'):
+        return Frame.from_array(np.load(path))
+    with Image.open(path) as image:
+        return Frame.from_image(image)
+
+
+class ReplayCapture(CaptureBackend):
+    """
+    Capture that replays recorded screenshots instead of the screen. Frames
+    are treated as the whole screen: a grab returns the monitor's area when it
+    lies inside the frame and the whole frame otherwise, so result crops such
+    as test_screenshots/ can be replayed with any capture region.
+    The current frame only changes on advance(), e.g. when a fake click lands.
+    """
+
+    def __init__(self, source: Union[str, Sequence[str]], loop: bool = True):
+        if isinstance(source, str):
+            paths = []
+            for pattern in IMAGE_PATTERNS:
+                paths.extend(glob.glob(os.path.join(source, pattern)))
+            paths.sort()
+        else:
+            paths = list(source)
+        if not paths:
+            raise ValueError(f"No screenshots to replay in {source!r}")
+
+        self.paths: List[str] = paths
+        self.loop = loop
+        self.index = 0
+        self.grabs = 0
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @property
+    def current_path(self) -> str:
+        return self.paths[self.index]
+
+    def _frame(self, index: int) -> Frame:
+        frame = self._frames.get(index)
+        if frame is None:
+            frame = self._frames[index] = load_frame(self.paths[index])
+        return frame
+
+    def advance(self) -> bool:
+        """Move to the next frame. Returns False at the end when not looping."""
+        with self._lock:
+            if self.index + 1 < len(self.paths):
+                self.index += 1
+            elif self.loop:
+                self.index = 0
+            else:
+                return False
+            return True
+
+    def grab(self, monitor: Optional[Dict] = None) -> Frame:
+        with self._lock:
+            frame = self._frame(self.index)
+            self.grabs += 1
+        if not monitor:
+            return frame
+
+        left, top = monitor['left'], monitor['top']
+        width, height = monitor['width'], monitor['height']
+        if left < 0 or top < 0 or left + width > frame.width or top + height > frame.height:
+            return frame
+        if (width, height) == frame.size:
+            return frame
+        crop = np.ascontiguousarray(frame_array(frame)[top:top + height, left:left + width])
+        return Frame(bytearray(crop.tobytes()), width, height)
@@ -0,0 +1,135 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.backends.base import InputBackend, WindowBackend
+
+
+class FakeWindowBackend(WindowBackend):
+    """
+    A single pretend game window with a fixed client area. move(), resize()
+    and destroy() change it the way the real window would, for exercising
+    window tracking.
+    """
+
+    def __init__(self, client_rect: Tuple[int, int, int, int] = (8, 31, 1374, 799), title: str = "MapleStory",
+                 border: Tuple[int, int, int, int] = (8, 31, 8, 8)):
+        self.title = title
+        self.border = border
+        self.handle = 1
+        self.client = tuple(client_rect)
+        self.foreground = None
+        self.minimized = False
+        self.lookups = 0
+
+    @property
+    def window(self) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = self.client
+        return (left - self.border[0], top - self.border[1], right + self.border[2], bottom + self.border[3])
+
+    def move(self, dx: int, dy: int):
+        left, top, right, bottom = self.client
+        self.client = (left + dx, top + dy, right + dx, bottom + dy)
+
+    def resize(self, width: int, height: int):
+        left, top = self.client[:2]
+        self.client = (left, top, left + width, top + height)
+
+    def destroy(self, reopen: bool = True):
+        """Close the window; with reopen a new one (new handle) appears at the same place"""
+        self.handle = self.handle + 1 if reopen else None
+
+    def get_window(self, window_name):
+        self.lookups += 1
+        if self.handle is not None and window_name.lower() in self.title.lower():
+            return self.handle
+        return None
+
+    def get_window_rect(self, hwnd):
+        if hwnd is None or hwnd != self.handle:
+            return None
+        return {'window': self.window, 'client': self.client}
+
+    def get_outer_rect(self, hwnd):
+        if hwnd is None or hwnd != self.handle:
+            return None
+        return self.window
+
+    def get_foreground(self):
+        return self.foreground
+
+    def is_minimized(self, hwnd):
+        return self.minimized
+
+    def set_foreground(self, hwnd):
+        if hwnd is None or hwnd != self.handle:
+            return False
+        self.minimized = False
+        self.foreground = hwnd
+        return True
+
+
+class FakeInputBackend(InputBackend):
+    """
+    Records input instead of sending it. Every event is appended to events as
+    a tuple ('move', x, y), ('click', x, y, button) or ('key_down'/'key_up', key)
+    and passed to the listeners, which is how a simulated game reacts to it.
+    press() stands in for the user pressing a key that is being watched.
+    """
+
+    def __init__(self, record: bool = True):
+        self.cursor = (0, 0)
+        self.record = record
+        self.events: List[Tuple] = []
+        self.listeners: List[Callable[[Tuple], None]] = []
+        self.watchers: Dict[str, List[Callable[[], None]]] = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Tuple], None]):
+        self.listeners.append(listener)
+
+    def _emit(self, event: Tuple):
+        with self._lock:
+            if self.record:
+                self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+
+    def count(self, kind: str, key: Optional[str] = None) -> int:
+        """Number of recorded events of a kind (and key for key events)"""
+        return sum(1 for event in self.events if event[0] == kind and (key is None or event[1] == key))
+
+    def get_cursor_pos(self):
+        return self.cursor
+
+    def move_to(self, x, y):
+        self.cursor = (int(x), int(y))
+        self._emit(('move', self.cursor[0], self.cursor[1]))
+
+    def click(self, x, y, button='left', delay=0.0):
+        self.cursor = (int(x), int(y))
+        self._emit(('click', self.cursor[0], self.cursor[1], button))
+
+    def key_down(self, key):
+        self._emit(('key_down', key))
+
+    def key_up(self, key):
+        self._emit(('key_up', key))
+
+    def watch_key(self, key, callback):
+        with self._lock:
+            self.watchers.setdefault(key, []).append(callback)
+
+        def stop():
+            with self._lock:
+                if callback in self.watchers.get(key, []):
+                    self.watchers[key].remove(callback)
+
+        return stop
+
+    def press(self, key: str):
+        """Simulate the user pressing key; runs the watchers on a new thread like the real hook"""
+        with self._lock:
+            callbacks = list(self.watchers.get(key, []))
+        thread = threading.Thread(target=lambda: [callback() for callback in callbacks], daemon=True)
+        thread.start()
+        return thread
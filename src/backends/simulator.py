@@ -0,0 +1,273 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from src.backends.base import Backends, CaptureBackend, Frame
+from src.utils.synthetic_flames import WINDOW_SIZE, PANEL_BOX, FlameRenderer, load_font, random_flame
+from src.utils.ui_state_detector import DEFAULT_ASSETS_DIR, STATE_TEMPLATES
+
+# Simulator phases
+IDLE = 'idle'                  # result and reroll button shown, waiting for a click
+OPENING = 'opening'            # confirmation dialog about to appear
+CONFIRMATION = 'confirmation'  # OK / Cancel dialog up, waiting for Enter
+ANIMATING = 'animating'        # flame animation before the new result
+
+BACKGROUND_COLOR = (40, 44, 52)
+DIALOG_COLOR = (238, 238, 238)
+DIALOG_BORDER_COLOR = (90, 90, 90)
+DIALOG_TEXT_COLOR = (30, 30, 30)
+DIALOG_SIZE = (240, 90)
+# Dialog top, above the flame window so it never covers the result
+DIALOG_TOP = 60
+# Flame window top and the gap between it and the reroll button
+FLAME_TOP = 200
+BUTTON_GAP = 6
+
+# Frame rate of the flame animation
+ANIMATION_FPS = 20
+
+
+def _bgra(pixels: np.ndarray) -> np.ndarray:
+    """BGRA copy of an RGB array"""
+    height, width = pixels.shape[:2]
+    bgra = np.empty((height, width, 4), dtype=np.uint8)
+    bgra[..., :3] = pixels[..., 2::-1]
+    bgra[..., 3] = 255
+    return bgra
+
+
+def _load_asset(assets_dir: str, state: str) -> Image.Image:
+    return Image.open(os.path.join(assets_dir, STATE_TEMPLATES[state])).convert('RGBA')
+
+
+class GameSimulator:
+    """
+    Stand-in for the game client's flame window. It shows a synthetic result
+    with the "Use one more time" button and reacts to input like the game:
+    a click on the button opens the confirmation dialog after dialog_latency,
+    Enter confirms it (twice), then the flame animation plays over the cleared
+    result window for animation_latency and a new random result is shown.
+    Input that arrives while the game is not ready for it is dropped and
+    counted in `ignored`.
+
+    Coordinates are relative to the client area. Time comes from clock, so
+    tests can step it by hand.
+    """
+
+    def __init__(self, client_size: Tuple[int, int] = (1366, 768), dialog_latency: float = 0.15,
+                 animation_latency: float = 0.6, seed: Optional[int] = None, assets_dir: str = DEFAULT_ASSETS_DIR,
+                 renderer: Optional[FlameRenderer] = None, clock: Callable[[], float] = time.perf_counter):
+        self.client_size = tuple(client_size)
+        self.dialog_latency = dialog_latency
+        self.animation_latency = animation_latency
+        self.clock = clock
+        self.rng = np.random.default_rng(seed)
+        self.renderer = renderer if renderer is not None else FlameRenderer()
+
+        width, height = self.client_size
+        self.flame_box = ((width - WINDOW_SIZE[0]) // 2, FLAME_TOP,
+                          (width - WINDOW_SIZE[0]) // 2 + WINDOW_SIZE[0], FLAME_TOP + WINDOW_SIZE[1])
+
+        self._result_header = _load_asset(assets_dir, 'result')
+        button = _load_asset(assets_dir, 'reroll')
+        left = (width - button.width) // 2
+        top = self.flame_box[3] + BUTTON_GAP
+        self.button_box = (left, top, left + button.width, top + button.height)
+        self._base = self._draw_base(button)
+        self._dialog = self._draw_dialog(_load_asset(assets_dir, 'confirmation'))
+        left = (width - DIALOG_SIZE[0]) // 2
+        self.dialog_box = (left, DIALOG_TOP, left + DIALOG_SIZE[0], DIALOG_TOP + DIALOG_SIZE[1])
+        self._blank_crop = self._render_crop({'stats': {}}, header=False)
+
+        self.phase = IDLE
+        # Dialogs confirmed in the current roll
+        self.confirmed = 0
+        # When the pending dialog appears or the animation ends
+        self._due = None
+        self._animation_start = None
+
+        self.current = random_flame(self.rng)
+        self._crop = self._render_crop(self.current)
+        self.rolls = 0
+        self.ignored = 0
+        # Clock times at which each new result was shown
+        self.result_times = []
+
+        # Composed screen and the view it shows; recomposed only when the view changes
+        self._screen = None
+        self._view = None
+        self._lock = threading.RLock()
+
+    def _draw_base(self, button: Image.Image) -> np.ndarray:
+        base = Image.new('RGBA', self.client_size, BACKGROUND_COLOR + (255,))
+        base.alpha_composite(button, self.button_box[:2])
+        return _bgra(np.asarray(base.convert('RGB')))
+
+    def _draw_dialog(self, buttons: Image.Image) -> np.ndarray:
+        dialog = Image.new('RGBA', DIALOG_SIZE, DIALOG_COLOR + (255,))
+        draw = ImageDraw.Draw(dialog)
+        draw.rectangle((0, 0, DIALOG_SIZE[0] - 1, DIALOG_SIZE[1] - 1), outline=DIALOG_BORDER_COLOR)
+        draw.text((14, 16), "Use the Flame on this item?", fill=DIALOG_TEXT_COLOR, font=load_font(size=12))
+        dialog.alpha_composite(buttons, ((DIALOG_SIZE[0] - buttons.width) // 2, DIALOG_SIZE[1] - buttons.height - 10))
+        return _bgra(np.asarray(dialog.convert('RGB')))
+
+    def _render_crop(self, label: Dict, header: bool = True) -> np.ndarray:
+        """Flame window with a result, the RESULT header from the assets over its title bar"""
+        crop = self.renderer.render(label).convert('RGBA')
+        if header:
+            crop.alpha_composite(self._result_header, (PANEL_BOX[0], PANEL_BOX[1] - self._result_header.height))
+        return _bgra(np.asarray(crop.convert('RGB')))
+
+    def settings_layout(self) -> Dict:
+        """reroll_position and capture_region (flame_settings.json format) that fit this client"""
+        width, height = self.client_size
+        left, top, right, bottom = self.flame_box
+        x = (self.button_box[0] + self.button_box[2]) / 2
+        y = (self.button_box[1] + self.button_box[3]) / 2
+        # Half a pixel in, so converting back to pixels lands on the same pixel
+        return {
+            'reroll_position': {'x': (x + 0.5) / width, 'y': (y + 0.5) / height},
+            'capture_region': {'left': (left + 0.5) / width, 'top': (top + 0.5) / height,
+                               'right': (right + 0.5) / width, 'bottom': (bottom + 0.5) / height},
+        }
+
+    def _update(self, now: float):
+        """Apply the transitions that are due"""
+        if self.phase == OPENING and now >= self._due:
+            self.phase = CONFIRMATION
+        elif self.phase == ANIMATING and now >= self._due:
+            self.current = random_flame(self.rng)
+            self._crop = self._render_crop(self.current)
+            self.rolls += 1
+            self.result_times.append(now)
+            self.phase = IDLE
+
+    def state(self) -> str:
+        with self._lock:
+            self._update(self.clock())
+            return self.phase
+
+    def click(self, x: int, y: int) -> bool:
+        """Click in client coordinates. Returns whether the game reacted."""
+        with self._lock:
+            now = self.clock()
+            self._update(now)
+            left, top, right, bottom = self.button_box
+            if self.phase != IDLE or not (left <= x < right and top <= y < bottom):
+                self.ignored += 1
+                return False
+            self.phase = OPENING
+            self.confirmed = 0
+            self._due = now + self.dialog_latency
+            return True
+
+    def press(self, key: str) -> bool:
+        """Key press. Enter confirms the dialog when it is up. Returns whether the game reacted."""
+        with self._lock:
+            now = self.clock()
+            self._update(now)
+            if key != 'enter' or self.phase != CONFIRMATION:
+                self.ignored += 1
+                return False
+            self.confirmed += 1
+            if self.confirmed < 2:
+                # The second confirmation comes up after the first
+                self.phase = OPENING
+                self._due = now + self.dialog_latency
+            else:
+                self.phase = ANIMATING
+                self._animation_start = now
+                self._due = now + self.animation_latency
+            return True
+
+    def handle_input(self, event: Tuple, origin: Tuple[int, int] = (0, 0)):
+        """React to a FakeInputBackend event given in screen coordinates; origin is the client's top left"""
+        if event[0] == 'click':
+            self.click(event[1] - origin[0], event[2] - origin[1])
+        elif event[0] == 'key_down':
+            self.press(event[1])
+
+    def screen(self) -> np.ndarray:
+        """The client area as a BGRA array, shared and read-only"""
+        with self._lock:
+            now = self.clock()
+            self._update(now)
+            frame = None
+            if self.phase == ANIMATING:
+                frame = int((now - self._animation_start) * ANIMATION_FPS)
+            view = (self.phase, self.rolls, frame)
+            if view != self._view:
+                self._screen = self._compose(frame)
+                self._view = view
+            return self._screen
+
+    def _compose(self, animation_frame: Optional[int]) -> np.ndarray:
+        screen = self._base.copy()
+        left, top, right, bottom = self.flame_box
+        if animation_frame is None:
+            screen[top:bottom, left:right] = self._crop
+        else:
+            # The result and its header are cleared while the flame flickers over the item
+            screen[top:bottom, left:right] = self._blank_crop
+            glow = 120 + 100 * (animation_frame % 2)
+            screen[top + 4:top + 60, left + 4:right - 4, :3] = (40, glow // 2, glow)
+        if self.phase == CONFIRMATION:
+            left, top, right, bottom = self.dialog_box
+            screen[top:bottom, left:right] = self._dialog
+        screen.flags.writeable = False
+        return screen
+
+    def stats(self) -> Dict:
+        """Rolls shown so far and the rate they were shown at"""
+        with self._lock:
+            times = list(self.result_times)
+            rolls, ignored = self.rolls, self.ignored
+        rate = None
+        if len(times) >= 2 and times[-1] > times[0]:
+            rate = (len(times) - 1) / (times[-1] - times[0]) * 60
+        return {'rolls': rolls, 'ignored_inputs': ignored, 'rolls_per_minute': rate}
+
+
+class SimulatorCapture(CaptureBackend):
+    """Grabs from a GameSimulator's screen, placed at the fake window's client area"""
+
+    def __init__(self, simulator: GameSimulator, window):
+        self.simulator = simulator
+        self.window = window
+        self.grabs = 0
+
+    def grab(self, monitor: Dict) -> Frame:
+        screen = self.simulator.screen()
+        self.grabs += 1
+        screen_height, screen_width = screen.shape[:2]
+        left = monitor['left'] - self.window.client[0]
+        top = monitor['top'] - self.window.client[1]
+        width, height = monitor['width'], monitor['height']
+
+        if left >= 0 and top >= 0 and left + width <= screen_width and top + height <= screen_height:
+            pixels = screen[top:top + height, left:left + width]
+        else:
+            # Partly outside the client: the rest of the screen is black
+            pixels = np.zeros((height, width, 4), dtype=np.uint8)
+            pixels[..., 3] = 255
+            x0, y0 = max(left, 0), max(top, 0)
+            x1, y1 = min(left + width, screen_width), min(top + height, screen_height)
+            if x0 < x1 and y0 < y1:
+                pixels[y0 - top:y1 - top, x0 - left:x1 - left] = screen[y0:y1, x0:x1]
+        return Frame(bytearray(pixels.tobytes()), width, height)
+
+
+def create_simulator_backends(simulator: Optional[GameSimulator] = None) -> Backends:
+    """Fake window and input backends wired to a GameSimulator, with capture from its screen"""
+    from src.backends.fake import FakeInputBackend, FakeWindowBackend
+
+    simulator = simulator if simulator is not None else GameSimulator()
+    width, height = simulator.client_size
+    window = FakeWindowBackend(client_rect=(8, 31, 8 + width, 31 + height))
+    input_backend = FakeInputBackend()
+    input_backend.add_listener(lambda event: simulator.handle_input(event, window.client[:2]))
+    return Backends(window, input_backend, SimulatorCapture(simulator, window), 'sim')
@@ -0,0 +1,156 @@
+import logging
+import threading
+
+import interception
+import win32api
+import win32con
+import win32gui
+
+from src.backends.base import InputBackend, WindowBackend
+
+logger = logging.getLogger(__name__)
+
+# Keyboard scan codes of the keys watch_key() accepts
+SCAN_CODES = {'esc': 0x01, 'f12': 0x58}
+
+
+class Win32WindowBackend(WindowBackend):
+    """Window lookup, geometry and focus through the Win32 API"""
+
+    def __init__(self):
+        self.windows = {}
+        
+    def get_window(self, window_name):
+        """Find a window by name"""
+        try:
+            def callback(hwnd, windows):
+                if win32gui.IsWindowVisible(hwnd):
+                    title = win32gui.GetWindowText(hwnd)
+                    if window_name.lower() in title.lower():
+                        windows.append(hwnd)
+                return True
+                
+            windows = []
+            win32gui.EnumWindows(callback, windows)
+            
+            if windows:
+                logger.debug("Found window %r: handle %s", window_name, windows[0])
+                return windows[0]
+            else:
+                logger.debug("Window %r not found", window_name)
+                return None
+                
+        except Exception as e:
+            logger.warning("Error finding window: %s", e)
+            return None
+        
+    def get_window_rect(self, hwnd):
+        """Get the window rectangle"""
+        try:
+            # Get the window rectangle
+            window_rect = win32gui.GetWindowRect(hwnd)
+            
+            # Get the client rectangle
+            client_rect = win32gui.GetClientRect(hwnd)
+            
+            # Convert client rect to screen coordinates
+            client_left, client_top = win32gui.ClientToScreen(hwnd, (client_rect[0], client_rect[1]))
+            client_right, client_bottom = win32gui.ClientToScreen(hwnd, (client_rect[2], client_rect[3]))
+            
+            # Create the window info dictionary
+            window_info = {
+                'window': window_rect,
+                'client': (client_left, client_top, client_right, client_bottom)
+            }
+            
+            logger.debug("Window rect of %s: %s", hwnd, window_info)
+            return window_info
+            
+        except Exception as e:
+            logger.warning("Error getting window rect: %s", e)
+            return None
+            
+    def get_outer_rect(self, hwnd):
+        """Window rectangle, or None if the handle no longer refers to a window. Cheap, no logging."""
+        try:
+            if not win32gui.IsWindow(hwnd):
+                return None
+            return win32gui.GetWindowRect(hwnd)
+        except Exception:
+            return None
+            
+    def get_foreground(self):
+        """Handle of the focused window"""
+        return win32gui.GetForegroundWindow()
+        
+    def is_minimized(self, hwnd):
+        """Whether the window is minimized"""
+        return bool(win32gui.IsIconic(hwnd))
+        
+    def set_foreground(self, hwnd):
+        """Bring window to foreground"""
+        if not hwnd:
+            return False
+            
+        try:
+            # Restore if minimized
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+                
+            # Bring to foreground
+            win32gui.SetForegroundWindow(hwnd)
+            return True
+        except Exception as e:
+            logger.warning("Error setting foreground window: %s", e)
+            return False
+
+
+class InterceptionInputBackend(InputBackend):
+    """Driver level mouse and keyboard input with interception-python"""
+
+    def capture_devices(self):
+        interception.auto_capture_devices(keyboard=True, mouse=True)
+
+    def get_cursor_pos(self):
+        return win32api.GetCursorPos()
+
+    def move_to(self, x, y):
+        interception.move_to(int(x), int(y))
+
+    def click(self, x, y, button='left', delay=0.0):
+        interception.click(int(x), int(y), button=button, delay=delay)
+
+    def key_down(self, key):
+        interception.key_down(key)
+
+    def key_up(self, key):
+        interception.key_up(key)
+
+    def watch_key(self, key, callback):
+        code = SCAN_CODES[key]
+        stopped = threading.Event()
+
+        def watch():
+            # A second context filtering key downs; every stroke it receives is
+            # sent on so the game and the rest of Windows still get the keys
+            context = interception.Interception()
+            context.set_filter(context.is_keyboard, interception.FilterKeyFlag.FILTER_KEY_DOWN)
+            try:
+                while not stopped.is_set():
+                    device = context.await_input(100)
+                    if device is None:
+                        continue
+                    stroke = context.receive(device)
+                    if stroke is None:
+                        continue
+                    context.send(device, stroke)
+                    if stroke.code == code:
+                        logger.debug("%s pressed", key)
+                        callback()
+            except Exception:
+                logger.exception("Error watching the %s key", key)
+            finally:
+                context.destroy()
+
+        threading.Thread(target=watch, name=f"watch-{key}", daemon=True).start()
+        return stopped.set
@@ -0,0 +1,468 @@
+import logging
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.backends.base import frame_array
+from src.utils.debug_sink import DebugSink
+from src.utils.delay_tuner import DelayTuner
+from src.utils.flame_result import FlameResult
+from src.utils.frame_watcher import FrameWatcher
+from src.utils.roll_history import DEFAULT_DB_PATH, RollHistory
+from src.utils.screenshot_archiver import ScreenshotArchiver
+from src.utils.stop_condition import StopCondition
+from src.utils.timing import StageTimer, format_timings
+from src.utils.ui_state_detector import UIStateDetector
+
+logger = logging.getLogger(__name__)
+
+# Engine states reported to the UI
+IDLE = 'idle'
+RUNNING = 'running'
+PAUSED = 'paused'
+STOPPING = 'stopping'
+
+
+class RerollEngine:
+    """
+    Runs the flame reroll loop on its own worker thread, independent of the UI.
+    Progress is posted as event dicts to `events`; the UI drains the queue from
+    its own event loop. Settings use the same layout as flame_settings.json.
+
+    Each roll is pipelined: while roll N is being read, its screenshot is
+    saved by the archiver and the cursor is put back on the reroll button on
+    a side lane, so only the keep/reroll decision gates the input of roll N+1.
+    """
+
+    def __init__(self, controller, backends=None):
+        self.controller = controller
+        # Window, input and capture backends (see src.backends), the controller's by default
+        self.backends = backends if backends is not None else getattr(controller, 'backends', None)
+        self.events = queue.Queue()
+
+        capture = self.backends.capture if self.backends is not None else None
+        # Polls the result region to detect when a new flame result is shown
+        self.frame_watcher = FrameWatcher(capture=capture)
+        # Matches the dialog templates so each input is sent as soon as its dialog is up
+        self.ui_state_detector = UIStateDetector(capture=capture)
+
+        # Per-stage durations of every roll, down into the flame processor's OCR steps
+        self.timer = StageTimer()
+        processor = getattr(controller, 'flame_processor', None)
+        if hasattr(processor, 'timer'):
+            processor.timer = self.timer
+        # Saves screenshots on its own writer thread, configured for each run
+        self.archiver = None
+        self.last_image_path = None
+        # Keeps the OCR pipeline images of sampled or failed rolls when enabled in the settings
+        self.debug_sink = None
+        # Every parsed roll is appended to the roll history database
+        self.history = None
+        # Learns the action and parse delays when they are adaptive
+        self.delay_tuner = None
+        # Dialog and result waits of the current roll, once its inputs were sent
+        self.last_waits = None
+        # Side lane that runs next to OCR, created for each run
+        self._input_lane = None
+        # Pending cursor pre-move for the next roll
+        self._prepared = None
+
+        self.state = IDLE
+        self._thread = None
+        self._stop_event = threading.Event()
+        # Set while running, cleared while paused
+        self._resume_event = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, settings: Dict) -> bool:
+        """
+        Start rolling on the worker thread. Returns False if already running.
+        Raises ValueError if the stop condition does not compile.
+        """
+        if self.is_running:
+            logger.warning("Reroll process is already running")
+            return False
+
+        # Compiled once per run; checked together with the thresholds
+        condition = StopCondition(settings['stop_condition']) if settings.get('stop_condition') else None
+
+        self._stop_event.clear()
+        self._resume_event.set()
+        self._thread = threading.Thread(target=self._run, args=(dict(settings), condition), daemon=True)
+        self._set_state(RUNNING)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Ask the worker to stop after the current step"""
+        if self.is_running:
+            self._stop_event.set()
+            self._resume_event.set()
+            self._set_state(STOPPING)
+
+    def pause(self):
+        """Pause before the next roll"""
+        if self.is_running and self.state == RUNNING:
+            self._resume_event.clear()
+            self._set_state(PAUSED)
+
+    def resume(self):
+        """Continue after a pause"""
+        if self.is_running and self.state == PAUSED:
+            self._resume_event.set()
+            self._set_state(RUNNING)
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the worker to finish"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._post('state', state=state)
+
+    def _post(self, event_type: str, **payload):
+        payload['type'] = event_type
+        self.events.put(payload)
+
+    def _should_stop(self) -> bool:
+        """Block while paused; True once a stop was requested"""
+        self._resume_event.wait()
+        return self._stop_event.is_set()
+
+    def _sleep(self, seconds: float) -> bool:
+        """Sleep that wakes up on stop. Returns True if a stop was requested."""
+        return self._stop_event.wait(seconds)
+
+    def _run(self, settings: Dict, condition: Optional[StopCondition] = None):
+        tries = settings['tries']
+        thresholds = settings['thresholds']
+        reason = 'max_tries'
+
+        logger.info("Starting reroll process with %d tries, thresholds %s, stop condition %s",
+                    tries, thresholds, condition.expression if condition is not None else None)
+        self._post('status', text="Rolling flame, press ESC to force stop.")
+
+        self.timer.reset()
+        self.archiver = None
+        self.debug_sink = None
+        self.delay_tuner = None
+        self._prepared = None
+        item = settings.get('item')
+        session_id = None
+        previous_stats = None
+
+        try:
+            # Set up inside the try, so a bad section still ends the run with 'finished'
+            self.archiver = ScreenshotArchiver.from_settings(settings.get('archive'), timer=self.timer)
+            self.debug_sink = DebugSink.from_settings(settings.get('debug'))
+            self.delay_tuner = DelayTuner.from_settings(settings.get('delays') or {}, settings.get('delay_profile'))
+            processor = getattr(self.controller, 'flame_processor', None)
+            if hasattr(processor, 'debug_sink'):
+                processor.debug_sink = self.debug_sink
+            session_id = self._start_history_session(settings)
+            self._input_lane = ThreadPoolExecutor(max_workers=1, thread_name_prefix='flame-input')
+
+            for attempt in range(1, tries + 1):
+                if self._should_stop():
+                    reason = 'stopped'
+                    break
+
+                roll_start = time.perf_counter()
+                if self.debug_sink is not None:
+                    self.debug_sink.begin_roll(attempt)
+                results = self.roll_once(settings)
+
+                # The decision is the only thing the next roll waits for
+                with self.timer.stage('decide'):
+                    has_stats = results is not None and results.has_stats()
+                    met = (has_stats and self.controller.check_thresholds(results, thresholds) and
+                           (condition is None or condition(results)))
+                self.timer.record('roll', time.perf_counter() - roll_start, roll_start)
+                if self.debug_sink is not None:
+                    self._end_debug_roll(results, has_stats)
+                # Rolls cut short by a stop or a missing window say nothing about the delays
+                if self.delay_tuner is not None and self.last_waits is not None and not self._stop_event.is_set():
+                    # The same stats twice in a row are the old result read again after a dropped input
+                    repeated = has_stats and results.stats == previous_stats
+                    self.delay_tuner.update(has_stats and not repeated, **self.last_waits)
+                previous_stats = results.stats if has_stats else None
+
+                timings = self.timer.end_roll()
+                logger.info("Attempt %d/%d: %s (%s)", attempt, tries,
+                            results.stats if has_stats else "no stats", format_timings(timings),
+                            extra={'attempt': attempt, 'met': met, 'timings': timings})
+                if session_id is not None:
+                    self.history.record_roll(session_id, attempt, results, timings=timings, met=met,
+                                             item=item, image_path=self.last_image_path)
+                self._post('result', attempt=attempt, tries=tries, results=results, timings=timings)
+
+                if self._stop_event.is_set():
+                    reason = 'stopped'
+                    break
+
+                if not has_stats:
+                    continue
+
+                if met:
+                    reason = 'thresholds_met'
+                    break
+
+        except Exception as e:
+            logger.exception("Error during reroll process")
+            reason = 'error'
+            self._post('status', text=f"An error occurred: {str(e)}")
+        finally:
+            # Let pending saves finish before reporting the run as done
+            if self._input_lane is not None:
+                self._input_lane.shutdown(wait=True)
+            self._input_lane = None
+            self._prepared = None
+            if self.archiver is not None:
+                self.archiver.close()
+                logger.info("Screenshots archived: %s", self.archiver.stats())
+            if self.debug_sink is not None:
+                self.debug_sink.close()
+                logger.info("Debug images: %s", self.debug_sink.stats())
+
+        messages = {
+            'max_tries': "Maximum number of tries reached without meeting thresholds",
+            'stopped': "Roll process stopped by user",
+            'thresholds_met': "All thresholds met! Stopping reroll process.",
+        }
+        if reason in messages:
+            logger.info(messages[reason])
+            self._post('status', text=messages[reason])
+
+        if session_id is not None:
+            self.history.end_session(session_id, reason)
+            logger.info("Session summary: %s", self.history.session_summary(session_id))
+
+        summary = self.timer.summary()
+        logger.info("Stage means: %s", format_timings({name: stats['mean_ms'] for name, stats in summary.items()}),
+                    extra={'stages': summary})
+        # Per-grab latency when capturing through the controller's CaptureService
+        capture_stats = self.frame_watcher.capture.stats() if hasattr(self.frame_watcher.capture, 'stats') else None
+        if capture_stats:
+            logger.info("Capture: %s", capture_stats)
+
+        # Saved by the UI as the "delay_profile" section, so the next run starts from it
+        delay_profile = self.delay_tuner.profile() if self.delay_tuner is not None else None
+        if delay_profile is not None:
+            logger.info("Learned delays: %s", delay_profile)
+
+        self.state = IDLE
+        self._post('finished', reason=reason, timings=summary, capture=capture_stats, delay_profile=delay_profile)
+
+    def _end_debug_roll(self, results: Optional[FlameResult], has_stats: bool):
+        """Hand the roll's pipeline images to the debug sink, tagged with what it read"""
+        info = {'screenshot': self.last_image_path}
+        if results is not None:
+            info.update({'raw_text': results.raw_text, 'stats': results.stats, 'source': results.source,
+                         'confidence': results.confidence})
+        if self.debug_sink.end_roll(failed=not has_stats, info=info):
+            logger.debug("Debug images of the roll queued in %s", self.debug_sink.run_dir)
+
+    def _start_history_session(self, settings: Dict) -> Optional[int]:
+        """Open a roll history session unless history is disabled in the settings"""
+        options = settings.get('history') or {}
+        if not options.get('enabled', True):
+            return None
+        try:
+            if self.history is None:
+                self.history = RollHistory(options.get('path', DEFAULT_DB_PATH))
+            return self.history.start_session(settings.get('item'), settings)
+        except Exception as e:
+            logger.warning("Roll history unavailable: %s", e)
+            return None
+
+    def move_cursor_smoothly(self, start_x, start_y, target_x, target_y, steps=20, delay=0.01):
+        """Move cursor smoothly from start to target position"""
+        # Already there, e.g. after the previous roll
+        if abs(target_x - start_x) <= 1 and abs(target_y - start_y) <= 1:
+            return
+
+        # Calculate step sizes
+        dx = (target_x - start_x) / steps
+        dy = (target_y - start_y) / steps
+
+        input_backend = self.backends.input
+
+        # Move cursor in small steps
+        for i in range(steps):
+            # Use easing function for more natural movement
+            t = i / steps
+            # Ease-out cubic function
+            t = 1 - math.pow(1 - t, 3)
+
+            # Calculate current position
+            current_x = start_x + dx * i
+            current_y = start_y + dy * i
+
+            # Move cursor to current position
+            input_backend.move_to(int(current_x), int(current_y))
+            time.sleep(delay)
+
+        # Ensure final position is exactly at target
+        input_backend.move_to(int(target_x), int(target_y))
+
+    def _run_on(self, lane, fn, *args):
+        """Run fn on a side lane, or inline when rolling outside of a run"""
+        if lane is None:
+            fn(*args)
+            return None
+        return lane.submit(fn, *args)
+
+    def _prepare_input(self, window, x, y, action_delay: float):
+        """Focus the game and put the cursor on the reroll button"""
+        window_backend = self.backends.window
+        # Only wait for the window to come to front when it was not there already
+        try:
+            if window_backend.get_foreground() != window or window_backend.is_minimized(window):
+                with self.timer.stage('focus'):
+                    window_backend.set_foreground(window)
+                    if self._sleep(action_delay):
+                        return
+        except Exception as e:
+            logger.warning("Could not set window focus: %s", e)
+            # Continue anyway, as the window might already be focused
+
+        with self.timer.stage('cursor'):
+            current_x, current_y = self.backends.input.get_cursor_pos()
+            self.move_cursor_smoothly(current_x, current_y, x, y)
+
+    def _send_inputs(self, x, y, action_delay: float, detect_dialogs: bool) -> bool:
+        """Click reroll and confirm both dialogs. Returns False if a stop was requested."""
+        input_backend = self.backends.input
+        if detect_dialogs:
+            # Click once the button is up, where it actually is rather than where the settings put it
+            with self.timer.stage('dialog_wait'):
+                button = self.ui_state_detector.wait_for('reroll', timeout=action_delay)
+            self.last_waits['dialog_waits'].append(self.ui_state_detector.last_wait)
+            if button is not None:
+                left, top = self.ui_state_detector.client_rect[:2]
+                x, y = left + button['x'] + button['w'] // 2, top + button['y'] + button['h'] // 2
+        logger.debug("Clicking reroll at (%d, %d)", x, y)
+        with self.timer.stage('click'):
+            input_backend.click(x, y, button="left", delay=action_delay)
+
+        # Press Enter twice; the game asks a second time once the first dialog is gone
+        for i in range(2):
+            if detect_dialogs:
+                # Press as soon as this confirmation dialog is up
+                with self.timer.stage('dialog_wait'):
+                    self.ui_state_detector.wait_for('confirmation', timeout=action_delay)
+                logger.debug("Dialog wait: %s", self.ui_state_detector.last_wait)
+                self.last_waits['dialog_waits'].append(self.ui_state_detector.last_wait)
+
+            logger.debug("Enter press %d", i + 1)
+            with self.timer.stage('enter'):
+                input_backend.key_down('enter')
+                # The key is released even when a stop cuts the hold short
+                stopped = self._sleep(0.1)
+                input_backend.key_up('enter')
+            if stopped:
+                return False
+
+            if detect_dialogs:
+                # Continue once the game has taken the key press
+                with self.timer.stage('dialog_wait'):
+                    self.ui_state_detector.wait_until_gone('confirmation', timeout=action_delay)
+                self.last_waits['dialog_waits'].append(self.ui_state_detector.last_wait)
+            elif self._sleep(action_delay):
+                return False
+        return True
+
+    def roll_once(self, settings: Dict) -> Optional[FlameResult]:
+        """Click reroll, confirm the dialogs, then capture and parse the new result"""
+        delays = settings['delays']
+        parse_delay = float(delays['parse'])
+        action_delay = float(delays['action'])
+        if self.delay_tuner is not None:
+            action_delay, parse_delay = self.delay_tuner.action, self.delay_tuner.parse
+        self.last_image_path = None
+        self.last_waits = None
+
+        # Cached per window geometry, so this is a single GetWindowRect while the window stays put
+        with self.timer.stage('window'):
+            layout = self.controller.window_tracker.layout(settings['reroll_position'], settings['capture_region'])
+        if layout is None:
+            logger.warning("Could not find MapleStory window")
+            return None
+        window, client_rect, monitor = layout.handle, layout.client, layout.monitor
+        x, y = layout.click
+
+        try:
+            # Focus and cursor move, usually already done next to the previous OCR
+            with self.timer.stage('prepare'):
+                prepared, self._prepared = self._prepared, None
+                if prepared is not None:
+                    prepared.result()
+                else:
+                    self._prepare_input(window, x, y, action_delay)
+                if self._stop_event.is_set():
+                    return None
+
+            # Remember the result region before rolling so the new result can be detected
+            baseline = None
+            if delays.get('wait_for_change', True):
+                baseline = self.frame_watcher.snapshot(monitor)
+
+            # Dialog detection needs the client rect to know where to look
+            detect_dialogs = delays.get('wait_for_dialogs', True) and self.ui_state_detector.is_available()
+            if detect_dialogs:
+                self.ui_state_detector.set_client_rect(client_rect)
+
+            self.last_waits = {'result_wait': None, 'dialog_waits': []}
+            with self.timer.stage('input'):
+                if not self._send_inputs(x, y, action_delay, detect_dialogs):
+                    return None
+
+            # Wait for flame animation
+            with self.timer.stage('result_wait'):
+                start = time.perf_counter()
+                result_window = None
+                if detect_dialogs:
+                    # The result window is cleared while the flame plays and comes back with the new result
+                    result_window = self.ui_state_detector.wait_for('result', timeout=parse_delay)
+                    logger.debug("Result window wait: %s", self.ui_state_detector.last_wait)
+                remaining = max(0.0, parse_delay - (time.perf_counter() - start))
+                screenshot = None
+                if baseline is not None:
+                    screenshot = self.frame_watcher.wait_for_result(monitor, baseline, timeout=remaining)
+                    logger.debug("Result wait: %s", self.frame_watcher.last_wait)
+                    # Timed from the last Enter, so the tuner sees the whole animation
+                    self.last_waits['result_wait'] = dict(self.frame_watcher.last_wait,
+                                                          elapsed=time.perf_counter() - start)
+                elif result_window is None and self._sleep(remaining):
+                    return None
+
+            with self.timer.stage('capture'):
+                if screenshot is None:
+                    screenshot = self.frame_watcher.grab(monitor)
+                # BGRA view over the grab's buffer, no copy; only the archiver's writer makes a PIL image
+                image = frame_array(screenshot)
+
+            # Saving and the next roll's cursor move overlap with OCR
+            with self.timer.stage('archive'):
+                if self.archiver is None:
+                    self.archiver = ScreenshotArchiver(timer=self.timer)
+                path = self.archiver.submit(image)
+                self.last_image_path = path
+            if path is None:
+                logger.warning("Archive queue full, screenshot dropped")
+            self._prepared = self._run_on(self._input_lane, self._prepare_input, window, x, y, action_delay)
+
+            with self.timer.stage('ocr'):
+                results = self.controller.flame_processor.parse_flame_results(image)
+            return results
+
+        except Exception as e:
+            logger.exception("Error in click sequence")
+            return None
@@ -1,232 +1,298 @@
-import easyocr
+import logging
 import re
 import cv2
 import numpy as np
 from PIL import Image
 from typing import Dict, Optional
 import os
-import mss
+import threading
+from src.backends.base import frame_array
+from src.backends.capture import MssCapture
+from src.utils.flame_result import FlameResult
+from src.utils.glyph_recognizer import GlyphRecognizer
+from src.utils.text_preprocessor import BlueTextPreprocessor
+from src.utils.timing import timed
+
+logger = logging.getLogger(__name__)
+
+# EasyOCR pulls in torch and loads its models, which takes seconds. The reader
+# is created once per process, on first use or on a background warm-up thread.
+_reader = None
+# Held while the reader is created, which includes the slow easyocr import
+_reader_lock = threading.Lock()
+# Only guards starting the warm-up thread, so callers on the UI thread never wait for the import
+_warm_lock = threading.Lock()
+# Set once the warm-up has finished, whether or not it worked
+_warm_done = threading.Event()
+_warm_error = None
+_warm_thread = None
+
+
+def get_reader():
+    """Return the shared EasyOCR reader, creating it on first use"""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(['en'])
+        return _reader
+
+
+def _warm_reader():
+    """Create the reader and run a dummy inference so the first roll is fast"""
+    global _warm_error
+    try:
+        reader = get_reader()
+        reader.readtext(np.zeros((32, 96), dtype=np.uint8))
+    except Exception as e:
+        _warm_error = str(e)
+        logger.error("Could not load EasyOCR: %s", e)
+    finally:
+        _warm_done.set()
+
+
+def warm_up_reader():
+    """Start warming the shared reader on a background thread (once per process)"""
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_warm_reader, name='easyocr-warm-up', daemon=True)
+            _warm_thread.start()
+
+
+def is_reader_ready() -> bool:
+    """Whether the shared reader has been created and warmed up"""
+    return _warm_done.is_set() and _warm_error is None
+
+
+def reader_error() -> Optional[str]:
+    """Why the warm-up failed, None while loading or once ready"""
+    return _warm_error
+
 
 class FlameProcessor:
-    def __init__(self):
+    def __init__(self, capture=None):
+        # CaptureBackend for capture_result_region, the controller's capture service when given
+        self.capture = capture
         self.result_region = {
             'left': 0.3,    # Start at 30% of the width
             'top': 0.4,     # Start at 40% of the height
             'right': 0.7,   # End at 70% of the width
             'bottom': 0.7   # End at 70% of the height
         }
-        # Initialize EasyOCR reader
-        self.reader = easyocr.Reader(['en'])
+        # Glyph template matcher for the game font, EasyOCR is the fallback
+        self.glyph_recognizer = GlyphRecognizer()
+        
+        # Per-thread state: the engine worker and Test Screenshot on the Tk thread
+        # parse at the same time, so each gets its own scratch buffers and last_source
+        self._local = threading.local()
+        # DebugSink that keeps the preprocessing stages of selected rolls, set by the engine
+        self.debug_sink = None
+        # StageTimer for the OCR steps, set by the engine
+        self.timer = None
         
-    def preprocess_image(self, pil_img: Image.Image) -> np.ndarray:
-        """Preprocess the image for better OCR results"""
-        # Convert PIL Image to OpenCV format
-        image_cv = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+    @property
+    def preprocessor(self) -> BlueTextPreprocessor:
+        """This thread's fused preprocessing, with scratch buffers reused across its rolls"""
+        preprocessor = getattr(self._local, 'preprocessor', None)
+        if preprocessor is None:
+            preprocessor = self._local.preprocessor = BlueTextPreprocessor()
+        return preprocessor
         
-        # Increase image size
-        scale = 3  # Increased from 2 to 3 for better OCR
-        image_cv = cv2.resize(image_cv, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    @property
+    def last_source(self) -> Optional[str]:
+        """Recognizer of this thread's last extract_text call"""
+        return getattr(self._local, 'source', None)
         
-        # Convert to HSV color space
-        hsv = cv2.cvtColor(image_cv, cv2.COLOR_BGR2HSV)
+    @property
+    def last_confidence(self) -> Optional[float]:
+        """Confidence of this thread's last extract_text call"""
+        return getattr(self._local, 'confidence', None)
         
-        # Create a mask for blue text (adjust these ranges if needed)
-        lower_blue = np.array([100, 150, 50])
-        upper_blue = np.array([140, 255, 255])
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
+    @property
+    def reader(self):
+        """Shared EasyOCR reader, created lazily"""
+        return get_reader()
         
-        # Save debug images
-        cv2.imwrite('debug_input.png', image_cv)
-        cv2.imwrite('debug_blue_mask.png', blue_mask)
+    def warm_up(self):
+        """Load EasyOCR in the background so the UI can start immediately"""
+        warm_up_reader()
         
-        # Apply the mask to the original image
-        blue_text = cv2.bitwise_and(image_cv, image_cv, mask=blue_mask)
+    def is_ready(self) -> bool:
+        """Whether OCR is loaded and ready to use"""
+        return is_reader_ready()
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(blue_text, cv2.COLOR_BGR2GRAY)
+    def load_error(self) -> Optional[str]:
+        """Why OCR could not be loaded, if it failed"""
+        return reader_error()
         
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 11, 2
-        )
+    def preprocess_image(self, image) -> np.ndarray:
+        """
+        Binarize the result text for OCR. Takes a PIL image or an mss grab /
+        BGRA array, which is read in place. The returned array is reused by
+        the next call on the same thread.
+        """
+        preprocessor = self.preprocessor
+        with timed(self.timer, 'preprocess'):
+            thresh = preprocessor(image)
         
-        # Save more debug images
-        cv2.imwrite('debug_blue_text.png', blue_text)
-        cv2.imwrite('debug_thresh.png', thresh)
+        # Stages are only copied for rolls the debug sink has open
+        sink = self.debug_sink
+        if sink is not None and sink.recording:
+            sink.record('input', image)
+            sink.record('blue_mask', preprocessor.mask)
+            sink.record('blue_text', cv2.bitwise_and(preprocessor.bgr, preprocessor.bgr,
+                                                     mask=preprocessor.mask)[..., ::-1])
+            sink.record('thresh', thresh)
         
         return thresh
         
-    def extract_text(self, pil_img: Image.Image) -> str:
-        """Extract text from the image using EasyOCR"""
+    def extract_text(self, image) -> str:
+        """Extract text from a PIL image or BGRA grab array using EasyOCR"""
+        # Try the glyph recognizer first, it is exact on the game font
+        with timed(self.timer, 'recognize'):
+            text, confidence = self.glyph_recognizer.recognize(image)
+        if confidence >= self.glyph_recognizer.min_confidence:
+            logger.debug("Glyph recognizer text (confidence %.2f): %s", confidence, text)
+            self._local.source = 'glyph'
+            self._local.confidence = confidence
+            return text
+        
         # Preprocess image
-        image = self.preprocess_image(pil_img)
+        binary = self.preprocess_image(image)
         
         # Get OCR results
-        results = self.reader.readtext(image)
+        with timed(self.timer, 'easyocr'):
+            results = self.reader.readtext(binary)
         
         # Combine all detected text blocks
         text = ' '.join([result[1] for result in results])
         
-        # Print debug info
-        print("EasyOCR detected text:")
-        print(text)
-        print("\nDetailed results:")
-        for result in results:
-            bbox, text, confidence = result
-            print(f"Text: {text}, Confidence: {confidence:.2f}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("EasyOCR detected text: %s", text)
+            for bbox, block_text, confidence in results:
+                logger.debug("Text: %s, Confidence: %.2f", block_text, confidence)
             
+        # The weakest block decides how far the text can be trusted
+        self._local.source = 'easyocr'
+        self._local.confidence = min((float(r[2]) for r in results), default=None)
         return text
         
-    def parse_flame_stats(self, text: str) -> Dict:
+    def parse_flame_stats(self, text: str) -> FlameResult:
         """Parse the OCR text to extract flame stats"""
-        results = {
-            'currently_owned': None,
-            'attack_increase': None,
-            'cp_increase': None,
-            'stats': {},
-            'raw_text': text
-        }
+        results = FlameResult(raw_text=text)
         
-        # Print raw text for debugging
-        print("Raw OCR text:", text)
+        # Per-pattern tracing is only built when debug logging is on
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         # Store original text for debugging
         original_text = text
-        print("Original text:", original_text)
         
         # Basic cleanup - normalize spaces and handle signs
         text = text.strip()
         text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with single space
         
-        print("Cleaned text:", text)
+        if debug:
+            logger.debug("Raw OCR text: %r, cleaned: %r", original_text, text)
         
         # Define stat patterns - handle various spacing and formatting
         stat_patterns = {
-            'STR': r'STR\s*[+:]?\s*(\d+)',
-            'DEX': r'DEX\s*[+:]?\s*(\d+)',
-            'INT': r'INT\s*[+:]?\s*(\d+)',
-            'LUK': r'LUK\s*[+:]?\s*(\d+)',
-            'MaxHP': r'MaxHP\s*[+:]?\s*(\d+)',
-            'DEF': r'DEF\s*[+:]?\s*(\d+)',
-            'STATS%': r'(?:All|A11|A1l|Al1)\s*Stats?\s*[+:]?\s*(\d+)',
+            'STR': r'STR\s*[+:]?\s*\+?\s*(\d+)',
+            'DEX': r'DEX\s*[+:]?\s*\+?\s*(\d+)',
+            'INT': r'INT\s*[+:]?\s*\+?\s*(\d+)',
+            'LUK': r'LUK\s*[+:]?\s*\+?\s*(\d+)',
+            'MaxHP': r'MaxHP\s*[+:]?\s*\+?\s*(\d+)',
+            'DEF': r'DEF\s*[+:]?\s*\+?\s*(\d+)',
+            'STATS%': r'(?:All|A11|A1l|Al1)\s*Stats?\s*[+:]?\s*\+?\s*(\d+)',
         }
         
         # Extract stats with debug info
         for key, pattern in stat_patterns.items():
-            print(f"\nTrying to match {key} with pattern: {pattern}")
             # Try both in cleaned text and original text
             for current_text in [text, original_text]:
-                print(f"Checking text: {current_text}")
                 matches = list(re.finditer(pattern, current_text, re.IGNORECASE))
                 if matches:
                     for match in matches:
                         try:
                             value = int(match.group(1))
-                            # Add % symbol for All Stats
-                            if key == 'STATS%':
-                                results['stats'][key] = f"{value}%"
-                            else:
-                                results['stats'][key] = value
-                            print(f"Found {key}: {value} (matched text: '{match.group(0)}', full match groups: {match.groups()})")
+                            results.stats[key] = value
+                            if debug:
+                                logger.debug("Found %s: %d (matched text: %r)", key, value, match.group(0))
                             break  # Found a valid match, no need to check original text
                         except ValueError:
-                            print(f"Failed to parse value for {key}: {match.group(1)} (matched text: '{match.group(0)}')")
+                            if debug:
+                                logger.debug("Failed to parse value for %s: %s (matched text: %r)",
+                                             key, match.group(1), match.group(0))
                             continue
             
-            if key not in results['stats']:
-                print(f"No matches found for {key} pattern: {pattern}")
+            if debug and key not in results.stats:
                 # Show context around the stat name if it exists
-                for current_text in [text, original_text]:
-                    search_text = 'All Stats' if key == 'STATS%' else key
-                    if search_text in current_text:
-                        start = max(0, current_text.find(search_text) - 15)
-                        end = min(len(current_text), current_text.find(search_text) + len(search_text) + 15)
-                        print(f"Context around {key} in {'cleaned' if current_text == text else 'original'} text: '{current_text[start:end]}'")
+                search_text = 'All Stats' if key == 'STATS%' else key
+                if search_text in text:
+                    start = max(0, text.find(search_text) - 15)
+                    end = min(len(text), text.find(search_text) + len(search_text) + 15)
+                    logger.debug("No match for %s pattern %s, context: %r", key, pattern, text[start:end])
         
         # Extract attack increase and CP increase after stat parsing
         attack_match = re.search(r'Attack\s*Increase\s*:\s*(-\d+)', text)
         if attack_match:
-            results['attack_increase'] = int(attack_match.group(1))
-            print(f"Found attack increase: {results['attack_increase']}")
+            results.attack_increase = int(attack_match.group(1))
             
         cp_match = re.search(r'CP\s*Increase\s*:\s*(-\d+)', text)
         if cp_match:
-            results['cp_increase'] = int(cp_match.group(1))
-            print(f"Found CP increase: {results['cp_increase']}")
-        
-        # Print final parsed results
-        print("\nFinal parsed results:")
-        print("Stats:", results['stats'])
-        print("Attack Increase:", results['attack_increase'])
-        print("CP Increase:", results['cp_increase'])
+            results.cp_increase = int(cp_match.group(1))
         
         return results
         
-    def parse_flame_results(self, image: Image.Image) -> Optional[Dict]:
-        """Process the flame result image and return parsed stats"""
+    def parse_flame_results(self, image) -> Optional[FlameResult]:
+        """Process the flame result image (PIL image or BGRA grab array) and return parsed stats"""
         try:
             # Extract text from image
             ocr_text = self.extract_text(image)
             
             # Parse the extracted text
-            results = self.parse_flame_stats(ocr_text)
+            with timed(self.timer, 'parse'):
+                results = self.parse_flame_stats(ocr_text)
+            results.source = self.last_source
+            results.confidence = self.last_confidence
             
-            # Print the final results
-            print("\nFinal parsed results:")
-            print("Stats:", results['stats'])
-            print("Attack Increase:", results['attack_increase'])
-            print("CP Increase:", results['cp_increase'])
+            logger.debug("Parsed %s (attack %s, CP %s) with %s", results.stats, results.attack_increase,
+                         results.cp_increase, results.source)
             
             return results
             
-        except Exception as e:
-            print(f"Error parsing flame results: {str(e)}")
+        except Exception:
+            logger.exception("Error parsing flame results")
             return None 
 
     def process_flame_results(self, window_info):
         """Process the flame results from the window"""
         try:
-            print("\nProcessing flame results...")
-            
             # Capture the result region
-            print("Capturing result region...")
             result_image = self.capture_result_region(window_info)
-            if not result_image:
-                print("Failed to capture result region")
+            if result_image is None:
+                logger.warning("Failed to capture result region")
                 return None
-            print(f"Captured image size: {result_image.size}")
             
             # Extract text from the image
-            print("Extracting text from image...")
             text = self.extract_text(result_image)
-            print(f"Extracted text: {text}")
             
             # Parse the flame stats
-            print("Parsing flame stats...")
-            stats = self.parse_flame_stats(text)
-            print(f"Parsed stats: {stats}")
+            return self.parse_flame_stats(text)
             
-            return stats
-            
-        except Exception as e:
-            print(f"Error processing flame results: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error processing flame results")
             return None
             
     def capture_result_region(self, window_info):
-        """Capture the region containing flame results"""
+        """Capture the region containing flame results as a BGRA array"""
         try:
-            print(f"Capturing window region: {window_info}")
-            
             # Extract the window coordinates from the mss format
             if isinstance(window_info, dict):
                 # mss format: {'window': (left, top, right, bottom), 'client': ...}
                 left, top, right, bottom = window_info['window']
                 width = right - left
                 height = bottom - top
-                print(f"Window dimensions: {width}x{height}")
                 
                 # Calculate the region coordinates based on relative values
                 region_left = left + int(self.result_region['left'] * width)
@@ -245,22 +311,16 @@ class FlameProcessor:
                 # If it's already in the correct format, use it directly
                 monitor = window_info
                 
-            print(f"Capture region: {monitor}")
+            logger.debug("Capture region: %s", monitor)
             
-            # Take a screenshot of the window
-            with mss.mss() as sct:
-                screenshot = sct.grab(monitor)
-                print(f"Screenshot size: {screenshot.size}")
-                
-                # Convert to PIL Image
-                image = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-                print(f"PIL Image size: {image.size}")
-                
-                return image
+            # Take a screenshot of the window with the long-lived capture handle
+            if self.capture is None:
+                self.capture = MssCapture()
+            screenshot = self.capture.grab(monitor)
+            
+            # View over the grab's buffer
+            return frame_array(screenshot)
                 
-        except Exception as e:
-            print(f"Error capturing result region: {str(e)}")
-            print(f"Window info: {window_info}")
-            if 'screenshot' in locals():
-                print(f"Screenshot size: {screenshot.size if screenshot else 'None'}")
+        except Exception:
+            logger.exception("Error capturing result region for %s", window_info)
             return None 
\ No newline at end of file
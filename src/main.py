@@ -1,13 +1,19 @@
 from src.controllers.maplestory_controller import MapleStoryController
 from src.ui.flame_ui import FlameUI
+from src.utils.log_config import setup_logging, shutdown_logging
 import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class FlameRerollApp:
     def __init__(self):
-        self.controller = MapleStoryController()
         self.settings_file = "flame_settings.json"
         self.load_settings()
+        # Console and results/logs/flame.jsonl, configured by the "logging" section
+        setup_logging(self.saved_settings.get("logging"))
+        self.controller = MapleStoryController()
         
     def load_settings(self):
         """Load saved settings if they exist"""
@@ -30,11 +36,8 @@ class FlameRerollApp:
             
     def start_reroll(self, settings):
         """Start the flame reroll process with given settings"""
-        print("Starting flame reroll with settings:")
-        print(f"Flame Type: {settings['flame_type']}")
-        print("Thresholds:")
-        for stat, value in settings['thresholds'].items():
-            print(f"  {stat}: {value}")
+        logger.info("Starting flame reroll with flame type %s, thresholds %s",
+                    settings['flame_type'], settings['thresholds'])
             
         # Save the settings
         self.save_settings(settings)
@@ -45,13 +48,16 @@ class FlameRerollApp:
     def run(self):
         """Start the application"""
         # First, try to find the MapleStory window
-        if not self.controller.find_window():
-            print("Error: Could not find MapleStory window. Please make sure the game is running.")
-            return
-            
-        # Create and run the UI
-        ui = FlameUI(self.start_reroll, self.controller)
-        ui.run()
+        try:
+            if not self.controller.find_window():
+                logger.error("Could not find MapleStory window. Please make sure the game is running.")
+                return
+                
+            # Create and run the UI
+            ui = FlameUI(self.start_reroll, self.controller)
+            ui.run()
+        finally:
+            shutdown_logging()
 
 if __name__ == "__main__":
     app = FlameRerollApp()
@@ -0,0 +1,229 @@
+import threading
+
+import numpy as np
+from PIL import Image
+
+from ..backends import create_backends
+from ..backends.base import CaptureBackend, Frame, frame_array, to_image
+from ..backends.capture import CaptureService, ReplayCapture
+from ..controllers.maplestory_controller import MapleStoryController
+from ..controllers.reroll_engine import RerollEngine
+from ..utils.flame_result import FlameResult
+from ..utils.window_tracker import WindowTracker
+
+
+def _write_frames(directory, colors, size=(64, 48)):
+    paths = []
+    for i, color in enumerate(colors):
+        path = directory / f"frame_{i}.png"
+        Image.new('RGB', size, color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_frame_matches_the_mss_screenshot_layout():
+    pixels = np.zeros((2, 3, 3), dtype=np.uint8)
+    pixels[..., 0] = 200  # red
+    frame = Frame.from_array(pixels)
+
+    assert frame.size == (3, 2)
+    assert bytes(frame.raw[:4]) == bytes([0, 0, 200, 255])
+    assert frame.rgb[:3] == bytes([200, 0, 0])
+
+
+def test_frame_array_is_a_view_and_to_image_decodes_it():
+    pixels = np.random.default_rng(0).integers(0, 256, size=(5, 7, 3), dtype=np.uint8)
+    frame = Frame.from_array(pixels)
+
+    view = frame_array(frame)
+    assert view.shape == (5, 7, 4)
+    assert np.shares_memory(view, np.frombuffer(frame.raw, dtype=np.uint8))
+    assert np.array_equal(np.asarray(to_image(frame)), pixels)
+    # Crops stay views until something needs PIL
+    assert np.array_equal(np.asarray(to_image(view[1:4, 2:6])), pixels[1:4, 2:6])
+
+
+def test_replay_capture_crops_and_advances(tmp_path):
+    _write_frames(tmp_path, ['red', 'blue'])
+    capture = ReplayCapture(str(tmp_path), loop=False)
+
+    crop = capture.grab({'left': 10, 'top': 5, 'width': 20, 'height': 10})
+    assert crop.size == (20, 10) and crop.rgb[:3] == bytes([255, 0, 0])
+    # A region outside the recorded frame gets the whole frame
+    assert capture.grab({'left': 0, 'top': 0, 'width': 1920, 'height': 1080}).size == (64, 48)
+
+    assert capture.advance()
+    assert capture.grab().rgb[:3] == bytes([0, 0, 255])
+    assert not capture.advance()
+
+
+class HeadlessController:
+    """What the engine needs from MapleStoryController, on fake backends"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.window_tracker = WindowTracker(backends.window)
+        self.flame_processor = self
+        self.parsed = 0
+
+    def parse_flame_results(self, image):
+        self.parsed += 1
+        return FlameResult(stats={'STR': 10 * self.parsed})
+
+    def check_thresholds(self, results, thresholds):
+        return results.meets(thresholds)
+
+
+def test_engine_runs_headless_on_fake_backends(tmp_path):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    _write_frames(frames, ['black', 'white', 'black', 'white'])
+    backends = create_backends('fake', replay=str(frames))
+    controller = HeadlessController(backends)
+    engine = RerollEngine(controller)
+
+    engine.start({
+        'tries': 10,
+        'thresholds': {'STR': 30},
+        'reroll_position': {'x': 0.5, 'y': 0.5},
+        'capture_region': {'left': 0.0, 'top': 0.0, 'right': 0.02, 'bottom': 0.02},
+        'delays': {'parse': 1.0, 'action': 0.01, 'wait_for_change': True, 'wait_for_dialogs': False},
+        'archive': {'base_dir': str(tmp_path / 'archive')},
+        'history': {'enabled': False},
+    })
+    engine.join(10)
+
+    events = []
+    while not engine.events.empty():
+        events.append(engine.events.get())
+    assert events[-1]['reason'] == 'thresholds_met'
+    assert controller.parsed == 3
+    # Every roll clicks reroll once and confirms both dialogs
+    assert backends.input.count('click') == 3
+    assert backends.input.count('key_down', 'enter') == 6
+    assert backends.capture.index == 3
+    # The result was detected from the frame change, not the parse timeout
+    assert all(e['timings']['result_wait'] < 500 for e in events if e['type'] == 'result')
+
+
+def test_watched_stop_key_stops_the_engine(tmp_path):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    _write_frames(frames, ['black', 'white'] * 10)
+    backends = create_backends('fake', replay=str(frames))
+    controller = HeadlessController(backends)
+    engine = RerollEngine(controller)
+    stop_watching = backends.input.watch_key('esc', engine.stop)
+    presses = []
+
+    def press_esc_on_second_click(event):
+        if event[0] == 'click' and backends.input.count('click') == 2:
+            presses.append(backends.input.press('esc'))
+
+    backends.input.add_listener(press_esc_on_second_click)
+    engine.start({
+        'tries': 100,
+        'thresholds': {'STR': 999},
+        'reroll_position': {'x': 0.5, 'y': 0.5},
+        'capture_region': {'left': 0.0, 'top': 0.0, 'right': 0.02, 'bottom': 0.02},
+        'delays': {'parse': 1.0, 'action': 0.01, 'wait_for_change': True, 'wait_for_dialogs': False},
+        'archive': {'base_dir': str(tmp_path / 'archive')},
+        'history': {'enabled': False},
+    })
+    engine.join(10)
+
+    events = []
+    while not engine.events.empty():
+        events.append(engine.events.get())
+    assert len(presses) == 1
+    assert events[-1]['reason'] == 'stopped'
+    assert backends.input.count('click') == 2
+
+    # Once unsubscribed a press no longer reaches the callback
+    stop_watching()
+    calls = []
+    backends.input.watch_key('f12', lambda: calls.append('f12'))
+    backends.input.press('esc').join(1)
+    backends.input.press('f12').join(1)
+    assert calls == ['f12']
+
+
+class ThreadBoundCapture(CaptureBackend):
+    """Records the threads it is used from, like an mss handle would have to be"""
+
+    thread_bound = True
+    created = []
+
+    def __init__(self):
+        self.threads = set()
+        self.closed = False
+        ThreadBoundCapture.created.append(self)
+
+    def grab(self, monitor):
+        self.threads.add(threading.get_ident())
+        self.closed = False
+        return Frame(bytearray(monitor['width'] * monitor['height'] * 4), monitor['width'], monitor['height'])
+
+    def close(self):
+        # Like MssCapture, the handle is rebuilt by the next grab
+        self.threads = set()
+        self.closed = True
+
+
+def test_capture_service_keeps_one_handle_per_thread():
+    ThreadBoundCapture.created = []
+    service = CaptureService(ThreadBoundCapture())
+    monitor = {'left': 0, 'top': 0, 'width': 4, 'height': 2}
+
+    for _ in range(3):
+        assert service.grab(monitor).size == (4, 2)
+    poller = threading.Thread(target=lambda: [service.grab(monitor) for _ in range(5)])
+    poller.start()
+    poller.join()
+
+    # The handles are reused across grabs and never shared between threads
+    assert len(ThreadBoundCapture.created) == 2
+    assert all(len(capture.threads) == 1 for capture in ThreadBoundCapture.created)
+    stats = service.stats()
+    assert stats['grabs'] == 8 and stats['handles'] == 2
+    assert 0 <= stats['p50_ms'] <= stats['p95_ms'] <= stats['max_ms']
+
+    # The finished poller's handle is released when the next thread needs one
+    next_poller = threading.Thread(target=service.grab, args=(monitor,))
+    next_poller.start()
+    next_poller.join()
+    assert ThreadBoundCapture.created[1].closed
+    service.close()
+    assert all(capture.closed for capture in ThreadBoundCapture.created)
+
+
+def test_wrapped_capture_is_closed_when_its_thread_ends():
+    ThreadBoundCapture.created = []
+    wrapped = ThreadBoundCapture()
+    service = CaptureService(wrapped)
+    monitor = {'left': 0, 'top': 0, 'width': 4, 'height': 2}
+
+    for _ in range(2):
+        owner = threading.Thread(target=service.grab, args=(monitor,))
+        owner.start()
+        owner.join()
+        # Each thread gets the wrapped instance, never with a handle left over from a dead thread
+        assert len(wrapped.threads) == 1
+    assert ThreadBoundCapture.created == [wrapped]
+
+    service.grab(monitor)
+    assert wrapped.threads == {threading.get_ident()}
+    service.close()
+
+
+def test_controller_shares_one_capture_service(tmp_path):
+    paths = _write_frames(tmp_path, [(0, 0, 0)])
+    controller = MapleStoryController(create_backends('fake', replay=paths))
+
+    assert isinstance(controller.capture, CaptureService)
+    assert controller.reroll_engine.frame_watcher.capture is controller.capture
+    assert controller.reroll_engine.ui_state_detector.capture is controller.capture
+    assert controller.flame_processor.capture is controller.capture
+    # Replay captures are thread-safe and shared as they are
+    controller.capture.grab({'left': 0, 'top': 0, 'width': 8, 'height': 8})
+    assert controller.capture.stats()['handles'] == 1
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+from PIL import Image
+
+from ..tools.batch_ocr import find_images, main, write_rows
+
+SCREENSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              'test_screenshots')
+SCREENSHOT = os.path.join(SCREENSHOT_DIR, 'flame_region_20250408_163014.png')
+
+
+def test_walks_the_tree_and_streams_one_row_per_screenshot(tmp_path):
+    day = tmp_path / 'flames' / '2025-04-08'
+    day.mkdir(parents=True)
+    shutil.copy(SCREENSHOT, day / 'flame_1.png')
+    # Raw archives hold RGB pixels
+    np.save(day / 'flame_2.npy', np.asarray(Image.open(SCREENSHOT).convert('RGB')))
+    (day / 'notes.txt').write_text('not a screenshot')
+    (day / 'flame_3.png').write_bytes(b'broken')
+    assert [os.path.basename(path) for path in find_images(str(tmp_path))] == [
+        'flame_1.png', 'flame_2.npy', 'flame_3.png']
+
+    out = tmp_path / 'rescored.jsonl'
+    assert main([str(tmp_path / 'flames'), '--out', str(out), '--workers', '1']) == 0
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [os.path.basename(row['path']) for row in rows] == ['flame_1.png', 'flame_2.npy', 'flame_3.png']
+    assert rows[0]['ok'] and rows[0]['stats'] == rows[1]['stats']
+    assert not rows[2]['ok'] and 'error' in rows[2]
+
+
+def test_csv_rows_keep_the_stats_as_json():
+    out = io.StringIO()
+    rows = [{'path': 'a.png', 'ok': True, 'stats': {'STR': 12}, 'source': 'glyph', 'ms': 3.0},
+            {'path': 'b.png', 'ok': False, 'error': 'cannot identify image file'}]
+    assert write_rows(rows, out, 'csv') == {'images': 2, 'parsed': 1, 'errors': 1}
+
+    written = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert json.loads(written[0]['stats']) == {'STR': 12}
+    assert written[1]['error'] == 'cannot identify image file' and written[1]['stats'] == '{}'
@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from ..utils.debug_sink import DebugSink
+
+
+def _roll(sink, roll_id, failed, size=(10, 20)):
+    sink.begin_roll(roll_id)
+    sink.record('input', np.full(size + (4,), roll_id, dtype=np.uint8))
+    sink.record('thresh', np.zeros(size, dtype=np.uint8))
+    return sink.end_roll(failed=failed, info={'raw_text': f"roll {roll_id}"})
+
+
+def test_sampled_and_failed_rolls_are_kept(tmp_path):
+    assert DebugSink.from_settings({}) is None
+    sink = DebugSink.from_settings({'every': 3, 'on_failure': True, 'dir': str(tmp_path)})
+
+    kept = [_roll(sink, roll_id, failed=(roll_id == 5)) for roll_id in range(1, 7)]
+    sink.close()
+    assert kept == [False, False, True, False, True, True]
+
+    run_dir = Path(sink.run_dir)
+    assert sorted(path.name for path in run_dir.glob('*.json')) == [
+        'roll_000003.json', 'roll_000005.json', 'roll_000006.json']
+    meta = json.loads((run_dir / 'roll_000005.json').read_text())
+    assert meta['failed'] and meta['raw_text'] == "roll 5" and meta['stages'] == ['input', 'thresh']
+    assert (run_dir / 'roll_000005_input.png').exists()
+    assert sink.stats()['saved'] == 3 and sink.stats()['pending_bytes'] == 0
+
+
+def test_rolls_beyond_the_memory_budget_are_dropped(tmp_path):
+    sink = DebugSink(base_dir=str(tmp_path), on_failure=True, max_mb=1)
+    assert _roll(sink, 1, failed=True)
+    # 5 MB of stages do not fit next to what is waiting for the writer
+    assert not _roll(sink, 2, failed=True, size=(1000, 1000))
+    sink.close()
+    assert sink.stats()['saved'] == 1 and sink.stats()['dropped'] == 1
+
+    # Nothing is copied for rolls that can not be kept
+    sampled = DebugSink(base_dir=str(tmp_path), every=10)
+    sampled.begin_roll(3)
+    assert not sampled.recording
@@ -0,0 +1,49 @@
+import pytest
+
+from ..utils.delay_tuner import MIN_ACTION_DELAY, DelayTuner
+
+
+def _wait(elapsed, timed_out=False, changed=True):
+    return {'elapsed': elapsed, 'polls': 1, 'timed_out': timed_out, 'changed': changed}
+
+
+def test_only_adaptive_delays_get_a_tuner_and_saved_profiles_are_clamped():
+    assert DelayTuner.from_settings({'action': 0.5, 'parse': 1.5}) is None
+
+    tuner = DelayTuner.from_settings({'action': 0.5, 'parse': 1.5, 'adaptive': True},
+                                     {'action': 0.2, 'parse': 3.0, 'rolls': 40, 'failures': 2})
+    assert (tuner.action, tuner.parse) == (0.2, 1.5)
+    assert (tuner.rolls, tuner.failures) == (40, 2)
+
+
+def test_clean_rolls_shrink_and_failures_back_off():
+    tuner = DelayTuner(action=0.5, parse=1.5, max_action=0.5, max_parse=1.5, step=0.1)
+    for _ in range(3):
+        tuner.update(True)
+    assert tuner.action == pytest.approx(0.2) and tuner.parse == pytest.approx(1.2)
+
+    for _ in range(10):
+        tuner.update(True)
+    assert tuner.action == MIN_ACTION_DELAY
+
+    tuner.update(False)
+    assert tuner.action == pytest.approx(MIN_ACTION_DELAY * 1.5)
+    for _ in range(10):
+        tuner.update(False)
+    assert (tuner.action, tuner.parse) == (0.5, 1.5)
+    assert tuner.profile()['failures'] == 11
+
+
+def test_timeouts_stay_above_the_settle_times():
+    tuner = DelayTuner(action=0.5, parse=1.5, max_action=0.5, max_parse=1.5, step=0.1, margin=1.5)
+    for _ in range(20):
+        tuner.update(True, result_wait=_wait(0.6), dialog_waits=[_wait(0.1), _wait(0.2)])
+    assert tuner.action == pytest.approx(0.3) and tuner.parse == pytest.approx(0.9)
+
+    # A result that settled too late only backs off the parse delay
+    tuner.update(True, result_wait=_wait(0.9, timed_out=True))
+    assert tuner.action == pytest.approx(0.3) and tuner.parse == pytest.approx(1.35)
+
+    # No new result at all: the input was dropped
+    tuner.update(True, result_wait=_wait(1.35, timed_out=True, changed=False))
+    assert tuner.action == pytest.approx(0.45) and tuner.parse == 1.5
@@ -0,0 +1,18 @@
+from ..utils.flame_result import FlameResult
+
+
+def test_meets_requires_every_thresholded_stat():
+    result = FlameResult(stats={'STR': 28, 'DEX': 60, 'STATS%': 5})
+
+    assert result.meets({'STR': 20, 'STATS%': 5})
+    assert not result.meets({'STR': 30})
+    assert not result.meets({'LUK': 1})
+
+
+def test_display_is_rendered_from_the_fields():
+    result = FlameResult(stats={'INT': 88, 'STATS%': 6}, attack_increase=-8702395, raw_text="raw")
+
+    assert result.format_display() == (
+        "Extracted Stats:\nINT: 88\nAll Stats: 6%\nAttack Increase: -8702395\n\nRaw OCR text:\nraw"
+    )
+    assert result.to_dict()['stats'] == {'INT': 88, 'STATS%': 6}
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from ..utils.flame_simulator import STATS, FlameSimulator, resolve_flame_type, rolls_needed_percentile
+
+
+def exact_probability(simulator, stat, value):
+    """Probability from enumerating every outcome with its odds"""
+    odds = np.diff(np.concatenate(([0.0], simulator.tuple_cdf)))
+    totals = simulator._table(stat).reshape(len(simulator.line_sets), len(odds))
+    return float(((totals >= value) * odds).sum() / len(simulator.line_sets))
+
+
+@pytest.mark.parametrize("boss_item", [True, False])
+def test_monte_carlo_matches_exact_probability(boss_item):
+    simulator = FlameSimulator('Powerful Rebirth Flame', item_level=150, boss_item=boss_item, seed=1)
+    exact = exact_probability(simulator, 'STR', 40)
+
+    estimate = simulator.estimate({'STR': 40}, rolls=2_000_000)
+    assert abs(estimate['probability'] - exact) < 5 * estimate['std_error']
+
+
+def test_non_boss_lines_are_equally_likely():
+    # Every line must be equally likely to appear, whatever its index
+    simulator = FlameSimulator('Eternal Rebirth Flame', boss_item=False, seed=2)
+    odds = np.diff(np.concatenate(([0.0], simulator.tuple_cdf)))
+    present = np.zeros(len(simulator.lines))
+    for line_set in simulator.line_sets:
+        for position, line in enumerate(line_set):
+            present[line] += odds[simulator.tier_tuples[:, position] > 0].sum()
+    assert np.allclose(present, present[0])
+
+
+def test_simulated_values_use_item_level():
+    simulator = FlameSimulator('Eternal Rebirth Flame', item_level=200, boss_item=True, seed=3)
+    totals = simulator.simulate(10_000, stats=('STR', 'STATS%'))
+    # A single STR line at tier 7 is worth 7 * (200 // 20 + 1)
+    assert totals[:, 0].max() <= 7 * 11 + 3 * 7 * 6
+    assert totals[:, 1].max() <= 7
+    assert totals.min() >= 0
+
+
+def test_weapon_lines_add_a_percentage_of_base_attack():
+    weapon = FlameSimulator('Eternal Rebirth Flame', item_level=160, boss_item=True, weapon=True,
+                            base_attack=200, seed=4)
+    names = [name for name, _, _ in weapon.lines]
+    assert 'SPEED' not in names and 'Jump' not in names
+    assert 'Boss Damage' in names
+
+    # Tier 3 at level 160 is 3.63% * 5 of the base attack, rounded up
+    wa = weapon.values[names.index('WA'), STATS.index('WA')]
+    assert wa[3] == 37
+    assert list(wa) == sorted(wa)
+    totals = weapon.simulate(20_000, stats=('WA',))
+    assert totals.max() <= wa[-1]
+
+    # Armor attack lines are the tier itself
+    armor = FlameSimulator('Eternal Rebirth Flame', item_level=160, boss_item=True, seed=4)
+    assert armor.simulate(20_000, stats=('WA',)).max() <= 7
+    exact = exact_probability(weapon, 'WA', 50)
+    estimate = weapon.estimate({'WA': 50}, rolls=1_000_000)
+    assert abs(estimate['probability'] - exact) < 5 * estimate['std_error']
+
+
+def test_weapon_attack_needs_the_base_attack():
+    simulator = FlameSimulator(weapon=True)
+    with pytest.raises(ValueError):
+        simulator.estimate({'WA': 10})
+    assert simulator.estimate({'STR': 10}, rolls=1000)['simulated'] == 1000
+
+
+def test_resolve_flame_type_aliases():
+    assert resolve_flame_type('Res/Rainbow Flame') == 'Eternal Rebirth Flame'
+    assert resolve_flame_type(None) == 'Eternal Rebirth Flame'
+    with pytest.raises(ValueError):
+        resolve_flame_type('Blue Flame')
+
+
+def test_rolls_needed_percentile():
+    assert rolls_needed_percentile(0.0, 0.5) is None
+    assert rolls_needed_percentile(0.5, 0.5) == 1
+    assert rolls_needed_percentile(0.01, 0.99) == 459
@@ -0,0 +1,47 @@
+import numpy as np
+
+from ..utils.frame_watcher import FrameWatcher
+
+
+class FakeShot:
+    """Minimal stand-in for an mss ScreenShot"""
+
+    def __init__(self, value):
+        self.width = 16
+        self.height = 8
+        self.raw = bytearray(np.full((8, 16, 4), value, dtype=np.uint8).tobytes())
+        self.value = value
+
+
+class ScriptedWatcher(FrameWatcher):
+    """FrameWatcher that replays a scripted sequence of frames"""
+
+    def __init__(self, values, **kwargs):
+        super().__init__(poll_interval=0, **kwargs)
+        self.frames = [FakeShot(v) for v in values]
+
+    def grab(self, monitor):
+        if len(self.frames) > 1:
+            return self.frames.pop(0)
+        return self.frames[0]
+
+
+def test_returns_once_changed_and_settled():
+    """The settled frame after a change is returned without waiting for the timeout"""
+    watcher = ScriptedWatcher([10, 10, 200, 120, 60, 60, 60, 60, 60], settle_frames=3)
+    baseline = watcher.signature(FakeShot(10))
+
+    shot = watcher.wait_for_result({}, baseline, timeout=5)
+
+    assert shot is not None and shot.value == 60
+    assert watcher.last_wait['timed_out'] is False
+
+
+def test_times_out_without_change():
+    """An unchanged region falls back to the timeout"""
+    watcher = ScriptedWatcher([10])
+    baseline = watcher.signature(FakeShot(10))
+
+    assert watcher.wait_for_result({}, baseline, timeout=0.05) is None
+    assert watcher.last_wait['timed_out'] is True
+    assert watcher.last_wait['changed'] is False
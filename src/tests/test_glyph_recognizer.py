@@ -0,0 +1,65 @@
+import glob
+import os
+
+from PIL import Image
+
+from ..tools.ocr_benchmark import load_labels, score_result, split_images
+from ..utils.flame_processor import FlameProcessor
+from ..utils.glyph_recognizer import GlyphRecognizer
+
+SCREENSHOTS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'test_screenshots')
+
+
+def _load(filename):
+    return Image.open(os.path.join(SCREENSHOTS_DIR, filename)).convert('RGB')
+
+
+def test_recognizes_result_panel():
+    """The shipped atlas reads a held-out result panel and the owned counter exactly"""
+    recognizer = GlyphRecognizer()
+    assert recognizer.is_available()
+
+    text, confidence = recognizer.recognize(_load('flame_region_20250408_165411.png'))
+
+    assert confidence >= recognizer.min_confidence
+    assert text.split('\n') == [
+        'Currently owned: 58',
+        'STR : +28',
+        'DEX : +60',
+        'INT : +88',
+        'MaxHP : +3500',
+        'Attack Increase: -8702395',
+        'CP Increase: -20133028',
+    ]
+
+
+def test_low_confidence_without_panel():
+    """Captures that miss the flame window are left to the OCR fallback"""
+    recognizer = GlyphRecognizer()
+
+    assert recognizer.read(_load('flame_region_20250408_162502.png')) is None
+
+
+def test_held_out_crops_are_read_without_ocr():
+    """Crops the atlas was not built from are read by the glyph path, every labelled field right"""
+    labels = load_labels(os.path.join(SCREENSHOTS_DIR, 'labels.json'))
+    processor = FlameProcessor()
+    held_out = split_images(sorted(glob.glob(os.path.join(SCREENSHOTS_DIR, 'flame_region_*.png'))), 'held-out')
+
+    read = 0
+    for path in held_out:
+        label = labels[os.path.basename(path)]
+        if not label['stats']:
+            continue
+        result = processor.parse_flame_results(_load(os.path.basename(path)))
+        hits, spurious = score_result(label, result.to_dict())
+        assert result.source == 'glyph', path
+        assert all(hits.values()) and not spurious, (path, hits, spurious)
+        read += 1
+    assert read >= 20
+
+
+def test_all_stats_glyphs_are_in_the_atlas():
+    """'All Stats' lines need A, l and %; G completes the capitals of the stat names"""
+    recognizer = GlyphRecognizer()
+    assert {'A', 'G', '%'} <= set(recognizer.labels)
@@ -0,0 +1,42 @@
+import json
+import logging
+
+from ..utils.log_config import LOG_FILENAME, setup_logging, shutdown_logging
+
+
+class Unformattable:
+    """Fails the test if a disabled debug call formats its arguments"""
+
+    def __str__(self):
+        raise AssertionError("formatted below the log level")
+
+
+def test_records_are_written_as_json_lines(tmp_path, monkeypatch):
+    monkeypatch.delenv('FLAME_LOG_LEVEL', raising=False)
+    setup_logging({'level': 'INFO', 'console': False, 'dir': str(tmp_path)})
+    try:
+        logger = logging.getLogger('src.tests.logging')
+        logger.debug("skipped %s", Unformattable())
+        logger.info("Attempt %d/%d", 3, 10, extra={'attempt': 3})
+        try:
+            raise ValueError("bad roll")
+        except ValueError:
+            logger.exception("Error in click sequence")
+    finally:
+        shutdown_logging()
+
+    entries = [json.loads(line) for line in (tmp_path / LOG_FILENAME).read_text().splitlines()]
+    assert [entry['level'] for entry in entries] == ['INFO', 'ERROR']
+    assert entries[0]['message'] == "Attempt 3/10"
+    assert entries[0]['attempt'] == 3 and entries[0]['logger'] == 'src.tests.logging'
+    assert 'ValueError: bad roll' in entries[1]['exception']
+
+
+def test_level_can_be_overridden_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('FLAME_LOG_LEVEL', 'debug')
+    setup_logging({'level': 'WARNING', 'console': False, 'dir': str(tmp_path)})
+    try:
+        logging.getLogger('src.tests.logging').debug("roll %s", 1)
+    finally:
+        shutdown_logging()
+    assert json.loads((tmp_path / LOG_FILENAME).read_text())['message'] == "roll 1"
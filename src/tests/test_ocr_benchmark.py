@@ -0,0 +1,34 @@
+from ..tools.ocr_benchmark import percentile, score_result
+
+
+def test_score_result():
+    """Parsed results are scored per field against the golden label"""
+    label = {
+        'stats': {'STR': 28, 'DEX': 60, 'STATS%': 5},
+        'attack_increase': -8702395,
+        'cp_increase': None,
+    }
+    result = {
+        'stats': {'STR': 28, 'DEX': 66, 'STATS%': '5%', 'LUK': 12},
+        'attack_increase': -8702395,
+        'cp_increase': -20133028,
+    }
+
+    hits, spurious = score_result(label, result)
+
+    assert hits == {'STR': True, 'DEX': False, 'STATS%': True, 'attack_increase': True}
+    assert spurious == ['LUK', 'cp_increase']
+
+
+def test_score_result_failed_parse():
+    """A failed parse counts every labelled field as wrong"""
+    hits, spurious = score_result({'stats': {'INT': 60}}, None)
+
+    assert hits == {'INT': False}
+    assert spurious == []
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([0, 10], 90) == 9
@@ -0,0 +1,100 @@
+import sys
+import threading
+import types
+
+import pytest
+
+from .. import flame_processor as easyocr_processor
+from ..utils import flame_processor as tesseract_processor
+from ..utils import tesseract_engine
+from ..utils.tesseract_engine import TesseractEngine
+
+
+@pytest.fixture
+def fresh_reader(monkeypatch):
+    """Reset the process-wide reader state and install a fake easyocr module"""
+    monkeypatch.setattr(easyocr_processor, '_reader', None)
+    monkeypatch.setattr(easyocr_processor, '_warm_done', threading.Event())
+    monkeypatch.setattr(easyocr_processor, '_warm_error', None)
+    monkeypatch.setattr(easyocr_processor, '_warm_thread', None)
+
+    module = types.ModuleType('easyocr')
+    module.created = 0
+    module.loading = threading.Event()
+    module.release = threading.Event()
+    module.release.set()
+
+    class Reader:
+        def __init__(self, langs):
+            module.created += 1
+            module.loading.set()
+            module.release.wait(5)
+
+        def readtext(self, image):
+            return []
+
+    module.Reader = Reader
+    monkeypatch.setitem(sys.modules, 'easyocr', module)
+    return module
+
+
+def _wait_for_warm_up():
+    easyocr_processor._warm_thread.join(5)
+
+
+def test_reader_is_ready_after_warm_up(fresh_reader):
+    assert not easyocr_processor.is_reader_ready()
+    easyocr_processor.warm_up_reader()
+    easyocr_processor.warm_up_reader()
+    _wait_for_warm_up()
+
+    assert easyocr_processor.is_reader_ready()
+    assert easyocr_processor.reader_error() is None
+    assert fresh_reader.created == 1
+
+
+def test_failed_load_is_not_reported_as_ready(fresh_reader):
+    def broken(langs):
+        raise RuntimeError("model download failed")
+
+    fresh_reader.Reader = broken
+    processor = easyocr_processor.FlameProcessor()
+    processor.warm_up()
+    _wait_for_warm_up()
+
+    assert not processor.is_ready()
+    assert processor.load_error() == "model download failed"
+
+
+def test_warm_up_does_not_wait_for_a_reader_being_created(fresh_reader):
+    fresh_reader.release.clear()
+    # A roll is creating the reader and holds the reader lock through the import
+    roll = threading.Thread(target=easyocr_processor.get_reader)
+    roll.start()
+    assert fresh_reader.loading.wait(5)
+
+    caller = threading.Thread(target=easyocr_processor.warm_up_reader)
+    caller.start()
+    caller.join(1)
+    assert not caller.is_alive()
+    assert not easyocr_processor.is_reader_ready()
+
+    fresh_reader.release.set()
+    roll.join(5)
+    _wait_for_warm_up()
+    assert easyocr_processor.is_reader_ready() and fresh_reader.created == 1
+
+
+def test_tesseract_processor_reports_a_missing_executable(monkeypatch):
+    def missing():
+        raise EnvironmentError("tesseract is not installed")
+
+    monkeypatch.setattr(tesseract_engine, 'tesserocr', None)
+    monkeypatch.setattr(tesseract_engine.pytesseract, 'get_tesseract_version', missing)
+    processor = tesseract_processor.FlameProcessor()
+    processor.tesseract_engine = TesseractEngine()
+    processor.warm_up()
+    processor._warm_thread.join(5)
+
+    assert not processor.is_ready()
+    assert processor.load_error() == "tesseract is not installed"
@@ -0,0 +1,132 @@
+import threading
+import time
+import types
+
+from ..backends.fake import FakeInputBackend
+from ..controllers.reroll_engine import RerollEngine
+from ..utils.flame_result import FlameResult
+
+
+class FakeController:
+    """Only what the engine loop needs from MapleStoryController"""
+
+    def check_thresholds(self, results, thresholds):
+        return results.meets(thresholds)
+
+
+class ScriptedEngine(RerollEngine):
+    """RerollEngine that returns scripted results instead of rolling"""
+
+    def __init__(self, values, gate=None):
+        super().__init__(FakeController())
+        self.values = list(values)
+        self.gate = gate
+        self.rolls = 0
+
+    def roll_once(self, settings):
+        if self.gate is not None:
+            self.gate.wait()
+        self.rolls += 1
+        return FlameResult(stats={'STR': self.values.pop(0)})
+
+
+def _drain(engine):
+    events = []
+    while not engine.events.empty():
+        events.append(engine.events.get())
+    return events
+
+
+def test_stops_when_thresholds_are_met():
+    engine = ScriptedEngine([10, 40, 90, 120])
+    engine.start({'tries': 10, 'thresholds': {'STR': 80}, 'history': {'enabled': False}})
+    engine.join(5)
+
+    events = _drain(engine)
+    assert engine.rolls == 3
+    assert [e['attempt'] for e in events if e['type'] == 'result'] == [1, 2, 3]
+    assert events[-1]['type'] == 'finished' and events[-1]['reason'] == 'thresholds_met'
+    assert all('decide' in e['timings'] for e in events if e['type'] == 'result')
+
+
+def test_stop_request_ends_the_loop():
+    gate = threading.Event()
+    engine = ScriptedEngine([0] * 100, gate=gate)
+    engine.start({'tries': 100, 'thresholds': {'STR': 80}, 'history': {'enabled': False}})
+
+    engine.stop()
+    gate.set()
+    engine.join(5)
+
+    assert not engine.is_running
+    assert engine.rolls <= 1
+    assert _drain(engine)[-1]['reason'] == 'stopped'
+
+
+def test_run_finishes_when_the_setup_fails():
+    engine = ScriptedEngine([100])
+    engine.start({'tries': 10, 'thresholds': {'STR': 80}, 'history': {'enabled': False},
+                  'archive': {'codec': 'gif'}})
+    engine.join(5)
+
+    events = _drain(engine)
+    assert engine.rolls == 0
+    assert any(e['type'] == 'status' and 'codec' in e['text'] for e in events)
+    assert events[-1]['type'] == 'finished' and events[-1]['reason'] == 'error'
+
+
+def test_stop_cuts_the_enter_press_short_and_releases_the_key():
+    input_backend = FakeInputBackend()
+    engine = RerollEngine(FakeController(), backends=types.SimpleNamespace(input=input_backend, capture=None))
+    engine.last_waits = {'dialog_waits': []}
+
+    def stop_on_enter(event):
+        if event == ('key_down', 'enter'):
+            engine._stop_event.set()
+
+    input_backend.add_listener(stop_on_enter)
+    start = time.perf_counter()
+    assert not engine._send_inputs(10, 20, action_delay=1.0, detect_dialogs=False)
+
+    assert time.perf_counter() - start < 0.5
+    assert input_backend.count('key_down', 'enter') == 1
+    assert input_backend.count('key_up', 'enter') == 1
+
+
+def test_rolls_are_recorded_in_the_history(tmp_path):
+    engine = ScriptedEngine([10, 90])
+    db_path = str(tmp_path / 'history.db')
+    engine.start({'tries': 5, 'thresholds': {'STR': 80}, 'item': 'Hat', 'history': {'path': db_path}})
+    engine.join(5)
+
+    rolls = engine.history.query_rolls(item='Hat')
+    assert [(roll['attempt'], roll['stats']['STR'], roll['met']) for roll in rolls] == [(1, 10, 0), (2, 90, 1)]
+    assert rolls[0]['timings']['roll'] >= 0
+
+
+def test_stop_condition_is_checked_with_the_thresholds():
+    engine = ScriptedEngine([10, 40, 90, 120])
+    engine.start({'tries': 10, 'thresholds': {'STR': 20}, 'stop_condition': 'STR * 2 >= 200',
+                  'history': {'enabled': False}})
+    engine.join(5)
+
+    assert engine.rolls == 4
+    assert _drain(engine)[-1]['reason'] == 'thresholds_met'
+
+
+def test_adaptive_delays_learn_from_each_roll():
+    class WaitingEngine(ScriptedEngine):
+        def roll_once(self, settings):
+            # As if the inputs were sent with the delays from the tuner
+            self.last_waits = {'result_wait': None, 'dialog_waits': []}
+            return super().roll_once(settings)
+
+    engine = WaitingEngine([10, 20, 20, 30])
+    engine.start({'tries': 4, 'thresholds': {'STR': 80}, 'history': {'enabled': False},
+                  'delays': {'action': 0.5, 'parse': 1.5, 'adaptive': True, 'step': 0.1}})
+    engine.join(5)
+
+    # The repeated 20 is counted as a dropped input
+    profile = _drain(engine)[-1]['delay_profile']
+    assert (profile['rolls'], profile['failures']) == (4, 1)
+    assert profile['parse'] < 1.5
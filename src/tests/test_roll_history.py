@@ -0,0 +1,36 @@
+from ..utils.flame_result import FlameResult
+from ..utils.roll_history import RollHistory
+
+
+def test_rolls_are_batched_and_queryable(tmp_path):
+    history = RollHistory(str(tmp_path / 'history.db'), batch_size=3, flush_interval=3600)
+    session = history.start_session(item='Arcane Umbra Bow', settings={'tries': 10})
+
+    for attempt, value in enumerate([20, 44, 36], start=1):
+        result = FlameResult(stats={'INT': value, 'STATS%': 4}, source='glyph', confidence=1.0)
+        history.record_roll(session, attempt, result, timings={'ocr': 2.0, 'roll': 900.0},
+                            item='Arcane Umbra Bow', timestamp=1000.0 + attempt)
+        if attempt < 3:
+            # Nothing is committed until the batch is full
+            assert history.conn.execute("SELECT COUNT(*) FROM rolls").fetchone()[0] == 0
+
+    assert history.conn.execute("SELECT COUNT(*) FROM rolls").fetchone()[0] == 3
+
+    rolls = history.query_rolls(item='Arcane Umbra Bow', since=1002.0)
+    assert [roll['attempt'] for roll in rolls] == [2, 3]
+    assert rolls[0]['stats'] == {'INT': 44, 'STATS%': 4}
+    assert rolls[0]['timings'] == {'ocr': 2.0, 'roll': 900.0}
+
+    summary = history.session_summary(session)
+    assert summary['rolls'] == 3 and summary['best']['INT'] == 44
+    history.end_session(session, 'max_tries')
+    history.close()
+
+
+def test_uses_wal_and_indexes(tmp_path):
+    history = RollHistory(str(tmp_path / 'history.db'))
+
+    assert history.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    indexes = {row[1] for row in history.conn.execute("PRAGMA index_list(rolls)")}
+    assert {'idx_rolls_session', 'idx_rolls_item', 'idx_rolls_timestamp'} <= indexes
+    history.close()
@@ -0,0 +1,60 @@
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from ..backends.base import Frame, frame_array
+from ..utils.screenshot_archiver import ScreenshotArchiver
+
+
+def test_names_are_unique_and_ordered(tmp_path):
+    archiver = ScreenshotArchiver(base_dir=str(tmp_path))
+    image = Image.new('RGB', (8, 4))
+
+    paths = [archiver.submit(image) for _ in range(5)]
+    archiver.close()
+
+    assert len(set(paths)) == 5
+    assert [os.path.basename(p) for p in paths] == sorted(os.path.basename(p) for p in paths)
+    assert all(os.path.exists(p) for p in paths)
+    assert archiver.stats()['written'] == 5
+
+
+def test_raw_codec_round_trips_pixels(tmp_path):
+    archiver = ScreenshotArchiver(base_dir=str(tmp_path), codec='raw')
+    pixels = np.arange(4 * 8 * 3, dtype=np.uint8).reshape(4, 8, 3)
+
+    path = archiver.submit(pixels)
+    archiver.close()
+
+    assert path.endswith('.npy')
+    assert np.array_equal(np.load(path), pixels)
+
+
+def test_bgra_grabs_are_saved_as_rgb(tmp_path):
+    rgb = np.arange(4 * 8 * 3, dtype=np.uint8).reshape(4, 8, 3)
+    grab = frame_array(Frame.from_array(rgb))
+    png = ScreenshotArchiver(base_dir=str(tmp_path / 'png'))
+    raw = ScreenshotArchiver(base_dir=str(tmp_path / 'raw'), codec='raw')
+
+    png_path, raw_path = png.submit(grab), raw.submit(grab)
+    png.close()
+    raw.close()
+
+    assert np.array_equal(np.asarray(Image.open(png_path)), rgb)
+    assert np.array_equal(np.load(raw_path), rgb)
+
+
+def test_drop_policy_never_blocks_the_caller(tmp_path):
+    archiver = ScreenshotArchiver(base_dir=str(tmp_path), max_queue=1, policy='drop')
+    gate = threading.Event()
+    encode = archiver._encode
+    archiver._encode = lambda path, image: (gate.wait(), encode(path, image))
+
+    results = [archiver.submit(Image.new('RGB', (8, 4))) for _ in range(4)]
+    gate.set()
+    archiver.close()
+
+    assert results.count(None) == archiver.dropped >= 1
+    assert archiver.written == 4 - archiver.dropped
@@ -0,0 +1,167 @@
+import numpy as np
+
+from ..backends.base import frame_array
+from ..backends.simulator import ANIMATING, CONFIRMATION, IDLE, OPENING, GameSimulator, create_simulator_backends
+from ..controllers.reroll_engine import RerollEngine
+from ..utils.flame_processor import FlameProcessor
+from ..utils.flame_result import FlameResult
+from ..utils.glyph_recognizer import find_result_panel
+from ..utils.ui_state_detector import UIStateDetector
+from ..utils.window_tracker import WindowTracker, capture_monitor, click_position
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_simulator_rolls_after_click_and_two_confirmations():
+    clock = ManualClock()
+    simulator = GameSimulator(dialog_latency=0.1, animation_latency=0.5, seed=0, clock=clock)
+    first = simulator.current
+    left, top, right, bottom = simulator.button_box
+
+    # Clicks next to the button and Enter without a dialog do nothing
+    assert not simulator.click(right + 5, top)
+    assert not simulator.press('enter')
+    assert simulator.click(left + 1, top + 1)
+    assert simulator.state() == OPENING
+
+    # Enter before the dialog is up is dropped, like the game does
+    assert not simulator.press('enter')
+    clock.now = 0.1
+    assert simulator.state() == CONFIRMATION
+    assert simulator.press('enter')
+    clock.now = 0.2
+    assert simulator.press('enter')
+    assert simulator.state() == ANIMATING
+
+    clock.now = 0.7
+    assert simulator.state() == IDLE
+    assert simulator.rolls == 1 and simulator.ignored == 3
+    assert simulator.current is not first
+
+
+def test_simulator_screens_match_the_assets():
+    clock = ManualClock()
+    simulator = GameSimulator(dialog_latency=0.0, seed=0, clock=clock)
+    backends = create_simulator_backends(simulator)
+    layout = simulator.settings_layout()
+    client = backends.window.client
+
+    # The settings layout points at the button and the flame window
+    x, y = click_position(client, layout['reroll_position'])
+    left, top, right, bottom = simulator.button_box
+    assert left <= x - client[0] < right and top <= y - client[1] < bottom
+    monitor = capture_monitor(client, layout['capture_region'])
+    assert (monitor['width'], monitor['height']) == (simulator.flame_box[2] - simulator.flame_box[0],
+                                                     simulator.flame_box[3] - simulator.flame_box[1])
+    shot = backends.capture.grab(monitor)
+    pixels = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    assert find_result_panel(np.ascontiguousarray(pixels[..., 2::-1])) is not None
+
+    detector = UIStateDetector(capture=backends.capture)
+    detector.set_client_rect(client)
+    assert detector.current_state() == 'reroll'
+    backends.input.click(x, y)
+    assert detector.detect('confirmation') is not None
+
+    # The RESULT header is gone while the flame plays and back with the new result
+    assert detector.detect('result', full_search=True) is not None
+    backends.input.key_down('enter')
+    backends.input.key_down('enter')
+    assert simulator.state() == ANIMATING
+    assert detector.detect('result', full_search=True) is None
+    clock.now = 1.0
+    assert detector.detect('result', full_search=True) is not None
+
+
+def test_simulated_results_are_read_by_the_glyph_recognizer():
+    clock = ManualClock()
+    simulator = GameSimulator(dialog_latency=0.0, animation_latency=0.0, seed=1, clock=clock)
+    backends = create_simulator_backends(simulator)
+    monitor = capture_monitor(backends.window.client, simulator.settings_layout()['capture_region'])
+    processor = FlameProcessor()
+    left, top, _, _ = simulator.button_box
+
+    for _ in range(5):
+        result = processor.parse_flame_results(frame_array(backends.capture.grab(monitor)))
+        assert result.source == 'glyph'
+        assert result.stats == simulator.current['stats']
+        assert result.attack_increase == simulator.current['attack_increase']
+        assert result.cp_increase == simulator.current['cp_increase']
+        assert result.currently_owned == simulator.current['currently_owned']
+
+        simulator.click(left + 1, top + 1)
+        simulator.press('enter')
+        simulator.press('enter')
+        clock.now += 1.0
+        assert simulator.state() == IDLE
+
+
+class SimulatedController:
+    """What the engine needs from MapleStoryController, reading results from the simulator"""
+
+    def __init__(self, backends, simulator):
+        self.backends = backends
+        self.simulator = simulator
+        self.window_tracker = WindowTracker(backends.window)
+        self.flame_processor = self
+
+    def parse_flame_results(self, image):
+        return FlameResult(stats=dict(self.simulator.current['stats']))
+
+    def check_thresholds(self, results, thresholds):
+        return results.meets(thresholds)
+
+
+def test_engine_rolls_on_the_simulator(tmp_path):
+    simulator = GameSimulator(dialog_latency=0.03, animation_latency=0.1, seed=0)
+    backends = create_simulator_backends(simulator)
+    engine = RerollEngine(SimulatedController(backends, simulator))
+
+    settings = {
+        'tries': 3,
+        'thresholds': {'STR': 1_000_000},
+        'delays': {'parse': 2.0, 'action': 1.0, 'wait_for_change': True, 'wait_for_dialogs': True},
+        'archive': {'base_dir': str(tmp_path / 'archive')},
+        'history': {'enabled': False},
+    }
+    settings.update(simulator.settings_layout())
+    engine.start(settings)
+    engine.join(30)
+
+    # Every input landed while the game was ready for it
+    assert simulator.rolls == 3
+    assert simulator.ignored == 0
+    assert simulator.stats()['rolls_per_minute'] > 0
+
+
+def test_engine_clicks_the_button_where_it_is_detected(tmp_path):
+    simulator = GameSimulator(dialog_latency=0.03, animation_latency=0.1, seed=0)
+    backends = create_simulator_backends(simulator)
+    engine = RerollEngine(SimulatedController(backends, simulator))
+
+    settings = {
+        'tries': 2,
+        'thresholds': {'STR': 1_000_000},
+        'delays': {'parse': 2.0, 'action': 1.0, 'wait_for_change': True, 'wait_for_dialogs': True},
+        'archive': {'base_dir': str(tmp_path / 'archive')},
+        'history': {'enabled': False},
+    }
+    settings.update(simulator.settings_layout())
+    # A saved position next to the button, as after the window was resized
+    width = simulator.client_size[0]
+    settings['reroll_position'] = dict(settings['reroll_position'], x=(simulator.button_box[2] + 20) / width)
+    engine.start(settings)
+    engine.join(30)
+
+    assert simulator.rolls == 2
+    assert simulator.ignored == 0
+    left, top = backends.window.client[:2]
+    clicks = [event for event in backends.input.events if event[0] == 'click']
+    assert all(simulator.button_box[0] <= x - left < simulator.button_box[2] and
+               simulator.button_box[1] <= y - top < simulator.button_box[3] for _, x, y, _ in clicks)
@@ -0,0 +1,35 @@
+import pytest
+
+from ..utils.flame_result import FlameResult
+from ..utils.stop_condition import StopCondition, compile_score
+
+
+def _roll(**stats):
+    stats = {('STATS%' if stat == 'ALL' else stat): value for stat, value in stats.items()}
+    return FlameResult(stats=stats, attack_increase=3)
+
+
+def test_weighted_score_and_groups():
+    condition = StopCondition("STR + 10 * All% >= 120 or (DEX >= 60 and not WA < 3)")
+    assert condition(_roll(STR=60, ALL=6))
+    assert not condition(_roll(STR=60, ALL=5))
+    assert condition(_roll(DEX=60, WA=3))
+    assert not condition(_roll(DEX=60, WA=2))
+    assert not condition(None)
+
+
+def test_class_presets_and_missing_stats():
+    score = compile_score("score(thief)")
+    assert score(_roll(LUK=50, DEX=24, WA=2, ALL=3)) == 50 + 2 + 8 + 30
+    # A stat that was not rolled counts as 0
+    assert StopCondition("score(magician) >= 40")(_roll(INT=40))
+    assert StopCondition("attack >= 3 and cp >= 0")(_roll())
+
+
+@pytest.mark.parametrize("expression", [
+    "", "STR", "STR >= ", "FOO > 1", "STR / DEX > 1", "STR / 0 > 1", "score(pirate_luk) > 1",
+    "(STR > 1) + 2 > 1", "STR $ 3", "STR >= 1)",
+])
+def test_invalid_expressions_raise(expression):
+    with pytest.raises(ValueError):
+        StopCondition(expression)
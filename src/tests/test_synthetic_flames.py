@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+from ..tools import generate_flames
+from ..utils.flame_processor import FlameProcessor
+from ..utils.glyph_recognizer import (GlyphRecognizer, build_atlas, find_result_panel, label_lines, owned_line,
+                                      segment_lines)
+from ..utils.synthetic_flames import FlameRenderer, random_flame, stat_line_text
+
+LABEL = {
+    'stats': {'DEX': 42, 'INT': 48, 'LUK': 102, 'MaxMP': 4200},
+    'attack_increase': -9499328,
+    'cp_increase': 22177940,
+    'currently_owned': 76,
+}
+
+
+def test_random_flame_labels():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        label = random_flame(rng)
+        assert 1 <= len(label['stats']) <= 4
+        assert label['attack_increase'] is not None and label['cp_increase'] is not None
+        for stat in ('MaxHP', 'MaxMP'):
+            if stat in label['stats']:
+                assert label['stats'][stat] % 300 == 0
+
+    assert stat_line_text('DEX', 42) == "DEX : +42"
+    assert stat_line_text('STATS%', 5) == "All Stats : +5%"
+
+
+def test_render_has_the_result_panel_layout():
+    renderer = FlameRenderer()
+    for scale in (1.0, 1.5):
+        image = renderer.render(LABEL, np.random.default_rng(0), scale=scale, jitter=1, noise=3)
+        panel = find_result_panel(np.asarray(image))
+        assert panel is not None
+        _, lines = segment_lines(panel)
+        # Four stat lines plus the attack and CP increase lines
+        assert len(lines) == 6
+
+
+def test_renders_are_read_with_the_shipped_atlas():
+    renderer = FlameRenderer()
+    processor = FlameProcessor()
+    rng = np.random.default_rng(2)
+    weapon = {'stats': {'WA': 12, 'MA': 9, 'STATS%': 6}, 'attack_increase': 51, 'cp_increase': -1,
+              'currently_owned': 0}
+
+    for label in [LABEL, weapon] + [random_flame(rng) for _ in range(30)]:
+        result = processor.parse_flame_results(renderer.render(label, rng, jitter=1, noise=3))
+        assert result.source == 'glyph'
+        assert result.stats == label['stats']
+        assert (result.attack_increase, result.cp_increase, result.currently_owned) == \
+            (label['attack_increase'], label['cp_increase'], label['currently_owned'])
+
+
+def test_atlas_built_from_renders_reads_renders():
+    renderer = FlameRenderer()
+    rng = np.random.default_rng(1)
+    recognizer = GlyphRecognizer(atlas_path=None)
+    recognizer.set_atlas(*build_atlas([renderer.generate(rng) for _ in range(100)]))
+
+    text = recognizer.read(renderer.render(LABEL, rng, jitter=1))
+    assert text is not None
+    assert text.replace(' ', '').split('\n') == [owned_line(LABEL)] + label_lines(LABEL)
+
+
+def test_generate_writes_images_and_labels(tmp_path):
+    out = tmp_path / "synthetic"
+    labels = generate_flames.generate(str(out), 7, seed=3, jitter=1, noise=2)
+
+    files = sorted(path.name for path in out.glob("flame_region_synth_*.png"))
+    assert files == sorted(labels) and len(files) == 7
+    with open(out / "labels.json") as f:
+        assert json.load(f) == labels
+
+    # The same seed gives the same labels
+    assert generate_flames.generate(str(tmp_path / "again"), 7, seed=3, jitter=1, noise=2) == labels
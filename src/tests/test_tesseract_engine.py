@@ -0,0 +1,159 @@
+import glob
+import os
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ..utils import tesseract_engine
+from ..utils.flame_processor import FlameProcessor
+from ..utils.tesseract_engine import TesseractEngine
+
+SCREENSHOTS = os.path.join(os.path.dirname(__file__), '..', '..', 'test_screenshots')
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    """Install a fake tesserocr module whose handles record their calls"""
+    module = types.SimpleNamespace(PSM=int, OEM=int, handles=[])
+
+    class PyTessBaseAPI:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.images = []
+            self.resolution = None
+            self.ended = False
+            module.handles.append(self)
+
+        def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+            assert len(data) == height * bytes_per_line
+            self.images.append((width, height, bytes_per_pixel))
+
+        def SetSourceResolution(self, dpi):
+            self.resolution = dpi
+
+        def GetUTF8Text(self):
+            return f"{self.images[-1][0]}x{self.images[-1][1]}"
+
+        def Clear(self):
+            pass
+
+        def End(self):
+            self.ended = True
+
+    module.PyTessBaseAPI = PyTessBaseAPI
+    monkeypatch.setattr(tesseract_engine, 'tesserocr', module)
+    return module
+
+
+def test_handles_are_created_lazily_and_reused(fake_tesserocr):
+    engine = TesseractEngine(pool_size=2, psm=6, oem=3)
+
+    assert engine.image_to_string(np.zeros((8, 20), dtype=np.uint8)) == '20x8'
+    assert engine.image_to_string(Image.new('RGB', (30, 10))) == '30x10'
+
+    # One caller at a time only ever needs one handle
+    assert len(fake_tesserocr.handles) == 1
+    handle = fake_tesserocr.handles[0]
+    assert handle.kwargs == {'lang': 'eng', 'psm': 6, 'oem': 3}
+    assert handle.images == [(20, 8, 1), (30, 10, 3)]
+    assert handle.resolution == tesseract_engine.DEFAULT_DPI
+
+
+def test_concurrent_callers_share_a_bounded_pool(fake_tesserocr):
+    engine = TesseractEngine(pool_size=2)
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+    original = fake_tesserocr.PyTessBaseAPI.GetUTF8Text
+
+    def slow_text(self):
+        with lock:
+            in_use.append(self)
+            peak.append(len(in_use))
+        time.sleep(0.01)
+        with lock:
+            in_use.remove(self)
+        return original(self)
+
+    fake_tesserocr.PyTessBaseAPI.GetUTF8Text = slow_text
+    image = np.zeros((4, 4), dtype=np.uint8)
+    threads = [threading.Thread(target=lambda: [engine.image_to_string(image) for _ in range(5)])
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(fake_tesserocr.handles) == 2
+    assert max(peak) <= 2
+    assert sum(len(handle.images) for handle in fake_tesserocr.handles) == 30
+
+
+def test_warm_up_fills_the_pool(fake_tesserocr):
+    engine = TesseractEngine(pool_size=3)
+    engine.warm_up()
+    engine.warm_up()
+
+    assert len(fake_tesserocr.handles) == 3
+    assert engine.error is None
+
+
+def test_close_ends_idle_handles_and_handles_returned_later(fake_tesserocr):
+    engine = TesseractEngine(pool_size=2)
+    engine.warm_up()
+    idle, busy = fake_tesserocr.handles
+
+    with engine._acquire() as handle:
+        engine.close()
+        assert engine._handles.qsize() == 0
+        assert not handle.ended
+
+    assert idle.ended and busy.ended
+    # Not put back in the pool
+    assert engine._handles.qsize() == 0
+    assert not engine.is_available()
+
+
+def test_closing_wakes_callers_waiting_for_a_handle(fake_tesserocr):
+    engine = TesseractEngine(pool_size=1)
+    errors = []
+
+    def wait_for_handle():
+        try:
+            with engine._acquire():
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+
+    with engine._acquire():
+        waiter = threading.Thread(target=wait_for_handle)
+        waiter.start()
+        engine.close()
+        waiter.join(2)
+
+    assert not waiter.is_alive()
+    assert len(errors) == 1
+
+
+def test_matches_pytesseract():
+    """tesserocr reads the preprocessed crops like the pytesseract subprocess does"""
+    pytest.importorskip('tesserocr')
+    try:
+        tesseract_engine.pytesseract.get_tesseract_version()
+    except Exception:
+        pytest.skip("tesseract executable not installed")
+
+    processor = FlameProcessor()
+    engine = TesseractEngine(pool_size=1)
+    try:
+        for path in sorted(glob.glob(os.path.join(SCREENSHOTS, '*.png')))[:10]:
+            with Image.open(path) as image:
+                processed = processor._preprocess_image(image.convert('RGB'))
+            expected = tesseract_engine.pytesseract.image_to_string(processed, config='--psm 6 --oem 3')
+            assert engine.image_to_string(processed).strip() == expected.strip(), path
+    finally:
+        engine.close()
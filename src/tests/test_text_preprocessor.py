@@ -0,0 +1,82 @@
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from ..backends.base import Frame
+from ..flame_processor import FlameProcessor
+from ..utils.debug_sink import DebugSink
+from ..utils.glyph_recognizer import INK_THRESHOLD
+from ..utils.text_preprocessor import BlueTextPreprocessor
+
+SCREENSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              'test_screenshots')
+SCREENSHOT = os.path.join(SCREENSHOT_DIR, 'flame_region_20250408_163014.png')
+
+
+def test_bgra_grab_and_pil_image_give_the_same_result():
+    image = Image.open(SCREENSHOT).convert('RGB')
+    preprocessor = BlueTextPreprocessor()
+
+    from_pil = preprocessor(image).copy()
+    from_frame = preprocessor(Frame.from_image(image))
+    assert from_frame.shape == (image.height * 3, image.width * 3)
+    assert np.array_equal(from_pil, from_frame)
+
+
+def test_buffers_are_reused_until_the_size_changes():
+    preprocessor = BlueTextPreprocessor()
+    first = preprocessor(np.zeros((20, 30, 4), dtype=np.uint8))
+    assert preprocessor(np.full((20, 30, 4), 255, dtype=np.uint8)) is first
+    assert preprocessor(np.zeros((10, 30, 4), dtype=np.uint8)).shape == (30, 90)
+
+
+def test_text_is_black_on_a_white_panel():
+    image = Image.open(SCREENSHOT).convert('RGB')
+    pixels = np.asarray(image)
+    binary = BlueTextPreprocessor()(image)[1::3, 1::3]
+
+    # Stat lines of the result panel (see the labels in test_screenshots)
+    panel = (slice(203, 262), slice(22, 184))
+    ink = pixels[panel].max(axis=2) > INK_THRESHOLD
+    assert (binary[panel][ink] == 0).mean() > 0.9
+    assert (binary[panel][~ink] == 255).mean() > 0.9
+
+
+def test_debug_images_go_to_the_sink_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processor = FlameProcessor()
+    image = Image.open(SCREENSHOT).convert('RGB')
+
+    processor.preprocess_image(image)
+    assert not list(tmp_path.rglob('*.png'))
+
+    sink = DebugSink(base_dir=str(tmp_path / 'debug'), on_failure=True)
+    processor.debug_sink = sink
+    sink.begin_roll(1)
+    processor.preprocess_image(image)
+    assert sink.end_roll(failed=True)
+    sink.close()
+    written = sorted(path.name for path in (tmp_path / 'debug').rglob('roll_000001_*.png'))
+    assert written == ['roll_000001_blue_mask.png', 'roll_000001_blue_text.png', 'roll_000001_input.png',
+                       'roll_000001_thresh.png']
+
+
+def test_each_thread_gets_its_own_buffers_and_source():
+    processor = FlameProcessor()
+    image = Image.open(SCREENSHOT).convert('RGB')
+    processor.extract_text(image)
+    seen = {}
+
+    def worker():
+        seen['preprocessor'] = processor.preprocessor
+        seen['source'] = processor.last_source
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join(5)
+
+    assert seen['preprocessor'] is not processor.preprocessor
+    assert seen['source'] is None
+    assert processor.last_source == 'glyph'
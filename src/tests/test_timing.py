@@ -0,0 +1,51 @@
+import json
+import threading
+
+from ..utils.timing import StageTimer, timed
+
+
+def test_end_roll_returns_this_rolls_stages_only():
+    timer = StageTimer()
+    timer.record('ocr', 0.010)
+    timer.record('ocr', 0.005)
+    worker = threading.Thread(target=timer.record, args=('save', 0.002))
+    worker.start()
+    worker.join()
+
+    first = timer.end_roll()
+    timer.record('ocr', 0.020)
+    second = timer.end_roll()
+
+    assert round(first['ocr']) == 15 and round(first['save']) == 2
+    assert second == {'ocr': 20.0}
+    assert timer.summary()['ocr']['count'] == 3
+    assert round(timer.summary()['ocr']['mean_ms']) == 12
+
+
+def test_percentiles_throughput_and_chrome_trace(tmp_path):
+    timer = StageTimer(window=10)
+    for ms in range(1, 21):
+        timer.record('ocr', ms / 1000.0)
+    # Only the last 10 samples count
+    assert timer.percentiles()['ocr'] == {'count': 10, 'p50_ms': 16.0, 'p95_ms': 20.0}
+    assert timer.rolls_per_minute() is None
+
+    with timer.stage('roll'):
+        with timed(timer, 'capture'):
+            pass
+    with timed(None, 'ignored'):
+        pass
+    timer.end_roll()
+    timer.end_roll()
+    assert timer.rolls_per_minute() > 0
+
+    path = tmp_path / 'trace.json'
+    assert timer.export_chrome_trace(str(path)) == 2
+    events = json.loads(path.read_text())['traceEvents']
+    spans = {event['name']: event for event in events if event['ph'] == 'X'}
+    assert set(spans) == {'roll', 'capture'}
+    # The capture span lies inside the roll span, on the same thread
+    roll, capture = spans['roll'], spans['capture']
+    assert roll['tid'] == capture['tid'] and roll['ts'] <= capture['ts']
+    assert capture['ts'] + capture['dur'] <= roll['ts'] + roll['dur']
+    assert any(event['ph'] == 'M' and event['tid'] == roll['tid'] for event in events)
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+from ..utils.ui_state_detector import DEFAULT_ASSETS_DIR, UIStateDetector
+
+
+def _client_with(filename, x, y, scale=1.0, size=(480, 640)):
+    """Grayscale client image with an asset pasted at (x, y)"""
+    rng = np.random.default_rng(0)
+    client = rng.integers(0, 60, size=size, dtype=np.uint8)
+    template = cv2.imread(f"{DEFAULT_ASSETS_DIR}/{filename}", cv2.IMREAD_GRAYSCALE)
+    if scale != 1.0:
+        template = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    h, w = template.shape
+    client[y:y + h, x:x + w] = template
+    return client
+
+
+class ScriptedDetector(UIStateDetector):
+    """UIStateDetector that grabs from an in-memory client image"""
+
+    def __init__(self, client, **kwargs):
+        super().__init__(poll_interval=0, **kwargs)
+        self.client = client
+        self.grabs = []
+
+    def grab(self, monitor):
+        self.grabs.append(monitor)
+        x, y = monitor['left'], monitor['top']
+        return self.client[y:y + monitor['height'], x:x + monitor['width']]
+
+
+def test_locates_dialog_at_a_non_native_scale():
+    detector = UIStateDetector()
+    client = _client_with('confirmation.png', 300, 200, scale=1.5)
+
+    match = detector.locate('confirmation', client)
+
+    assert match is not None and match['scale'] == 1.5
+    assert abs(match['x'] - 300) <= 1 and abs(match['y'] - 200) <= 1
+    assert detector.locate('reroll', client) is None
+
+
+def test_detect_caches_the_scale_per_state():
+    """A detected scale is reused for that state only, and dropped when the client is resized"""
+    detector = ScriptedDetector(_client_with('confirmation.png', 300, 200, scale=1.5))
+    detector.set_client_rect((0, 0, 640, 480))
+    tried = []
+    locate = UIStateDetector.locate
+
+    def recording_locate(state, image):
+        tried.append((state, detector._candidate_scales(state)))
+        return locate(detector, state, image)
+
+    detector.locate = recording_locate
+
+    assert detector.detect('confirmation')['scale'] == 1.5
+    assert detector.detect('confirmation')['scale'] == 1.5
+    assert detector.state_scales == {'confirmation': 1.5}
+    # The first detect tries every scale, the second only the cached one
+    assert tried[0] == ('confirmation', detector.scales)
+    assert tried[1] == ('confirmation', (1.5,))
+
+    # Other states still search the whole pyramid
+    assert detector.detect('reroll') is None
+    assert tried[2] == ('reroll', detector.scales)
+
+    detector.set_client_rect((0, 0, 800, 600))
+    assert detector.state_scales == {}
+
+
+def test_later_searches_are_restricted_to_roi():
+    """After the first hit only the area around it is grabbed"""
+    detector = ScriptedDetector(_client_with('reroll.png', 120, 340))
+    detector.set_client_rect((0, 0, 640, 480))
+
+    first = detector.wait_for('reroll', timeout=1)
+    second = detector.wait_for('reroll', timeout=1)
+
+    assert first is not None and second is not None
+    assert (second['x'], second['y']) == (120, 340)
+    assert detector.grabs[0]['width'] == 640
+    assert detector.grabs[-1]['width'] < 200
+
+
+def test_wait_times_out_when_dialog_never_appears():
+    detector = ScriptedDetector(_client_with('reroll.png', 120, 340))
+    detector.set_client_rect((0, 0, 640, 480))
+
+    assert detector.wait_for('confirmation', timeout=0.05) is None
+    assert detector.last_wait['timed_out'] is True
+    assert detector.wait_until_gone('confirmation', timeout=0.05) is True
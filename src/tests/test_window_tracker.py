@@ -0,0 +1,57 @@
+from ..utils.window_tracker import WindowTracker
+
+
+class FakeWindowManager:
+    """Counts the expensive calls the tracker is meant to avoid"""
+
+    def __init__(self):
+        self.handle = 42
+        self.window = (100, 100, 900, 700)
+        self.lookups = 0
+        self.rect_calls = 0
+
+    def get_window(self, title):
+        self.lookups += 1
+        return self.handle
+
+    def get_outer_rect(self, hwnd):
+        return self.window if hwnd == self.handle else None
+
+    def get_window_rect(self, hwnd):
+        self.rect_calls += 1
+        left, top, right, bottom = self.window
+        return {'window': self.window, 'client': (left + 8, top + 30, right - 8, bottom - 8)}
+
+
+POSITION = {'x': 0.5, 'y': 0.5}
+REGION = {'left': 0.0, 'top': 0.0, 'right': 0.5, 'bottom': 0.5}
+
+
+def test_geometry_is_cached_until_the_window_moves():
+    manager = FakeWindowManager()
+    tracker = WindowTracker(manager)
+
+    first = tracker.layout(POSITION, REGION)
+    assert tracker.layout(POSITION, REGION) is first
+    assert manager.lookups == 1 and manager.rect_calls == 1
+    assert first.click == (500, 411)
+    assert first.monitor == {'left': 108, 'top': 130, 'width': 392, 'height': 281}
+
+    # Moving keeps the handle but recomputes the coordinates
+    manager.window = (200, 100, 1000, 700)
+    moved = tracker.layout(POSITION, REGION)
+    assert moved.click == (600, 411)
+    assert manager.lookups == 1 and manager.rect_calls == 2
+
+
+def test_destroyed_window_is_looked_up_again():
+    manager = FakeWindowManager()
+    tracker = WindowTracker(manager)
+    assert tracker.handle() == 42
+
+    manager.handle = 43
+    assert tracker.handle() == 43
+    assert manager.lookups == 2
+
+    manager.handle = None
+    assert tracker.geometry() is None
@@ -0,0 +1,3 @@
+"""
+Offline tools for MapleStory automation (benchmarks, batch processing)
+"""
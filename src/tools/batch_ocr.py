@@ -0,0 +1,170 @@
+"""
+Re-read archived flame screenshots offline.
+
+Walks a directory tree (results/flames/, test_screenshots/, ...) and runs
+FlameProcessor.parse_flame_results on every screenshot across a pool of
+worker processes, each holding its own warm OCR engine. Results are written
+as they come in, one JSON object or CSV row per image, in path order.
+
+Usage:
+    python -m src.tools.batch_ocr results/flames --out rescored.jsonl
+    python -m src.tools.batch_ocr test_screenshots --format csv --out rescored.csv --workers 4
+    python -m src.tools.batch_ocr results/flames/2025-04-08 | grep '"ok": false'
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from src.tools.ocr_benchmark import BACKENDS, load_backend
+from src.utils.flame_result import FlameResult
+from src.utils.log_config import ROOT_LOGGER, setup_logging
+
+# Extensions written by the screenshot archiver, see CODECS in src.utils.screenshot_archiver
+EXTENSIONS = ('.png', '.qoi', '.bmp', '.npy')
+
+# Images per work unit, so results travel back in batches instead of one message per image
+CHUNK_SIZE = 32
+
+CSV_COLUMNS = ('path', 'ok', 'stats', 'attack_increase', 'cp_increase', 'currently_owned', 'remaining_flames',
+               'source', 'confidence', 'ms', 'error', 'raw_text')
+
+# One processor per worker process, loaded once and reused for every chunk
+_processor = None
+
+
+def _init_worker(backend: str, verbose: bool):
+    global _processor
+    if verbose:
+        setup_logging({'level': 'DEBUG', 'dir': None})
+    else:
+        # Failed reads are reported in the output rows instead
+        logging.getLogger(ROOT_LOGGER).setLevel(logging.CRITICAL)
+    _processor = load_backend(backend)
+    if hasattr(_processor, 'warm_up'):
+        _processor.warm_up()
+
+
+def find_images(root: str) -> List[str]:
+    """Every screenshot below root, sorted by path"""
+    if os.path.isfile(root):
+        return [root]
+    images = []
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        images.extend(os.path.join(directory, name) for name in sorted(files)
+                      if name.lower().endswith(EXTENSIONS))
+    return images
+
+
+def load_image(path: str) -> Image.Image:
+    """Open a screenshot; raw .npy archives hold RGB pixels"""
+    if path.lower().endswith('.npy'):
+        return Image.fromarray(np.load(path))
+    with Image.open(path) as image:
+        return image.convert('RGB')
+
+
+def parse_chunk(paths: List[str]) -> List[Dict]:
+    """Parse a batch of screenshots with the worker's processor, one row per image"""
+    rows = []
+    for path in paths:
+        row = {'path': path, 'ok': False}
+        try:
+            image = load_image(path)
+            start = time.perf_counter()
+            result = _processor.parse_flame_results(image)
+            row['ms'] = (time.perf_counter() - start) * 1000.0
+            if isinstance(result, FlameResult):
+                row.update(result.to_dict())
+                row['ok'] = result.has_stats()
+        except Exception as e:
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+def parse_all(paths: List[str], backend: str = 'tesseract', workers: int = 1,
+              verbose: bool = False) -> Iterator[Dict]:
+    """Yield one row per screenshot in path order, as soon as its chunk is parsed"""
+    chunks = [paths[start:start + CHUNK_SIZE] for start in range(0, len(paths), CHUNK_SIZE)]
+    if workers <= 1:
+        # Reading in this process, so put the log level back afterwards
+        level = logging.getLogger(ROOT_LOGGER).level
+        _init_worker(backend, verbose)
+        try:
+            for chunk in chunks:
+                yield from parse_chunk(chunk)
+        finally:
+            logging.getLogger(ROOT_LOGGER).setLevel(level)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend, verbose)) as pool:
+        for rows in pool.map(parse_chunk, chunks):
+            yield from rows
+
+
+def write_rows(rows: Iterable[Dict], out, fmt: str) -> Dict[str, int]:
+    """Write rows as JSON lines or CSV, flushing each one. Returns the counts."""
+    counts = {'images': 0, 'parsed': 0, 'errors': 0}
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+    for row in rows:
+        counts['images'] += 1
+        counts['parsed'] += row['ok']
+        counts['errors'] += 'error' in row
+        if writer is not None:
+            writer.writerow(dict(row, stats=json.dumps(row.get('stats') or {})))
+        else:
+            out.write(json.dumps(row, default=str) + '\n')
+        out.flush()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-read archived flame screenshots with a pool of OCR workers")
+    parser.add_argument('dirs', nargs='+', help="Directories (searched recursively) or screenshot files")
+    parser.add_argument('--out', default='-', help="Output file (default: stdout)")
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default=None,
+                        help="Output format (default: from the --out extension, else jsonl)")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='tesseract', help="OCR backend")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--limit', type=int, default=None, help="Only read the first N screenshots")
+    parser.add_argument('--verbose', action='store_true', help="Keep the workers' debug log")
+    args = parser.parse_args(argv)
+
+    paths = [path for root in args.dirs for path in find_images(root)]
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print(f"No screenshots found in {', '.join(args.dirs)}", file=sys.stderr)
+        return 1
+    fmt = args.format or ('csv' if args.out.lower().endswith('.csv') else 'jsonl')
+    workers = max(1, min(args.workers, -(-len(paths) // CHUNK_SIZE)))
+
+    start = time.perf_counter()
+    rows = parse_all(paths, backend=args.backend, workers=workers, verbose=args.verbose)
+    if args.out == '-':
+        counts = write_rows(rows, sys.stdout, fmt)
+    else:
+        with open(args.out, 'w', newline='' if fmt == 'csv' else None, encoding='utf-8') as out:
+            counts = write_rows(rows, out, fmt)
+    elapsed = time.perf_counter() - start
+
+    print(f"Read {counts['images']} screenshots with {workers} workers in {elapsed:.1f}s "
+          f"({counts['images'] / elapsed:.1f}/s): {counts['parsed']} parsed, {counts['errors']} errors",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
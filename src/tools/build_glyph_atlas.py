@@ -0,0 +1,53 @@
+"""
+Build the glyph atlas used by GlyphRecognizer.
+
+Harvests glyph templates from labelled flame result crops (see
+test_screenshots/labels.json) and writes them to assets/glyph_atlas.npz.
+Re-run after adding labelled crops that contain new glyphs. Crops of the
+held-out split (see ocr_benchmark.is_held_out) are left out, so
+`ocr_benchmark --split held-out` measures the atlas on crops it has not seen.
+
+Usage:
+    python -m src.tools.build_glyph_atlas [--dir test_screenshots] [--out assets/glyph_atlas.npz]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from src.tools.ocr_benchmark import DEFAULT_IMAGE_DIR, LABELS_FILENAME, is_held_out, load_labels
+from src.utils.glyph_recognizer import DEFAULT_ATLAS_PATH, build_atlas, save_atlas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the glyph atlas from labelled flame crops")
+    parser.add_argument('--dir', default=DEFAULT_IMAGE_DIR, help="Directory of labelled crops")
+    parser.add_argument('--labels', default=None, help="Golden labels file (default: <dir>/labels.json)")
+    parser.add_argument('--out', default=DEFAULT_ATLAS_PATH, help="Atlas output path")
+    parser.add_argument('--all', action='store_true', help="Also harvest the held-out crops")
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.labels or os.path.join(args.dir, LABELS_FILENAME))
+    samples = []
+    for filename, label in sorted(labels.items()):
+        path = os.path.join(args.dir, filename)
+        if not args.all and is_held_out(filename):
+            continue
+        if os.path.exists(path):
+            samples.append((np.asarray(Image.open(path).convert('RGB')), label))
+
+    glyphs, templates, line_height = build_atlas(samples)
+    if not glyphs:
+        print("No glyphs could be harvested")
+        return 1
+
+    save_atlas(args.out, glyphs, templates, line_height)
+    print(f"Wrote {len(glyphs)} glyphs (line height {line_height}) to {args.out}")
+    print("Glyphs:", ' '.join(repr(g) for g in glyphs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
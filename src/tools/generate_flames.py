@@ -0,0 +1,104 @@
+"""
+Generate synthetic flame result crops with golden labels.
+
+Renders random flame results the way the game shows them and writes them as
+flame_region_synth_*.png next to a labels.json in the same format as
+test_screenshots/, so the OCR benchmark and atlas tools can run on them:
+
+Usage:
+    python -m src.tools.generate_flames --count 10000 --out results/synthetic_flames
+    python -m src.tools.generate_flames --count 500 --scales 1.0 1.25 1.5 --jitter 2 --noise 4
+    python -m src.tools.ocr_benchmark --dir results/synthetic_flames
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.tools.ocr_benchmark import LABELS_FILENAME
+from src.utils.synthetic_flames import FlameRenderer
+
+DEFAULT_OUT_DIR = "results/synthetic_flames"
+
+# Images per work unit; each unit has its own seed so output does not depend on the worker count
+CHUNK_SIZE = 250
+
+# One renderer per worker process, its glyph cache is reused across chunks
+_renderer = None
+
+
+def _init_worker(font_path: Optional[str]):
+    global _renderer
+    _renderer = FlameRenderer(font_path)
+
+
+def render_chunk(out_dir: str, seed: int, chunk: int, start: int, count: int, scales: Sequence[float],
+                 jitter: int, noise: float, max_lines: int, compress_level: int) -> Dict[str, Dict]:
+    """Render and save images start..start+count, returning their labels"""
+    rng = np.random.default_rng([seed, chunk])
+    labels = {}
+    for index in range(start, start + count):
+        image, label = _renderer.generate(rng, scales=scales, jitter=jitter, noise=noise, max_lines=max_lines)
+        filename = f"flame_region_synth_{index:06d}.png"
+        image.save(os.path.join(out_dir, filename), format='PNG', compress_level=compress_level)
+        labels[filename] = label
+    return labels
+
+
+def generate(out_dir: str, count: int, seed: int = 0, scales: Sequence[float] = (1.0,), jitter: int = 1,
+             noise: float = 0.0, max_lines: int = 4, font_path: Optional[str] = None, workers: int = 1,
+             compress_level: int = 1) -> Dict[str, Dict]:
+    """Generate count images into out_dir and write labels.json. Returns the labels."""
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = [(out_dir, seed, chunk, start, min(CHUNK_SIZE, count - start), tuple(scales), jitter, noise,
+               max_lines, compress_level)
+              for chunk, start in enumerate(range(0, count, CHUNK_SIZE))]
+
+    labels = {}
+    if workers <= 1:
+        _init_worker(font_path)
+        for args in chunks:
+            labels.update(render_chunk(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(font_path,)) as pool:
+            futures = [pool.submit(render_chunk, *args) for args in chunks]
+            for future in futures:
+                labels.update(future.result())
+
+    with open(os.path.join(out_dir, LABELS_FILENAME), 'w') as f:
+        json.dump(labels, f, indent=4)
+    return labels
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic flame result crops with golden labels")
+    parser.add_argument('--out', default=DEFAULT_OUT_DIR, help="Output directory")
+    parser.add_argument('--count', type=int, default=1000, help="Number of images")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same images")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0], help="Client scales to pick from")
+    parser.add_argument('--jitter', type=int, default=1, help="Maximum position jitter in pixels")
+    parser.add_argument('--noise', type=float, default=0.0, help="Standard deviation of pixel noise")
+    parser.add_argument('--max-lines', type=int, default=4, help="Maximum stat lines per result")
+    parser.add_argument('--font', default=None,
+                        help="TrueType font to render with (default: the game font from the glyph atlas)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--compress-level', type=int, default=1, help="PNG compression level (0-9)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    labels = generate(args.out, args.count, seed=args.seed, scales=args.scales, jitter=args.jitter,
+                      noise=args.noise, max_lines=args.max_lines, font_path=args.font, workers=args.workers,
+                      compress_level=args.compress_level)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(labels)} images and {LABELS_FILENAME} to {args.out} "
+          f"in {elapsed:.1f}s ({len(labels) / elapsed:.0f} images/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
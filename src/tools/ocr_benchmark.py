@@ -0,0 +1,293 @@
+"""
+Offline OCR benchmark for the flame processors.
+
+Replays every flame_region_*.png crop in a directory through
+FlameProcessor.parse_flame_results and compares the parsed stats with the
+golden labels stored next to the images (labels.json).
+
+Usage:
+    python -m src.tools.ocr_benchmark
+    python -m src.tools.ocr_benchmark --backend tesseract --repeat 5 --json bench.json
+    python -m src.tools.ocr_benchmark --split held-out
+"""
+import argparse
+import contextlib
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.flame_result import FlameResult
+from src.utils.log_config import setup_logging
+
+# Backend name -> module providing a FlameProcessor class
+BACKENDS = {
+    'easyocr': 'src.flame_processor',
+    'tesseract': 'src.utils.flame_processor',
+}
+
+DEFAULT_IMAGE_DIR = "test_screenshots"
+LABELS_FILENAME = "labels.json"
+
+# Non-stat fields of a parsed result that are scored when labelled
+EXTRA_FIELDS = ('attack_increase', 'cp_increase', 'currently_owned')
+
+# Crops whose filename hashes into the first of these buckets are held out of
+# the glyph atlas, so their accuracy shows how well the atlas generalizes
+HELD_OUT_BUCKETS = 4
+SPLITS = ('all', 'held-out', 'train')
+
+
+def is_held_out(filename: str) -> bool:
+    """Whether a crop is kept out of the glyph atlas; stable as crops are added"""
+    return zlib.crc32(os.path.basename(filename).encode()) % HELD_OUT_BUCKETS == 0
+
+
+def split_images(images: List[str], split: str) -> List[str]:
+    """The crops of a split: 'all', 'held-out' (never in the atlas) or 'train'"""
+    if split == 'all':
+        return images
+    return [path for path in images if is_held_out(path) == (split == 'held-out')]
+
+
+def load_labels(path: str) -> Dict[str, Dict]:
+    """Load the golden labels file (image filename -> expected result)"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def normalize_value(value) -> Optional[int]:
+    """Normalize a parsed value ('5%', '+12', 12) to an int"""
+    if value is None:
+        return None
+    try:
+        return int(str(value).strip().strip('%'))
+    except ValueError:
+        return None
+
+
+def expected_fields(label: Dict) -> Dict[str, int]:
+    """Flatten a golden label into field -> expected value"""
+    fields = {stat: normalize_value(value) for stat, value in label.get('stats', {}).items()}
+    for field in EXTRA_FIELDS:
+        if label.get(field) is not None:
+            fields[field] = normalize_value(label[field])
+    return fields
+
+
+def actual_fields(result: Optional[Dict]) -> Dict[str, int]:
+    """Flatten a parsed result into field -> value, dropping missing values"""
+    if not result:
+        return {}
+    if isinstance(result, FlameResult):
+        result = result.to_dict()
+    fields = {}
+    for stat, value in (result.get('stats') or {}).items():
+        value = normalize_value(value)
+        if value is not None:
+            fields[stat] = value
+    for field in EXTRA_FIELDS:
+        value = normalize_value(result.get(field))
+        if value is not None:
+            fields[field] = value
+    return fields
+
+
+def score_result(label: Dict, result: Optional[Dict]) -> Tuple[Dict[str, bool], List[str]]:
+    """
+    Compare a parsed result with its golden label.
+    Returns (field -> correct, list of spurious fields that are not in the label).
+    """
+    expected = expected_fields(label)
+    actual = actual_fields(result)
+    hits = {field: actual.get(field) == value for field, value in expected.items()}
+    spurious = sorted(field for field in actual if field not in expected)
+    return hits, spurious
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, if it can be measured"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def load_backend(name: str):
+    """Import and construct the FlameProcessor for a backend"""
+    module = importlib.import_module(BACKENDS[name])
+    return module.FlameProcessor()
+
+
+def run_backend(processor, images: List[str], labels: Dict[str, Dict], repeat: int = 1,
+                warmup: int = 1, quiet: bool = True) -> Dict:
+    """Replay every image through the processor and collect timing and accuracy"""
+    from PIL import Image
+
+    # Decode all crops up front so only parsing is timed
+    decoded = [(os.path.basename(path), Image.open(path).convert('RGB')) for path in images]
+
+    sink = open(os.devnull, 'w') if quiet else None
+    redirect = contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()
+
+    latencies = []
+    field_counts = {}
+    exact_matches = 0
+    spurious_total = 0
+    failures = 0
+    per_image = {}
+
+    try:
+        with redirect:
+            for _ in range(warmup):
+                if decoded:
+                    processor.parse_flame_results(decoded[0][1])
+
+            started = time.perf_counter()
+            for filename, image in decoded:
+                result = None
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    result = processor.parse_flame_results(image)
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+
+                if result is None:
+                    failures += 1
+
+                label = labels.get(filename)
+                if label is None:
+                    continue
+
+                hits, spurious = score_result(label, result)
+                for field, correct in hits.items():
+                    counts = field_counts.setdefault(field, [0, 0])
+                    counts[0] += int(correct)
+                    counts[1] += 1
+                if all(hits.values()) and not spurious:
+                    exact_matches += 1
+                spurious_total += len(spurious)
+                per_image[filename] = {
+                    'correct': sorted(f for f, ok in hits.items() if ok),
+                    'wrong': sorted(f for f, ok in hits.items() if not ok),
+                    'spurious': spurious,
+                }
+            elapsed = time.perf_counter() - started
+    finally:
+        if sink:
+            sink.close()
+
+    labelled = len(per_image)
+    return {
+        'images': len(decoded),
+        'calls': len(latencies),
+        'failures': failures,
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else 0.0,
+        },
+        'throughput_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'accuracy': {
+            field: {'correct': c, 'total': t, 'rate': c / t if t else 0.0}
+            for field, (c, t) in sorted(field_counts.items())
+        },
+        'exact_match_rate': exact_matches / labelled if labelled else 0.0,
+        'spurious_fields': spurious_total,
+        'per_image': per_image,
+    }
+
+
+def print_report(name: str, report: Dict):
+    """Print a human readable summary of a backend run"""
+    latency = report['latency_ms']
+    print(f"\n=== {name} ===")
+    print(f"Images: {report['images']}  Calls: {report['calls']}  Failures: {report['failures']}")
+    print(f"Latency ms: mean={latency['mean']:.1f} p50={latency['p50']:.1f} "
+          f"p90={latency['p90']:.1f} p99={latency['p99']:.1f} max={latency['max']:.1f}")
+    print(f"Throughput: {report['throughput_per_s']:.2f} parses/s")
+    if report['peak_rss_mb'] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    print("Accuracy per field:")
+    for field, acc in report['accuracy'].items():
+        print(f"  {field:16} {acc['correct']:3}/{acc['total']:<3} ({acc['rate'] * 100:5.1f}%)")
+    print(f"Exact match rate: {report['exact_match_rate'] * 100:.1f}%  "
+          f"Spurious fields: {report['spurious_fields']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark flame OCR backends against golden labels")
+    parser.add_argument('--dir', default=DEFAULT_IMAGE_DIR, help="Directory of flame_region_*.png crops")
+    parser.add_argument('--labels', default=None, help="Golden labels file (default: <dir>/labels.json)")
+    parser.add_argument('--backend', nargs='+', choices=sorted(BACKENDS), default=sorted(BACKENDS),
+                        help="Backends to benchmark")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed parses per image")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed parses before measuring")
+    parser.add_argument('--limit', type=int, default=None, help="Only use the first N images")
+    parser.add_argument('--split', choices=SPLITS, default='all',
+                        help="Score only the crops held out of the glyph atlas, or only those it was built from")
+    parser.add_argument('--json', dest='json_path', default=None, help="Write the full report to a JSON file")
+    parser.add_argument('--verbose', action='store_true', help="Keep the processors' console output and debug log")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        setup_logging({'level': 'DEBUG', 'dir': None})
+
+    images = split_images(sorted(glob.glob(os.path.join(args.dir, "flame_region_*.png"))), args.split)
+    if args.limit:
+        images = images[:args.limit]
+    if not images:
+        print(f"No flame_region_*.png images found in {args.dir}")
+        return 1
+
+    labels_path = args.labels or os.path.join(args.dir, LABELS_FILENAME)
+    labels = load_labels(labels_path) if os.path.exists(labels_path) else {}
+    if not labels:
+        print(f"Warning: no golden labels found at {labels_path}, only timing will be reported")
+
+    reports = {}
+    for name in args.backend:
+        try:
+            processor = load_backend(name)
+        except Exception as e:
+            print(f"Skipping {name} backend: {str(e)}")
+            continue
+        reports[name] = run_backend(processor, images, labels, repeat=args.repeat,
+                                    warmup=args.warmup, quiet=not args.verbose)
+        print_report(name, reports[name])
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(reports, f, indent=4)
+        print(f"\nReport written to {args.json_path}")
+
+    return 0 if reports else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
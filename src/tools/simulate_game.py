@@ -0,0 +1,215 @@
+"""
+Simulated flame window for measuring rolls per minute without the game.
+
+By default the reroll engine runs in-process against the simulator through
+the 'sim' backends: the full click / confirm / wait / capture / OCR loop,
+with only the input and the screen replaced. With --window the simulator is
+shown in a window titled "MapleStory Simulator" that reacts to real clicks
+and Enter presses, so the app can roll on it with the win32 backends; the
+reroll position and capture region to use are printed at startup.
+
+Usage:
+    python -m src.tools.simulate_game --rolls 50
+    python -m src.tools.simulate_game --rolls 50 --dialog-latency 0.3 --animation-latency 1.0 --json sim.json
+    python -m src.tools.simulate_game --window
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.backends.simulator import GameSimulator, create_simulator_backends
+from src.utils.log_config import setup_logging
+
+WINDOW_TITLE = "MapleStory Simulator"
+
+# Milliseconds between window redraws
+REFRESH_MS = 15
+
+
+def run_benchmark(simulator: GameSimulator, rolls: int, delays: Dict, quiet: bool = True,
+                  trace_path: Optional[str] = None) -> Dict:
+    """
+    Roll `rolls` times on the simulator with the real controller and engine. Returns a report.
+    trace_path also writes the stage spans as a Chrome trace.
+    """
+    from src.controllers.maplestory_controller import MapleStoryController
+
+    backends = create_simulator_backends(simulator)
+    controller = MapleStoryController(backends)
+    engine = controller.reroll_engine
+
+    sink = open(os.devnull, 'w') if quiet else None
+    redirect = contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()
+    with tempfile.TemporaryDirectory() as archive_dir:
+        settings = {
+            'tries': rolls,
+            # Never met, so every roll is taken
+            'thresholds': {'STR': 1_000_000},
+            'delays': delays,
+            'archive': {'base_dir': archive_dir},
+            'history': {'enabled': False},
+        }
+        settings.update(simulator.settings_layout())
+
+        start = time.perf_counter()
+        with redirect:
+            engine.start(settings)
+            engine.join()
+        elapsed = time.perf_counter() - start
+    if sink is not None:
+        sink.close()
+
+    attempts = 0
+    parsed = 0
+    summary = {}
+    capture = None
+    delay_profile = None
+    while not engine.events.empty():
+        event = engine.events.get()
+        if event['type'] == 'result':
+            attempts += 1
+            parsed += bool(event['results'] is not None and event['results'].has_stats())
+        elif event['type'] == 'finished':
+            summary = event['timings']
+            capture = event.get('capture')
+            delay_profile = event.get('delay_profile')
+
+    report = {
+        'attempts': attempts,
+        'parsed': parsed,
+        'elapsed_s': elapsed,
+        'attempts_per_minute': attempts / elapsed * 60 if elapsed > 0 else None,
+        'delays': delays,
+        'dialog_latency': simulator.dialog_latency,
+        'animation_latency': simulator.animation_latency,
+        'stages': {name: stats['mean_ms'] for name, stats in summary.items()},
+        'percentiles': engine.timer.percentiles(),
+        'capture': capture,
+        'delay_profile': delay_profile,
+    }
+    report.update(simulator.stats())
+    if trace_path:
+        report['trace_spans'] = engine.timer.export_chrome_trace(trace_path)
+    return report
+
+
+def print_report(report: Dict):
+    print(f"Attempts: {report['attempts']}  Results shown: {report['rolls']}  Parsed: {report['parsed']}  "
+          f"Ignored inputs: {report['ignored_inputs']}")
+    rate = report['rolls_per_minute']
+    print(f"Elapsed: {report['elapsed_s']:.1f}s  Rolls per minute: {rate:.1f}" if rate is not None
+          else f"Elapsed: {report['elapsed_s']:.1f}s  Rolls per minute: n/a")
+    print(f"Simulated latency: dialog {report['dialog_latency'] * 1000:.0f}ms, "
+          f"animation {report['animation_latency'] * 1000:.0f}ms")
+    percentiles = report.get('percentiles', {})
+    for name, mean_ms in report['stages'].items():
+        line = f"  {name:<12} mean {mean_ms:.0f}ms"
+        if name in percentiles:
+            line += f"  p50 {percentiles[name]['p50_ms']:.0f}ms  p95 {percentiles[name]['p95_ms']:.0f}ms"
+        print(line)
+    capture = report.get('capture')
+    if capture and capture['grabs']:
+        print(f"Capture: {capture['grabs']} grabs, p50 {capture['p50_ms']:.2f}ms, "
+              f"p95 {capture['p95_ms']:.2f}ms, max {capture['max_ms']:.2f}ms")
+    profile = report.get('delay_profile')
+    if profile:
+        print(f"Learned delays: action {profile['action']:.3f}s, parse {profile['parse']:.3f}s "
+              f"({profile['failures']} failed of {profile['rolls']} rolls)")
+
+
+def run_window(simulator: GameSimulator):
+    """Show the simulator in a Tk window that reacts to clicks and Enter"""
+    import tkinter as tk
+    from PIL import Image, ImageTk
+
+    layout = simulator.settings_layout()
+    print(f"Simulating the flame window in '{WINDOW_TITLE}'. Settings for flame_settings.json:")
+    print(json.dumps(layout, indent=4))
+
+    root = tk.Tk()
+    root.title(WINDOW_TITLE)
+    root.resizable(False, False)
+    # No border, so the label is exactly the client area
+    view = tk.Label(root, bd=0, highlightthickness=0)
+    view.pack()
+    view.bind('<Button-1>', lambda event: simulator.click(event.x, event.y))
+    root.bind('<Return>', lambda event: simulator.press('enter'))
+
+    shown = {'screen': None}
+
+    def refresh():
+        screen = simulator.screen()
+        if screen is not shown['screen']:
+            photo = ImageTk.PhotoImage(Image.fromarray(np.ascontiguousarray(screen[..., 2::-1])))
+            view.configure(image=photo)
+            view.image = photo
+            shown['screen'] = screen
+        root.after(REFRESH_MS, refresh)
+
+    def report_on_close():
+        print(simulator.stats())
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", report_on_close)
+    refresh()
+    root.mainloop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Simulated flame window for measuring rolls per minute")
+    parser.add_argument('--window', action='store_true', help="Show the simulator in a window instead")
+    parser.add_argument('--rolls', type=int, default=30, help="Rolls to benchmark")
+    parser.add_argument('--dialog-latency', type=float, default=0.15,
+                        help="Seconds until each confirmation dialog appears")
+    parser.add_argument('--animation-latency', type=float, default=0.6,
+                        help="Seconds the flame animation takes")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for the results")
+    parser.add_argument('--parse-delay', type=float, default=2.0, help="delays.parse (result wait timeout)")
+    parser.add_argument('--action-delay', type=float, default=0.5, help="delays.action")
+    parser.add_argument('--no-change-detection', action='store_true',
+                        help="Sleep parse-delay instead of watching for the new result")
+    parser.add_argument('--no-dialog-detection', action='store_true',
+                        help="Sleep action-delay instead of watching for the dialogs")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Learn the delays while rolling, with action-delay and parse-delay as the limits")
+    parser.add_argument('--json', dest='json_path', default=None, help="Write the report to a JSON file")
+    parser.add_argument('--trace', dest='trace_path', default=None,
+                        help="Write the stage spans as Chrome trace JSON (chrome://tracing, ui.perfetto.dev)")
+    parser.add_argument('--verbose', action='store_true', help="Keep the engine's console output and debug log")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        setup_logging({'level': 'DEBUG', 'dir': None})
+
+    simulator = GameSimulator(dialog_latency=args.dialog_latency, animation_latency=args.animation_latency,
+                              seed=args.seed)
+    if args.window:
+        run_window(simulator)
+        return 0
+
+    delays = {
+        'parse': args.parse_delay,
+        'action': args.action_delay,
+        'wait_for_change': not args.no_change_detection,
+        'wait_for_dialogs': not args.no_dialog_detection,
+        'adaptive': args.adaptive,
+    }
+    report = run_benchmark(simulator, args.rolls, delays, quiet=not args.verbose, trace_path=args.trace_path)
+    print_report(report)
+    if args.trace_path:
+        print(f"Trace with {report['trace_spans']} spans written to {args.trace_path}")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Report written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
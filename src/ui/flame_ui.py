@@ -1,3 +1,4 @@
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Dict, Callable
@@ -5,13 +6,14 @@ from PIL import ImageGrab, ImageTk, Image
 import os
 from datetime import datetime
 import pytesseract
-import mss
-import win32gui
-import win32con
-import win32api
-import interception
-import threading  # Add threading for keyboard monitoring
+import threading
+import queue
 import time
+from src.backends.base import to_image
+from src.utils.flame_simulator import FLAME_TIERS, DEFAULT_FLAME_TYPE, FlameSimulator, resolve_flame_type
+from src.utils.stop_condition import StopCondition
+
+logger = logging.getLogger(__name__)
 
 class RegionSelector:
     def __init__(self, on_region_selected, window_info, parent):
@@ -70,9 +72,9 @@ class RegionSelector:
         }
         
         # Print debug information
-        print(f"Selected region (absolute): {region}")
-        print(f"Client rect: {self.client_rect}")
-        print(f"Canvas coordinates: x1={x1}, y1={y1}, x2={x2}, y2={y2}")
+        logger.debug("Selected region (absolute): %s", region)
+        logger.debug("Client rect: %s", self.client_rect)
+        logger.debug("Canvas coordinates: x1=%s, y1=%s, x2=%s, y2=%s", x1, y1, x2, y2)
         
         self.on_region_selected(region)
         self.root.destroy()
@@ -119,9 +121,8 @@ class FlameUI:
         self.on_start = on_start
         self.controller = controller
         
-        # Initialize interception
-        self.interception = interception
-        self.interception.auto_capture_devices(keyboard=True, mouse=True)
+        # Initialize the input devices (interception on Windows)
+        controller.input.capture_devices()
         
         # Create main frame
         self.main_frame = ttk.Frame(self.root, padding="10")
@@ -146,6 +147,9 @@ class FlameUI:
         # Preview window
         self.preview_window = None
         
+        # Screenshot archive options, only set by editing flame_settings.json
+        self.archive_settings = None
+        
         # Load saved settings
         self._load_settings()
         
@@ -155,7 +159,7 @@ class FlameUI:
         
         # Add keyboard interrupt flag
         self.should_stop = False
-        self.keyboard_thread = None
+        self.stop_key_watch = None
         
         # Add animation flag
         self.is_animating = False
@@ -165,6 +169,28 @@ class FlameUI:
         self.style.configure('Running.TButton', foreground='red')
         self.style.configure('Normal.TButton', foreground='black')
         
+        # Load OCR in the background so the window is usable right away
+        self._start_ocr_warm_up()
+        
+    def _start_ocr_warm_up(self):
+        """Start warming up the OCR engine and poll until it is ready"""
+        processor = self.controller.flame_processor
+        if hasattr(processor, 'warm_up'):
+            processor.warm_up()
+        self._poll_ocr_ready()
+        
+    def _poll_ocr_ready(self):
+        """Update the OCR status label once the engine is loaded"""
+        processor = self.controller.flame_processor
+        if not hasattr(processor, 'is_ready') or processor.is_ready():
+            self.ocr_status_label.config(text="OCR: ready", foreground='green')
+            return
+        # The reason is in the log; rolls can still be read by the glyph recognizer
+        if hasattr(processor, 'load_error') and processor.load_error():
+            self.ocr_status_label.config(text="OCR: failed to load", foreground='red')
+            return
+        self.root.after(200, self._poll_ocr_ready)
+        
     def _create_right_column(self):
         """Create the right column containing instructions and results"""
         # Instructions frame
@@ -177,7 +203,7 @@ class FlameUI:
             "2. Select Region to select the 'Result' window of the flame",
             "3. Test Screenshot to ensure it captures and extracts the current result properly.",
             "4. 'Set Reroll Position' to save cursor position of where the 'Reroll' button is in game.",
-            "5. Set Thresholds and Delay settings."
+            "5. Set Thresholds (and/or a Stop when condition) and Delay settings."
         ]
         
         # Add each instruction as a label
@@ -222,6 +248,18 @@ class FlameUI:
         )
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
+        # Pause button
+        self.pause_button = ttk.Button(
+            buttons_frame,
+            text="Pause",
+            command=self._on_pause_clicked
+        )
+        self.pause_button.pack(side=tk.LEFT, padx=5)
+        
+        # OCR readiness indicator
+        self.ocr_status_label = ttk.Label(buttons_frame, text="OCR: loading...", foreground='gray')
+        self.ocr_status_label.pack(side=tk.LEFT, padx=5)
+        
     def _create_threshold_inputs(self):
         """Create the threshold inputs section"""
         # Threshold frame
@@ -266,6 +304,18 @@ class FlameUI:
         )
         self.save_button.grid(row=3, column=2, columnspan=2, padx=5, pady=2)
         
+        # Item being flamed, recorded with every roll in the roll history
+        ttk.Label(threshold_frame, text="Item:").grid(row=4, column=0, padx=5, pady=2, sticky=tk.W)
+        self.item_var = tk.StringVar(value="")
+        ttk.Entry(threshold_frame, textvariable=self.item_var, width=25).grid(
+            row=4, column=1, columnspan=3, padx=5, pady=2, sticky=tk.W)
+        
+        # Optional stop condition expression, e.g. "STR + 10 * ALL% >= 120" or "score(thief) >= 150"
+        ttk.Label(threshold_frame, text="Stop when:").grid(row=5, column=0, padx=5, pady=2, sticky=tk.W)
+        self.stop_condition_var = tk.StringVar(value="")
+        ttk.Entry(threshold_frame, textvariable=self.stop_condition_var, width=25).grid(
+            row=5, column=1, columnspan=3, padx=5, pady=2, sticky=tk.W)
+        
         # Create Delay Settings frame
         delay_frame = ttk.LabelFrame(self.main_frame, text="Delay Settings", padding="5")
         delay_frame.grid(row=1, column=0, sticky=tk.EW, pady=5)
@@ -288,6 +338,34 @@ class FlameUI:
         )
         self.save_delay_button.grid(row=0, column=4, padx=5, pady=2)
         
+        # Parse as soon as the result region changes and settles; Parse Delay becomes the timeout
+        self.wait_for_change_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            delay_frame,
+            text="Wait for result to render (Parse Delay is the timeout)",
+            variable=self.wait_for_change_var
+        ).grid(row=1, column=0, columnspan=5, padx=5, pady=2, sticky=tk.W)
+        
+        # Press Enter as soon as the confirmation dialog is detected; Action Delay becomes the timeout
+        self.wait_for_dialogs_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            delay_frame,
+            text="Wait for dialogs to appear (Action Delay is the timeout)",
+            variable=self.wait_for_dialogs_var
+        ).grid(row=2, column=0, columnspan=5, padx=5, pady=2, sticky=tk.W)
+        
+        # Learn faster delays while rolling; the delays above become the upper limits
+        self.adaptive_delays_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            delay_frame,
+            text="Learn delays while rolling (the delays above are the limits)",
+            variable=self.adaptive_delays_var
+        ).grid(row=3, column=0, columnspan=5, padx=5, pady=2, sticky=tk.W)
+        self.delay_profile_label = ttk.Label(delay_frame, text="")
+        self.delay_profile_label.grid(row=4, column=0, columnspan=5, padx=5, pady=2, sticky=tk.W)
+        # Learned delays from the "delay_profile" section
+        self.delay_profile = None
+        
     def _on_threshold_toggle(self, stat):
         """Enable/disable threshold entry based on checkbox state"""
         if self.threshold_vars[stat].get():
@@ -303,6 +381,15 @@ class FlameUI:
             settings = {
                 "thresholds": {},
                 "tries": int(self.tries_var.get()),
+                "item": self.item_var.get().strip(),
+                "stop_condition": self.stop_condition_var.get().strip(),
+                "flame_type": self.flame_type_var.get(),
+                "simulator": {
+                    "item_level": int(self.item_level_var.get()),
+                    "boss_item": self.boss_item_var.get(),
+                    "weapon": self.weapon_var.get(),
+                    "base_attack": int(self.base_attack_var.get() or 0)
+                },
                 "reroll_position": {
                     "x": float(self.x_var.get()),
                     "y": float(self.y_var.get())
@@ -315,25 +402,22 @@ class FlameUI:
                 }
             }
             
-            # Get enabled thresholds
-            for stat, var in self.threshold_vars.items():
-                if var.get():
-                    try:
-                        value = int(self.threshold_values[stat].get())
-                        if value < 0:
-                            messagebox.showerror("Error", f"{stat} threshold must be non-negative")
-                            return
-                        settings["thresholds"][stat] = value
-                    except ValueError:
-                        messagebox.showerror("Error", f"Invalid {stat} threshold value")
-                        return
-            
-            if not settings["thresholds"]:
-                messagebox.showerror("Error", "Please select at least one threshold")
+            # Get the stop condition and enabled thresholds
+            stop_condition = self._collect_stop_condition()
+            if stop_condition is None:
                 return
+            thresholds = self._collect_thresholds(required=not stop_condition)
+            if thresholds is None:
+                return
+            settings["thresholds"] = thresholds
                 
-            # Save settings to file
+            # Save settings to file, keeping the sections edited elsewhere (delays, archive)
             import json
+            if os.path.exists("flame_settings.json"):
+                with open("flame_settings.json", "r") as f:
+                    saved = json.load(f)
+                saved.update(settings)
+                settings = saved
             with open("flame_settings.json", "w") as f:
                 json.dump(settings, f, indent=4)
                 
@@ -360,7 +444,10 @@ class FlameUI:
                 
             settings["delays"] = {
                 "parse": parse_delay,
-                "action": action_delay
+                "action": action_delay,
+                "wait_for_change": self.wait_for_change_var.get(),
+                "wait_for_dialogs": self.wait_for_dialogs_var.get(),
+                "adaptive": self.adaptive_delays_var.get()
             }
             
             with open("flame_settings.json", "w") as f:
@@ -373,6 +460,31 @@ class FlameUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save delay settings: {str(e)}")
             
+    def _show_delay_profile(self, profile):
+        """Remember the learned delays and show them under the delay settings"""
+        self.delay_profile = profile
+        if profile:
+            self.delay_profile_label.config(
+                text=f"Learned: action {profile['action']:.2f}s, parse {profile['parse']:.2f}s "
+                     f"over {profile['rolls']} rolls")
+        else:
+            self.delay_profile_label.config(text="")
+            
+    def _save_delay_profile(self, profile):
+        """Keep the delays learned during a run in flame_settings.json"""
+        self._show_delay_profile(profile)
+        try:
+            import json
+            settings = {}
+            if os.path.exists("flame_settings.json"):
+                with open("flame_settings.json", "r") as f:
+                    settings = json.load(f)
+            settings["delay_profile"] = profile
+            with open("flame_settings.json", "w") as f:
+                json.dump(settings, f, indent=4)
+        except Exception as e:
+            logger.warning("Could not save the learned delays: %s", e)
+            
     def _load_settings(self):
         """Load settings from file"""
         try:
@@ -397,6 +509,25 @@ class FlameUI:
             if "tries" in settings:
                 self.tries_var.set(str(settings["tries"]))
                 
+            # Load item name
+            self.item_var.set(settings.get("item", ""))
+            
+            # Load stop condition
+            self.stop_condition_var.set(settings.get("stop_condition") or "")
+            
+            # Load flame simulator settings
+            if "flame_type" in settings:
+                try:
+                    self.flame_type_var.set(resolve_flame_type(settings["flame_type"]))
+                except ValueError:
+                    pass
+            if "simulator" in settings:
+                simulator = settings["simulator"]
+                self.item_level_var.set(str(simulator.get("item_level", 150)))
+                self.boss_item_var.set(simulator.get("boss_item", True))
+                self.weapon_var.set(simulator.get("weapon", False))
+                self.base_attack_var.set(str(simulator.get("base_attack", 0)))
+                
             # Load reroll position
             if "reroll_position" in settings:
                 pos = settings["reroll_position"]
@@ -416,9 +547,16 @@ class FlameUI:
                 delays = settings["delays"]
                 self.parse_delay_var.set(str(delays["parse"]))
                 self.action_delay_var.set(str(delays["action"]))
+                self.wait_for_change_var.set(delays.get("wait_for_change", True))
+                self.wait_for_dialogs_var.set(delays.get("wait_for_dialogs", True))
+                self.adaptive_delays_var.set(delays.get("adaptive", False))
+            self._show_delay_profile(settings.get("delay_profile"))
+                
+            # Load screenshot archive options
+            self.archive_settings = settings.get("archive")
                 
         except Exception as e:
-            print(f"Error loading settings: {str(e)}")
+            logger.exception("Error loading settings")
             
     def _update_region_coordinates(self):
         """Update the flame processor's region coordinates"""
@@ -430,7 +568,7 @@ class FlameUI:
                 'bottom': float(self.bottom_var.get())
             }
         except ValueError:
-            print("Invalid region coordinates")
+            logger.warning("Invalid region coordinates")
             
     def _show_preview(self, image):
         """Show the preview window with the screenshot"""
@@ -449,24 +587,7 @@ class FlameUI:
         
         # Update preview with results
         if results:
-            # Format the results text
-            ocr_text = "Extracted Stats:\n"
-            
-            # Add each stat with proper formatting
-            for stat, value in results['stats'].items():
-                if stat == 'STATS%':
-                    ocr_text += f"All Stats: {value}\n"
-                else:
-                    ocr_text += f"{stat}: {value}\n"
-            
-            # Add attack and CP increases if present
-            if results['attack_increase'] is not None:
-                ocr_text += f"Attack Increase: {results['attack_increase']}\n"
-            if results['cp_increase'] is not None:
-                ocr_text += f"CP Increase: {results['cp_increase']}\n"
-            
-            # Add raw OCR text at the bottom
-            ocr_text += f"\nRaw OCR text:\n{results['raw_text']}"
+            ocr_text = results.format_display()
         else:
             ocr_text = "Failed to process image"
             
@@ -476,29 +597,29 @@ class FlameUI:
     def _on_test_screenshot(self):
         """Handle test screenshot button click"""
         try:
-            print("Testing screenshot...")
+            logger.debug("Testing screenshot...")
             
             # Get the MapleStory window
             window = self.controller.window_manager.get_window("MapleStory")
             if not window:
-                print("Could not find MapleStory window")
+                logger.warning("Could not find MapleStory window")
                 messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
                 return
             
-            print(f"Found MapleStory window: {window}")
+            logger.debug("Found MapleStory window: %s", window)
             
             # Get the window rectangle
             window_rect = self.controller.window_manager.get_window_rect(window)
             if not window_rect:
-                print("Could not get window rectangle")
+                logger.warning("Could not get window rectangle")
                 messagebox.showerror("Error", "Could not get window dimensions")
                 return
                 
-            print(f"Window rectangle: {window_rect}")
+            logger.debug("Window rectangle: %s", window_rect)
             
             # Get the client rectangle for relative coordinates
             if 'client' not in window_rect:
-                print("No client rectangle in window info")
+                logger.warning("No client rectangle in window info")
                 messagebox.showerror("Error", "Could not get client area dimensions")
                 return
                 
@@ -506,8 +627,8 @@ class FlameUI:
             width = client_rect[2] - client_rect[0]
             height = client_rect[3] - client_rect[1]
             
-            print(f"Client rectangle: {client_rect}")
-            print(f"Client dimensions: {width}x{height}")
+            logger.debug("Client rectangle: %s", client_rect)
+            logger.debug("Client dimensions: %sx%s", width, height)
             
             # Get the region coordinates from the input fields
             try:
@@ -516,7 +637,7 @@ class FlameUI:
                 right = float(self.right_var.get())
                 bottom = float(self.bottom_var.get())
             except ValueError:
-                print("Invalid region coordinates")
+                logger.warning("Invalid region coordinates")
                 messagebox.showerror("Error", "Invalid region coordinates")
                 return
                 
@@ -528,7 +649,7 @@ class FlameUI:
                 'bottom': client_rect[1] + int(bottom * height)
             }
             
-            print(f"Capture region (absolute): {region}")
+            logger.debug("Capture region (absolute): %s", region)
             
             # Create monitor dict for mss
             monitor = {
@@ -538,250 +659,62 @@ class FlameUI:
                 'height': region['bottom'] - region['top']
             }
             
-            print(f"Monitor settings: {monitor}")
+            logger.debug("Monitor settings: %s", monitor)
             
-            # Take screenshot of the region
-            with mss.mss() as sct:
-                # Take the screenshot
-                screenshot = sct.grab(monitor)
-                
-                # Convert the screenshot to a PIL Image
-                image = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-                
-                # Create the directory structure
-                base_dir = "results/test"
-                today = datetime.now().strftime("%Y-%m-%d")
-                save_dir = os.path.join(base_dir, today)
-                
-                # Create directories if they don't exist
-                os.makedirs(save_dir, exist_ok=True)
-                
-                # Generate filename with timestamp
-                timestamp = datetime.now().strftime("%H-%M-%S")
-                filename = f"test_screenshot_{timestamp}.png"
-                filepath = os.path.join(save_dir, filename)
-                
-                # Save the image
-                image.save(filepath)
-                print(f"Screenshot saved to: {filepath}")
-                
-                print(f"Screenshot size: {image.size}")
-                
-                # Show the preview
-                self._show_preview(image)
+            # Take screenshot of the region with the controller's capture service
+            screenshot = self.controller.capture.grab(monitor)
             
-        except Exception as e:
-            print(f"Error in test screenshot: {str(e)}")
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            # The preview needs a PIL image, decoded straight from the BGRA grab
+            image = to_image(screenshot)
             
-    def _move_cursor_smoothly(self, start_x, start_y, target_x, target_y, steps=20, delay=0.01):
-        """Move cursor smoothly from start to target position"""
-        import math
-        
-        # Calculate step sizes
-        dx = (target_x - start_x) / steps
-        dy = (target_y - start_y) / steps
-        
-        # Move cursor in small steps
-        for i in range(steps):
-            # Use easing function for more natural movement
-            t = i / steps
-            # Ease-out cubic function
-            t = 1 - math.pow(1 - t, 3)
+            # Create the directory structure
+            base_dir = "results/test"
+            today = datetime.now().strftime("%Y-%m-%d")
+            save_dir = os.path.join(base_dir, today)
             
-            # Calculate current position
-            current_x = start_x + dx * i
-            current_y = start_y + dy * i
+            # Create directories if they don't exist
+            os.makedirs(save_dir, exist_ok=True)
             
-            # Move cursor to current position
-            self.interception.move_to(int(current_x), int(current_y))
-            time.sleep(delay)
+            # Generate filename with timestamp
+            timestamp = datetime.now().strftime("%H-%M-%S")
+            filename = f"test_screenshot_{timestamp}.png"
+            filepath = os.path.join(save_dir, filename)
             
-        # Ensure final position is exactly at target
-        self.interception.move_to(int(target_x), int(target_y))
-        
-    def _perform_click_sequence(self, x, y):
-        """Perform the click and enter sequence"""
-        import time
-        import os
-        from datetime import datetime
-        
-        print(f"Starting click sequence at ({x}, {y})")
-        
-        # Get delay values from UI
-        parse_delay = float(self.parse_delay_var.get())
-        action_delay = float(self.action_delay_var.get())
-        
-        # Move cursor to position
-        current_x, current_y = win32api.GetCursorPos()
-        print(f"Current cursor position: ({current_x}, {current_y})")
-        self._move_cursor_smoothly(current_x, current_y, x, y)
-        
-        # Verify cursor moved
-        new_x, new_y = win32api.GetCursorPos()
-        print(f"Cursor position after movement: ({new_x}, {new_y})")
-        
-        # Click once
-        print("Performing click...")
-        try:
-            # First try to bring window to front
-            window = self.controller.window_manager.get_window("MapleStory")
-            if window:
-                print(f"Bringing window to front: {window}")
-                try:
-                    # Try to bring window to front
-                    win32gui.SetForegroundWindow(window)
-                    time.sleep(action_delay)
-                    
-                    # Try to restore window if minimized
-                    if win32gui.IsIconic(window):
-                        win32gui.ShowWindow(window, win32con.SW_RESTORE)
-                        time.sleep(action_delay)
-                except Exception as e:
-                    print(f"Warning: Could not set window focus: {str(e)}")
-                    # Continue anyway, as the window might already be focused
-            
-            # Perform click using interception.press
-            print("Sending mouse click...")
-            self.interception.click(x, y, button="left", delay=action_delay)
-            
-            # Press Enter twice
-            print("Pressing Enter twice...")
-            for i in range(2):
-                print(f"Enter press {i+1}")
-                # Press Enter
-                print("Sending Enter key down...")
-                self.interception.key_down('enter')
-                time.sleep(0.1)
-                
-                # Release Enter
-                print("Sending Enter key up...")
-                self.interception.key_up('enter')
-                time.sleep(action_delay)
-                
-            # Wait for flame animation
-            print("Waiting for flame animation...")
-            time.sleep(parse_delay)
+            # Save the image
+            image.save(filepath)
+            logger.info("Screenshot saved to: %s", filepath)
+            
+            logger.debug("Screenshot size: %s", image.size)
+            
+            # Show the preview
+            self._show_preview(image)
             
-            # Take screenshot and parse results
-            try:
-                print("Taking screenshot...")
-                # Get the MapleStory window
-                window = self.controller.window_manager.get_window("MapleStory")
-                if not window:
-                    print("Could not find MapleStory window")
-                    return
-                    
-                # Get the window rectangle
-                window_rect = self.controller.window_manager.get_window_rect(window)
-                if not window_rect or 'client' not in window_rect:
-                    print("Could not get window dimensions")
-                    return
-                    
-                client_rect = window_rect['client']
-                width = client_rect[2] - client_rect[0]
-                height = client_rect[3] - client_rect[1]
-                
-                # Get the region coordinates
-                left = float(self.left_var.get())
-                top = float(self.top_var.get())
-                right = float(self.right_var.get())
-                bottom = float(self.bottom_var.get())
-                
-                # Convert relative coordinates to absolute
-                region = {
-                    'left': client_rect[0] + int(left * width),
-                    'top': client_rect[1] + int(top * height),
-                    'right': client_rect[0] + int(right * width),
-                    'bottom': client_rect[1] + int(bottom * height)
-                }
-                
-                print(f"Capture region: {region}")
-                
-                # Take screenshot
-                with mss.mss() as sct:
-                    monitor = {
-                        'left': region['left'],
-                        'top': region['top'],
-                        'width': region['right'] - region['left'],
-                        'height': region['bottom'] - region['top']
-                    }
-                    print(f"Taking screenshot with monitor settings: {monitor}")
-                    screenshot = sct.grab(monitor)
-                    image = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-                    
-                    # Save the screenshot
-                    base_dir = "results/flames"
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    save_dir = os.path.join(base_dir, today)
-                    os.makedirs(save_dir, exist_ok=True)
-                    
-                    timestamp = datetime.now().strftime("%H-%M-%S")
-                    filename = f"flame_{timestamp}.png"
-                    filepath = os.path.join(save_dir, filename)
-                    image.save(filepath)
-                    print(f"Screenshot saved to: {filepath}")
-                    
-                    # Parse results
-                    print("Parsing results...")
-                    results = self.controller.flame_processor.parse_flame_results(image)
-                    
-                    # Print the results
-                    if results and 'stats' in results:
-                        print("\nExtracted Stats:")
-                        for stat, value in results['stats'].items():
-                            print(f"{stat}: {value}")
-                        if results.get('attack_increase'):
-                            print(f"Attack Increase: {results['attack_increase']}")
-                        if results.get('cp_increase'):
-                            print(f"CP Increase: {results['cp_increase']}")
-                        
-                        # Update the results display
-                        self._update_results_display(results)
-                    else:
-                        print("No results available")
-                        self._update_results_display(None)
-                    
-            except Exception as e:
-                print(f"Error in screenshot/parsing: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self._update_results_display(None)
-                
         except Exception as e:
-            print(f"Error in click sequence: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            self._update_results_display(None)
+            logger.exception("Error in test screenshot")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
             
     def _start_keyboard_monitor(self):
-        """Start monitoring for keyboard interrupt"""
+        """Stop the roll when ESC is pressed, through the input backend's key hook"""
         self.should_stop = False
-        self.keyboard_thread = threading.Thread(target=self._monitor_keyboard)
-        self.keyboard_thread.daemon = True  # Thread will exit when main program exits
-        self.keyboard_thread.start()
-        
-    def _monitor_keyboard(self):
-        """Monitor for ESC key press using interception-python"""
+        self._stop_keyboard_monitor()
         try:
-            ctx = InterceptionContext()
-            ctx.set_filter(lambda d: is_keyboard(d), InterceptionContext.FILTER_KEY_DOWN)
-
-            print("Keyboard monitor started - press ESC to stop.")
-
-            while not self.should_stop:
-                device = ctx.wait()
-                stroke = ctx.receive(device)
-
-                if isinstance(stroke, KeyCode) and stroke.code == KeyCode.ESC:
-                    self.should_stop = True
-                    print("\nESC key pressed - stopping roll process...")
-                    break
-
-        except Exception as e:
-            print(f"Error in keyboard monitoring: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            self.stop_key_watch = self.controller.backends.input.watch_key('esc', self._on_stop_key)
+            logger.info("Keyboard monitor started - press ESC to stop.")
+        except Exception:
+            logger.exception("Error in keyboard monitoring")
+            
+    def _stop_keyboard_monitor(self):
+        if self.stop_key_watch is not None:
+            self.stop_key_watch()
+            self.stop_key_watch = None
+            
+    def _on_stop_key(self):
+        """ESC pressed; runs on the backend's watcher thread"""
+        if self.should_stop or not self.controller.is_running:
+            return
+        self.should_stop = True
+        logger.info("ESC key pressed - stopping roll process...")
+        self.controller.stop_reroll()
             
     def _animate_button(self):
         """Animate the button while running"""
@@ -796,248 +729,212 @@ class FlameUI:
         # Schedule next animation frame
         self.root.after(500, self._animate_button)
         
-    def _on_start_clicked(self):
-        """Handle start button click"""
+    def _collect_thresholds(self, required=True):
+        """Validate the enabled thresholds and return them, or None"""
+        thresholds = {}
+        for stat, var in self.threshold_vars.items():
+            if var.get():
+                try:
+                    value = int(self.threshold_values[stat].get())
+                    if value < 0:
+                        messagebox.showerror("Error", f"{stat} threshold must be non-negative")
+                        return None
+                    thresholds[stat] = value
+                except ValueError:
+                    messagebox.showerror("Error", f"Invalid {stat} threshold value")
+                    return None
+        
+        if required and not thresholds:
+            messagebox.showerror("Error", "Please select at least one threshold")
+            return None
+        return thresholds
+        
+    def _collect_stop_condition(self):
+        """
+        Return the stop condition expression ("" if not set), or None if it
+        does not compile
+        """
+        expression = self.stop_condition_var.get().strip()
+        if expression:
+            try:
+                StopCondition(expression)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid stop condition: {str(e)}")
+                return None
+        return expression
+        
+    def _collect_roll_settings(self):
+        """Validate the UI inputs and return the roll settings, or None"""
         try:
-            print("\nStart button clicked")
-            
-            # Update UI to show running state
-            self.start_button.config(text="Running", style='Running.TButton')
-            self.status_label.config(text="Rolling flame, press ESC to force stop.")
-            self.root.update()  # Force UI update
-            
-            # Start animation
-            self.is_animating = True
-            self._animate_button()
-            
-            # Start keyboard monitoring
-            self._start_keyboard_monitor()
-            
-            # Get the MapleStory window
-            window = self.controller.window_manager.get_window("MapleStory")
-            if not window:
-                print("Could not find MapleStory window")
-                messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
-                return
+            reroll_position = {
+                'x': float(self.x_var.get()),
+                'y': float(self.y_var.get())
+            }
+        except ValueError:
+            messagebox.showerror("Error", "Invalid reroll position coordinates")
+            return None
             
-            print(f"Found MapleStory window: {window}")
+        try:
+            capture_region = {
+                'left': float(self.left_var.get()),
+                'top': float(self.top_var.get()),
+                'right': float(self.right_var.get()),
+                'bottom': float(self.bottom_var.get())
+            }
+        except ValueError:
+            messagebox.showerror("Error", "Invalid capture region")
+            return None
             
-            # Get the window rectangle
-            window_rect = self.controller.window_manager.get_window_rect(window)
-            if not window_rect:
-                print("Could not get window rectangle")
-                messagebox.showerror("Error", "Could not get window dimensions")
-                return
-                
-            print(f"Window rectangle: {window_rect}")
+        # Get number of tries
+        try:
+            tries = int(self.tries_var.get())
+            if tries <= 0:
+                messagebox.showerror("Error", "Number of tries must be positive")
+                return None
+        except ValueError:
+            messagebox.showerror("Error", "Invalid number of tries")
+            return None
             
-            # Get the client rectangle for relative coordinates
-            if 'client' not in window_rect:
-                print("No client rectangle in window info")
-                messagebox.showerror("Error", "Could not get client area dimensions")
-                return
-                
-            client_rect = window_rect['client']
-            width = client_rect[2] - client_rect[0]
-            height = client_rect[3] - client_rect[1]
+        try:
+            delays = {
+                'parse': float(self.parse_delay_var.get()),
+                'action': float(self.action_delay_var.get()),
+                'wait_for_change': self.wait_for_change_var.get(),
+                'wait_for_dialogs': self.wait_for_dialogs_var.get(),
+                'adaptive': self.adaptive_delays_var.get()
+            }
+        except ValueError:
+            messagebox.showerror("Error", "Invalid delay values")
+            return None
+        
+        stop_condition = self._collect_stop_condition()
+        if stop_condition is None:
+            return None
+            
+        # Thresholds are optional when a stop condition is set
+        thresholds = self._collect_thresholds(required=not stop_condition)
+        if thresholds is None:
+            return None
+            
+        return {
+            'thresholds': thresholds,
+            'tries': tries,
+            'item': self.item_var.get().strip() or None,
+            'stop_condition': stop_condition or None,
+            'reroll_position': reroll_position,
+            'capture_region': capture_region,
+            'delays': delays,
+            'delay_profile': self.delay_profile,
+            'archive': self.archive_settings
+        }
+        
+    def _on_start_clicked(self):
+        """Handle start button click"""
+        logger.debug("Start button clicked")
+        if self.controller.is_running:
+            logger.debug("Reroll process is already running")
+            return
             
-            print(f"Client rectangle: {client_rect}")
-            print(f"Client dimensions: {width}x{height}")
+        # Make sure the game is there before handing over to the engine
+        if not self.controller.find_window():
+            logger.warning("Could not find MapleStory window")
+            messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
+            return
             
-            # Get the reroll position coordinates
-            try:
-                x = float(self.x_var.get())
-                y = float(self.y_var.get())
-            except ValueError:
-                messagebox.showerror("Error", "Invalid reroll position coordinates")
-                return
-                
-            # Calculate absolute coordinates
-            abs_x = client_rect[0] + int(x * width)
-            abs_y = client_rect[1] + int(y * height)
+        settings = self._collect_roll_settings()
+        if settings is None:
+            return
             
-            print(f"Moving cursor to: ({abs_x}, {abs_y})")
+        if not self.controller.start_reroll(settings):
+            return
             
-            # Get number of tries
+        # Update UI to show running state
+        self.start_button.config(text="Running", style='Running.TButton')
+        self.pause_button.config(text="Pause")
+        self.status_label.config(text="Rolling flame, press ESC to force stop.")
+        
+        # Start animation
+        self.is_animating = True
+        self._animate_button()
+        
+        # Start keyboard monitoring
+        self._start_keyboard_monitor()
+        
+        # Drain engine events from the Tk loop
+        self._poll_engine_events()
+        
+    def _poll_engine_events(self):
+        """Apply progress events posted by the reroll engine"""
+        engine = self.controller.reroll_engine
+        finished = False
+        while True:
             try:
-                tries = int(self.tries_var.get())
-                if tries <= 0:
-                    messagebox.showerror("Error", "Number of tries must be positive")
-                    return
-            except ValueError:
-                messagebox.showerror("Error", "Invalid number of tries")
-                return
-            
-            # Get enabled thresholds
-            thresholds = {}
-            for stat, var in self.threshold_vars.items():
-                if var.get():
-                    try:
-                        value = int(self.threshold_values[stat].get())
-                        if value < 0:
-                            messagebox.showerror("Error", f"{stat} threshold must be non-negative")
-                            return
-                        thresholds[stat] = value
-                    except ValueError:
-                        messagebox.showerror("Error", f"Invalid {stat} threshold value")
-                        return
-            
-            if not thresholds:
-                messagebox.showerror("Error", "Please select at least one threshold")
-                return
-            
-            print(f"Starting reroll process with {tries} tries")
-            print(f"Thresholds: {thresholds}")
-            
-            # Perform reroll loop
-            for attempt in range(tries):
-                # Check if we should stop
-                if self.should_stop:
-                    print("Roll process stopped by user")
-                    self.status_label.config(text="Roll process stopped by user")
-                    self.root.update()  # Force UI update
-                    return
-                    
-                print(f"\nAttempt {attempt + 1}/{tries}")
-                
-                # Perform click sequence and parse results
-                self._perform_click_sequence(abs_x, abs_y)
-                
-                # Check if we should stop after each attempt
-                if self.should_stop:
-                    print("Roll process stopped by user")
-                    self.status_label.config(text="Roll process stopped by user")
-                    self.root.update()  # Force UI update
-                    return
+                event = engine.events.get_nowait()
+            except queue.Empty:
+                break
                 
-                # Get the results from the results display
-                results_text = self.results_text.get(1.0, tk.END).strip()
-                if not results_text or results_text == "No results available":
-                    print("No results available, continuing...")
-                    continue
+            if event['type'] == 'status':
+                self.status_label.config(text=event['text'])
+            elif event['type'] == 'state':
+                if event['state'] == 'paused':
+                    self.status_label.config(text="Paused")
+                    self.pause_button.config(text="Resume")
+                elif event['state'] == 'running':
+                    self.status_label.config(text="Rolling flame, press ESC to force stop.")
+                    self.pause_button.config(text="Pause")
+                elif event['state'] == 'stopping':
+                    self.status_label.config(text="Force stopping roll process...")
+            elif event['type'] == 'result':
+                with engine.timer.stage('ui'):
+                    self._update_results_display(event['results'])
+                    self.results_text.config(state=tk.NORMAL)
+                    self.results_text.insert(1.0, f"Attempt {event['attempt']}/{event['tries']}\n\n")
+                    self.results_text.config(state=tk.DISABLED)
+            elif event['type'] == 'finished':
+                finished = True
+                if event.get('delay_profile'):
+                    self._save_delay_profile(event['delay_profile'])
                 
-                # Parse the results text to get stats
-                stats = {}
-                for line in results_text.split('\n'):
-                    if ':' in line:
-                        # Split only on the first colon
-                        parts = line.split(':', 1)
-                        if len(parts) == 2:
-                            stat = parts[0].strip()
-                            value_str = parts[1].strip()
-                            try:
-                                # Extract the first number from the value string
-                                import re
-                                # Updated regex pattern to handle various formats
-                                pattern = r'[+-]?\d+'
-                                numbers = re.findall(pattern, value_str)
-                                if numbers:
-                                    value = int(numbers[0])
-                                    stats[stat] = value
-                            except ValueError:
-                                continue
-                    elif 'Stats |' in line or 'All Stats' in line:
-                        # Handle both "Stats" and "All Stats" cases
-                        try:
-                            import re
-                            numbers = re.findall(r'[+-]?\d+', line)
-                            if numbers:
-                                stats['STATS%'] = int(numbers[0])
-                        except ValueError:
-                            continue
-                    else:
-                        # Handle cases where stats are in the format "STAT +value" or "STAT +value)"
-                        try:
-                            import re
-                            # Match stat names followed by optional characters and a number
-                            stat_pattern = r'(STR|DEX|INT|LUK|STATS?)\s*[^0-9]*([+-]?\d+)'
-                            matches = re.findall(stat_pattern, line, re.IGNORECASE)
-                            for stat, value in matches:
-                                # Normalize stat name
-                                stat = stat.upper()
-                                if stat == 'STATS':
-                                    stat = 'STATS%'
-                                stats[stat] = int(value)
-                        except ValueError:
-                            continue
+        # Live panel, at most twice a second
+        if finished or time.perf_counter() - self._performance_refreshed >= 0.5:
+            self._refresh_performance()
                 
-                if not stats:
-                    print("Could not parse stats from results, continuing...")
-                    continue
-                
-                # Check if thresholds are met
-                thresholds_met = True
-                for stat, threshold in thresholds.items():
-                    if stat not in stats:
-                        print(f"Warning: {stat} not found in results")
-                        thresholds_met = False
-                        break
-                    
-                    value = stats[stat]
-                    if value < threshold:
-                        print(f"{stat} threshold not met: {value} < {threshold}")
-                        thresholds_met = False
-                        break
-                
-                if thresholds_met:
-                    print("All thresholds met! Stopping reroll process.")
-                    self.status_label.config(text="All thresholds met! Stopping reroll process.")
-                    self.root.update()  # Force UI update
-                    return
-                
-                print("Thresholds not met, continuing...")
-                
-                # Update the results display with current attempt info
-                self.results_text.config(state=tk.NORMAL)
-                self.results_text.delete(1.0, tk.END)
-                self.results_text.insert(1.0, f"Attempt {attempt + 1}/{tries}\n\n")
-                self.results_text.insert(tk.END, results_text)
-                self.results_text.config(state=tk.DISABLED)
-                self.root.update()  # Force UI update
-            
-            print("Maximum number of tries reached without meeting thresholds")
-            self.status_label.config(text="Maximum number of tries reached without meeting thresholds")
-            self.root.update()  # Force UI update
-            
-        except Exception as e:
-            print(f"Error in start button click: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            self.status_label.config(text=f"An error occurred: {str(e)}")
-            self.root.update()  # Force UI update
-        finally:
+        if finished:
             # Reset the stop flag and UI
+            self._stop_keyboard_monitor()
             self.should_stop = False
             self.is_animating = False
             self.start_button.config(text="Roll", style='Normal.TButton')
-            self.root.update()  # Force UI update
-        
+            self.pause_button.config(text="Pause")
+        else:
+            self.root.after(50, self._poll_engine_events)
+            
     def _on_set_position(self):
         """Open the position selector window"""
         try:
-            print("Starting position selection...")
+            logger.debug("Starting position selection...")
             
             # Get the MapleStory window
             window = self.controller.window_manager.get_window("MapleStory")
             if not window:
-                print("Could not find MapleStory window")
+                logger.warning("Could not find MapleStory window")
                 messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
                 return
             
-            print(f"Found MapleStory window: {window}")
+            logger.debug("Found MapleStory window: %s", window)
             
             # Get the window rectangle
             window_rect = self.controller.window_manager.get_window_rect(window)
             if not window_rect:
-                print("Could not get window rectangle")
+                logger.warning("Could not get window rectangle")
                 messagebox.showerror("Error", "Could not get window dimensions")
                 return
                 
-            print(f"Window rectangle: {window_rect}")
+            logger.debug("Window rectangle: %s", window_rect)
             
             # Get the client rectangle for relative coordinates
             if 'client' not in window_rect:
-                print("No client rectangle in window info")
+                logger.warning("No client rectangle in window info")
                 messagebox.showerror("Error", "Could not get client area dimensions")
                 return
                 
@@ -1045,63 +942,63 @@ class FlameUI:
             width = client_rect[2] - client_rect[0]
             height = client_rect[3] - client_rect[1]
             
-            print(f"Client rectangle: {client_rect}")
-            print(f"Client dimensions: {width}x{height}")
+            logger.debug("Client rectangle: %s", client_rect)
+            logger.debug("Client dimensions: %sx%s", width, height)
             
             def on_position_selected(x, y):
                 try:
-                    print(f"Position selected: ({x}, {y})")
+                    logger.debug("Position selected: (%s, %s)", x, y)
                     
                     # Convert absolute coordinates to relative
                     rel_x = (x - client_rect[0]) / width
                     rel_y = (y - client_rect[1]) / height
                     
-                    print(f"Relative coordinates: x={rel_x}, y={rel_y}")
+                    logger.debug("Relative coordinates: x=%s, y=%s", rel_x, rel_y)
                     
                     # Update the input fields
                     self.x_var.set(f"{rel_x:.3f}")
                     self.y_var.set(f"{rel_y:.3f}")
                     
                 except Exception as e:
-                    print(f"Error in position selection callback: {str(e)}")
+                    logger.exception("Error in position selection callback")
                     messagebox.showerror("Error", f"Failed to process selected position: {str(e)}")
             
             # Create and run the position selector
-            print("Creating position selector...")
+            logger.debug("Creating position selector...")
             selector = PositionSelector(on_position_selected, window_rect, self.root)  # Added self.root as parent
-            print("Running position selector...")
+            logger.debug("Running position selector...")
             selector.run()
             
         except Exception as e:
-            print(f"Error in position selection: {str(e)}")
+            logger.exception("Error in position selection")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
         
     def _on_check_position(self):
         """Move cursor to the specified position"""
         try:
-            print("Checking position...")
+            logger.debug("Checking position...")
             
             # Get the MapleStory window
             window = self.controller.window_manager.get_window("MapleStory")
             if not window:
-                print("Could not find MapleStory window")
+                logger.warning("Could not find MapleStory window")
                 messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
                 return
             
-            print(f"Found MapleStory window: {window}")
+            logger.debug("Found MapleStory window: %s", window)
             
             # Get the window rectangle
             window_rect = self.controller.window_manager.get_window_rect(window)
             if not window_rect:
-                print("Could not get window rectangle")
+                logger.warning("Could not get window rectangle")
                 messagebox.showerror("Error", "Could not get window dimensions")
                 return
                 
-            print(f"Window rectangle: {window_rect}")
+            logger.debug("Window rectangle: %s", window_rect)
             
             # Get the client rectangle for relative coordinates
             if 'client' not in window_rect:
-                print("No client rectangle in window info")
+                logger.warning("No client rectangle in window info")
                 messagebox.showerror("Error", "Could not get client area dimensions")
                 return
                 
@@ -1109,15 +1006,15 @@ class FlameUI:
             width = client_rect[2] - client_rect[0]
             height = client_rect[3] - client_rect[1]
             
-            print(f"Client rectangle: {client_rect}")
-            print(f"Client dimensions: {width}x{height}")
+            logger.debug("Client rectangle: %s", client_rect)
+            logger.debug("Client dimensions: %sx%s", width, height)
             
             # Get the position coordinates from the input fields
             try:
                 x = float(self.x_var.get())
                 y = float(self.y_var.get())
             except ValueError:
-                print("Invalid position coordinates")
+                logger.warning("Invalid position coordinates")
                 messagebox.showerror("Error", "Invalid position coordinates")
                 return
                 
@@ -1125,14 +1022,14 @@ class FlameUI:
             abs_x = client_rect[0] + int(x * width)
             abs_y = client_rect[1] + int(y * height)
             
-            print(f"Moving cursor to: ({abs_x}, {abs_y})")
+            logger.debug("Moving cursor to: (%s, %s)", abs_x, abs_y)
             
             # Move the cursor
-            current_x, current_y = win32api.GetCursorPos()
-            self._move_cursor_smoothly(current_x, current_y, abs_x, abs_y, steps=10, delay=0.05)
+            current_x, current_y = self.controller.input.get_cursor_pos()
+            self.controller.reroll_engine.move_cursor_smoothly(current_x, current_y, abs_x, abs_y, steps=10, delay=0.05)
             
         except Exception as e:
-            print(f"Error checking position: {str(e)}")
+            logger.exception("Error checking position")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
         
     def _create_region_adjustment(self):
@@ -1210,36 +1107,204 @@ class FlameUI:
         # Add some padding at the bottom
         ttk.Label(self.main_frame, text="").grid(row=4, column=0, pady=5)
         
+        # Roll estimate from the flame simulator
+        self._create_estimate_frame()
+        
+        # Live rolls per minute and stage percentiles
+        self._create_performance_frame()
+        
         # Add status label
         self.status_label = ttk.Label(self.main_frame, text="")
         self.status_label.grid(row=12, column=0, pady=5)
         
+    def _create_estimate_frame(self):
+        """Create the roll estimate section"""
+        estimate_frame = ttk.LabelFrame(self.main_frame, text="Roll Estimate", padding="5")
+        estimate_frame.grid(row=5, column=0, sticky=tk.EW, pady=5)
+        
+        # Flame type and the item it is used on
+        ttk.Label(estimate_frame, text="Flame:").grid(row=0, column=0, padx=5, pady=2, sticky=tk.W)
+        self.flame_type_var = tk.StringVar(value=DEFAULT_FLAME_TYPE)
+        ttk.Combobox(
+            estimate_frame,
+            textvariable=self.flame_type_var,
+            values=list(FLAME_TIERS),
+            state='readonly',
+            width=22
+        ).grid(row=0, column=1, columnspan=2, padx=5, pady=2, sticky=tk.W)
+        
+        ttk.Label(estimate_frame, text="Item Level:").grid(row=0, column=3, padx=5, pady=2, sticky=tk.W)
+        self.item_level_var = tk.StringVar(value="150")
+        ttk.Entry(estimate_frame, textvariable=self.item_level_var, width=5).grid(row=0, column=4, padx=5, pady=2)
+        
+        self.boss_item_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(estimate_frame, text="Boss item", variable=self.boss_item_var).grid(
+            row=1, column=0, columnspan=2, padx=5, pady=2, sticky=tk.W)
+        self.weapon_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(estimate_frame, text="Weapon", variable=self.weapon_var).grid(
+            row=1, column=2, padx=5, pady=2, sticky=tk.W)
+        
+        # Weapon attack lines add a percentage of the weapon's base attack
+        ttk.Label(estimate_frame, text="Base ATT:").grid(row=1, column=3, padx=5, pady=2, sticky=tk.W)
+        self.base_attack_var = tk.StringVar(value="0")
+        ttk.Entry(estimate_frame, textvariable=self.base_attack_var, width=5).grid(row=1, column=4, padx=5, pady=2)
+        
+        self.estimate_button = ttk.Button(
+            estimate_frame,
+            text="Estimate",
+            command=self._on_estimate_clicked
+        )
+        self.estimate_button.grid(row=2, column=3, columnspan=2, padx=5, pady=2)
+        
+        self.estimate_label = ttk.Label(estimate_frame, text="", justify=tk.LEFT)
+        self.estimate_label.grid(row=3, column=0, columnspan=5, padx=5, pady=2, sticky=tk.W)
+        # Results of the estimate running on its worker thread
+        self._estimate_results = queue.Queue()
+        
+    def _create_performance_frame(self):
+        """Create the live throughput panel: rolls per minute and p50/p95 per stage"""
+        performance_frame = ttk.LabelFrame(self.main_frame, text="Performance", padding="5")
+        performance_frame.grid(row=7, column=1, sticky=tk.EW, pady=5, padx=(10, 0))
+        
+        self.throughput_label = ttk.Label(performance_frame, text="Rolls/min: -")
+        self.throughput_label.grid(row=0, column=0, padx=5, pady=2, sticky=tk.W)
+        
+        ttk.Button(
+            performance_frame,
+            text="Export Trace",
+            command=self._on_export_trace
+        ).grid(row=0, column=1, padx=5, pady=2, sticky=tk.E)
+        
+        # One row per stage, in the order the stages first ran
+        self.stage_tree = ttk.Treeview(performance_frame, columns=('p50', 'p95', 'count'), height=8)
+        self.stage_tree.heading('#0', text="Stage")
+        self.stage_tree.heading('p50', text="p50 ms")
+        self.stage_tree.heading('p95', text="p95 ms")
+        self.stage_tree.heading('count', text="Samples")
+        self.stage_tree.column('#0', width=110)
+        for column in ('p50', 'p95', 'count'):
+            self.stage_tree.column(column, width=70, anchor=tk.E)
+        self.stage_tree.grid(row=1, column=0, columnspan=2, padx=5, pady=2, sticky=tk.EW)
+        performance_frame.grid_columnconfigure(0, weight=1)
+        
+        # perf_counter() of the last refresh while rolling
+        self._performance_refreshed = 0.0
+        
+    def _refresh_performance(self):
+        """Show the engine's current rolls per minute and stage percentiles"""
+        timer = self.controller.reroll_engine.timer
+        self._performance_refreshed = time.perf_counter()
+        rate = timer.rolls_per_minute()
+        self.throughput_label.config(text=f"Rolls/min: {rate:.1f}" if rate is not None else "Rolls/min: -")
+        
+        for stage, stats in timer.percentiles().items():
+            values = (f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}", stats['count'])
+            if self.stage_tree.exists(stage):
+                self.stage_tree.item(stage, values=values)
+            else:
+                self.stage_tree.insert('', tk.END, iid=stage, text=stage, values=values)
+        
+    def _on_export_trace(self):
+        """Save the recorded stage spans as a Chrome trace"""
+        timer = self.controller.reroll_engine.timer
+        path = os.path.join("results", "traces", f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        try:
+            spans = timer.export_chrome_trace(path)
+        except Exception as e:
+            logger.exception("Error exporting trace")
+            messagebox.showerror("Error", f"Failed to export trace: {str(e)}")
+            return
+        logger.info("Trace with %d spans written to %s", spans, path)
+        messagebox.showinfo("Trace Exported",
+                            f"{spans} spans written to {path}\nOpen it in chrome://tracing or ui.perfetto.dev")
+        
+    def _on_estimate_clicked(self):
+        """Simulate the enabled thresholds and show how many rolls they take"""
+        thresholds = self._collect_thresholds()
+        if thresholds is None:
+            return
+            
+        try:
+            item_level = int(self.item_level_var.get())
+            tries = int(self.tries_var.get())
+            base_attack = int(self.base_attack_var.get() or 0)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid item level, base attack or number of tries")
+            return
+            
+        options = {
+            'flame_type': self.flame_type_var.get(),
+            'item_level': item_level,
+            'boss_item': self.boss_item_var.get(),
+            'weapon': self.weapon_var.get(),
+            'base_attack': base_attack or None,
+        }
+        # A million rolls take a moment, so they run off the Tk thread
+        self.estimate_button.config(state=tk.DISABLED)
+        self.estimate_label.config(text="Simulating...")
+        threading.Thread(target=self._run_estimate, args=(options, thresholds, tries), daemon=True).start()
+        self._poll_estimate(tries)
+        
+    def _run_estimate(self, options: Dict, thresholds: Dict, tries: int):
+        """Worker thread: simulate and hand the estimate (or the error) to the Tk loop"""
+        try:
+            self._estimate_results.put(FlameSimulator(**options).estimate(thresholds, tries=tries))
+        except Exception as e:
+            logger.exception("Error estimating rolls")
+            self._estimate_results.put(e)
+            
+    def _poll_estimate(self, tries: int):
+        """Show the estimate once the worker thread has posted it"""
+        try:
+            estimate = self._estimate_results.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._poll_estimate, tries)
+            return
+            
+        self.estimate_button.config(state=tk.NORMAL)
+        if isinstance(estimate, Exception):
+            self.estimate_label.config(text="")
+            messagebox.showerror("Error", str(estimate))
+            return
+        
+        if estimate['hits'] == 0:
+            text = f"Not reached in {estimate['simulated']:,} simulated rolls"
+        else:
+            needed = estimate['rolls_needed']
+            text = (
+                f"Chance per roll: {estimate['probability']:.3%} (±{estimate['std_error']:.3%})\n"
+                f"Average {estimate['expected_rolls']:,.0f} rolls; "
+                f"50%: {needed[0.5]:,}, 90%: {needed[0.9]:,}, 99%: {needed[0.99]:,}\n"
+                f"Chance within {tries} tries: {estimate['chance_within_tries']:.1%}"
+            )
+        self.estimate_label.config(text=text)
+        
     def _on_select_region(self):
         """Handle select region button click"""
         try:
-            print("Starting region selection...")
+            logger.debug("Starting region selection...")
             
             # Get the MapleStory window
             window = self.controller.window_manager.get_window("MapleStory")
             if not window:
-                print("Could not find MapleStory window")
+                logger.warning("Could not find MapleStory window")
                 messagebox.showerror("Error", "Could not find MapleStory window. Make sure MapleStory is running.")
                 return
             
-            print(f"Found MapleStory window: {window}")
+            logger.debug("Found MapleStory window: %s", window)
             
             # Get the window rectangle
             window_rect = self.controller.window_manager.get_window_rect(window)
             if not window_rect:
-                print("Could not get window rectangle")
+                logger.warning("Could not get window rectangle")
                 messagebox.showerror("Error", "Could not get window dimensions")
                 return
                 
-            print(f"Window rectangle: {window_rect}")
+            logger.debug("Window rectangle: %s", window_rect)
             
             # Get the client rectangle for relative coordinates
             if 'client' not in window_rect:
-                print("No client rectangle in window info")
+                logger.warning("No client rectangle in window info")
                 messagebox.showerror("Error", "Could not get client area dimensions")
                 return
                 
@@ -1247,12 +1312,12 @@ class FlameUI:
             width = client_rect[2] - client_rect[0]
             height = client_rect[3] - client_rect[1]
             
-            print(f"Client rectangle: {client_rect}")
-            print(f"Client dimensions: {width}x{height}")
+            logger.debug("Client rectangle: %s", client_rect)
+            logger.debug("Client dimensions: %sx%s", width, height)
             
             def on_region_selected(region):
                 try:
-                    print(f"Region selected: {region}")
+                    logger.debug("Region selected: %s", region)
                     
                     # Convert absolute coordinates to relative
                     rel_left = (region['left'] - client_rect[0]) / width
@@ -1260,7 +1325,8 @@ class FlameUI:
                     rel_right = (region['right'] - client_rect[0]) / width
                     rel_bottom = (region['bottom'] - client_rect[1]) / height
                     
-                    print(f"Relative coordinates: left={rel_left}, top={rel_top}, right={rel_right}, bottom={rel_bottom}")
+                    logger.debug("Relative coordinates: left=%s, top=%s, right=%s, bottom=%s",
+                                 rel_left, rel_top, rel_right, rel_bottom)
                     
                     # Update the input fields
                     self.left_var.set(f"{rel_left:.3f}")
@@ -1269,17 +1335,17 @@ class FlameUI:
                     self.bottom_var.set(f"{rel_bottom:.3f}")
                     
                 except Exception as e:
-                    print(f"Error in region selection callback: {str(e)}")
+                    logger.exception("Error in region selection callback")
                     messagebox.showerror("Error", f"Failed to process selected region: {str(e)}")
             
             # Create and run the region selector
-            print("Creating region selector...")
+            logger.debug("Creating region selector...")
             selector = RegionSelector(on_region_selected, window_rect, self.root)
-            print("Running region selector...")
+            logger.debug("Running region selector...")
             selector.run()
             
         except Exception as e:
-            print(f"Error in region selection: {str(e)}")
+            logger.exception("Error in region selection")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
         
     def _update_results_display(self, results):
@@ -1288,24 +1354,7 @@ class FlameUI:
         self.results_text.delete(1.0, tk.END)
         
         if results:
-            # Format the results text
-            text = "Extracted Stats:\n"
-            
-            # Add each stat with proper formatting
-            for stat, value in results['stats'].items():
-                if stat == 'STATS%':
-                    text += f"All Stats: {value}\n"
-                else:
-                    text += f"{stat}: {value}\n"
-            
-            # Add attack and CP increases if present
-            if results['attack_increase'] is not None:
-                text += f"Attack Increase: {results['attack_increase']}\n"
-            if results['cp_increase'] is not None:
-                text += f"CP Increase: {results['cp_increase']}\n"
-            
-            # Add raw OCR text at the bottom
-            text += f"\nRaw OCR text:\n{results['raw_text']}"
+            text = results.format_display()
         else:
             text = "No results available"
             
@@ -1314,13 +1363,22 @@ class FlameUI:
         
     def _on_force_stop(self):
         """Handle force stop button click"""
-        if self.is_animating:
-            print("Force stopping roll process...")
+        if self.controller.is_running:
+            logger.info("Force stopping roll process...")
             self.should_stop = True
-            self.status_label.config(text="Force stopping roll process...")
-            self.root.update()  # Force UI update
+            self.controller.stop_reroll()
+        else:
+            logger.info("No roll process running")
+            
+    def _on_pause_clicked(self):
+        """Pause or resume the roll process"""
+        engine = self.controller.reroll_engine
+        if not engine.is_running:
+            logger.info("No roll process running")
+        elif engine.state == 'paused':
+            engine.resume()
         else:
-            print("No roll process running")
+            engine.pause()
         
     def run(self):
         self.root.mainloop()
@@ -1357,9 +1415,9 @@ class PositionSelector:
         y = self.client_rect[1] + event.y
         
         # Print debug information
-        print(f"Clicked position (absolute): ({x}, {y})")
-        print(f"Client rect: {self.client_rect}")
-        print(f"Canvas coordinates: x={event.x}, y={event.y}")
+        logger.debug("Clicked position (absolute): (%s, %s)", x, y)
+        logger.debug("Client rect: %s", self.client_rect)
+        logger.debug("Canvas coordinates: x=%s, y=%s", event.x, event.y)
         
         self.on_position_selected(x, y)
         self.root.destroy()
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from src.backends.base import to_image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_DIR = "results/debug"
+DEFAULT_MAX_MB = 64
+
+
+class DebugSink:
+    """
+    Keeps the intermediate images of the OCR pipeline for selected rolls so
+    misreads can be reproduced offline. Off unless enabled in the "debug"
+    section of flame_settings.json.
+
+    The engine opens a roll with begin_roll(), the processors record() their
+    stages while it is open, and end_roll() decides whether to keep them:
+    every Nth roll and/or every roll that failed to parse. Kept rolls are
+    written by a background thread to <base_dir>/<date>/<run>/ as
+    roll_<id>_<stage>.png plus roll_<id>.json with the OCR text and the
+    archived screenshot. Images waiting for the writer are limited to max_mb;
+    rolls that do not fit are dropped.
+    """
+
+    def __init__(self, base_dir: str = DEFAULT_BASE_DIR, every: int = 0, on_failure: bool = False,
+                 max_mb: float = DEFAULT_MAX_MB, compress_level: int = 1):
+        self.every = max(0, int(every))
+        self.on_failure = on_failure
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.compress_level = compress_level
+        now = datetime.now()
+        self.run_dir = os.path.join(base_dir, now.strftime("%Y-%m-%d"), now.strftime("%H-%M-%S"))
+
+        # Stages of the open roll: (roll id, [(stage, image)], bytes)
+        self._roll = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.pending_bytes = 0
+
+        self.saved = 0
+        self.dropped = 0
+        self.last_error = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict]) -> Optional['DebugSink']:
+        """
+        Sink for the "debug" section of flame_settings.json, e.g.
+        {"every": 100, "on_failure": true, "dir": "results/debug", "max_mb": 64}.
+        None when neither sampling nor failure capture is turned on.
+        """
+        options = dict(settings or {})
+        if 'dir' in options:
+            options['base_dir'] = options.pop('dir')
+        if not options.get('every') and not options.get('on_failure'):
+            return None
+        return cls(**options)
+
+    @property
+    def recording(self) -> bool:
+        """Whether a roll is open; processors only copy stages while it is"""
+        return self._roll is not None
+
+    def begin_roll(self, roll_id: int):
+        """Start collecting the stages of a roll, unless it can not be kept anyway"""
+        if self.on_failure or (self.every and roll_id % self.every == 0):
+            self._roll = (roll_id, [], 0)
+        else:
+            self._roll = None
+
+    def record(self, stage: str, image):
+        """
+        Keep a copy of one stage of the open roll. Takes a PIL image, an RGB or
+        gray array or a BGRA grab array. Does nothing when no roll is open.
+        """
+        if self._roll is None:
+            return
+        roll_id, stages, size = self._roll
+        if isinstance(image, Image.Image):
+            image = image.copy()
+            nbytes = image.width * image.height * len(image.getbands())
+        else:
+            image = np.array(image, copy=True)
+            nbytes = image.nbytes
+        stages.append((stage, image))
+        self._roll = (roll_id, stages, size + nbytes)
+
+    def end_roll(self, failed: bool, info: Optional[Dict] = None) -> bool:
+        """
+        Close the open roll and queue its stages if the roll is sampled or
+        failed (with on_failure). info is saved next to the images.
+        Returns True if the roll is being saved.
+        """
+        roll, self._roll = self._roll, None
+        if roll is None:
+            return False
+        roll_id, stages, size = roll
+        sampled = self.every and roll_id % self.every == 0
+        if not stages or not (sampled or (failed and self.on_failure)):
+            return False
+
+        with self._lock:
+            if self.pending_bytes + size > self.max_bytes:
+                self.dropped += 1
+                return False
+            self.pending_bytes += size
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name='flame-debug-sink', daemon=True)
+                self._thread.start()
+
+        meta = dict(info or {})
+        meta.update({'roll': roll_id, 'failed': failed, 'stages': [stage for stage, _ in stages]})
+        self._queue.put((roll_id, stages, size, meta))
+        return True
+
+    def _write(self, roll_id: int, stages, meta: Dict):
+        os.makedirs(self.run_dir, exist_ok=True)
+        prefix = os.path.join(self.run_dir, f"roll_{roll_id:06d}")
+        for stage, image in stages:
+            if not isinstance(image, Image.Image):
+                # BGRA grabs are decoded here, RGB and gray arrays as they are
+                grab = image.ndim == 3 and image.shape[2] == 4
+                image = to_image(image) if grab else Image.fromarray(image)
+            image.save(f"{prefix}_{stage}.png", format='PNG', compress_level=self.compress_level)
+        with open(f"{prefix}.json", 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                roll_id, stages, size, meta = item
+                try:
+                    self._write(roll_id, stages, meta)
+                    self.saved += 1
+                finally:
+                    with self._lock:
+                        self.pending_bytes -= size
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Error saving debug images: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued roll is written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        self._roll = None
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            'saved': self.saved,
+            'dropped': self.dropped,
+            'pending_bytes': self.pending_bytes,
+            'dir': self.run_dir,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,103 @@
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+# Lowest delays the tuner goes down to, in seconds
+MIN_ACTION_DELAY = 0.05
+MIN_PARSE_DELAY = 0.1
+# Seconds taken off a delay after each clean roll
+DEFAULT_STEP = 0.02
+# Factor a delay is multiplied with after a failed roll
+DEFAULT_BACKOFF = 1.5
+# Learned delays stay this far above the slowest recent dialog/result settle time
+DEFAULT_MARGIN = 1.5
+# Settle times remembered per delay
+DEFAULT_WINDOW = 50
+
+
+class DelayTuner:
+    """
+    Learns the action and parse delays of this machine while rolling. Enabled
+    with "adaptive": true in the "delays" section of flame_settings.json; the
+    hand-set delays are then the upper limits.
+
+    The delays follow AIMD: every clean roll takes `step` seconds off both,
+    and a roll that failed to parse multiplies them by `backoff`. A result
+    wait that timed out backs off the parse delay, and one where the result
+    never changed (the input was dropped) backs off both. When dialog or
+    result detection is on, the delays are timeouts and never shrink below
+    `margin` times the slowest settle time of the last `window` rolls.
+
+    The learned delays are kept as the "delay_profile" section, so the next
+    run starts from them.
+    """
+
+    def __init__(self, action: float, parse: float, max_action: float, max_parse: float,
+                 step: float = DEFAULT_STEP, backoff: float = DEFAULT_BACKOFF, margin: float = DEFAULT_MARGIN,
+                 window: int = DEFAULT_WINDOW, rolls: int = 0, failures: int = 0):
+        self.max_action = max(max_action, MIN_ACTION_DELAY)
+        self.max_parse = max(max_parse, MIN_PARSE_DELAY)
+        self.action = min(max(action, MIN_ACTION_DELAY), self.max_action)
+        self.parse = min(max(parse, MIN_PARSE_DELAY), self.max_parse)
+        self.step = step
+        self.backoff = backoff
+        self.margin = margin
+        self.rolls = rolls
+        self.failures = failures
+        self._dialog_settles = deque(maxlen=window)
+        self._result_settles = deque(maxlen=window)
+
+    @classmethod
+    def from_settings(cls, delays: Dict, profile: Optional[Dict] = None) -> Optional['DelayTuner']:
+        """
+        Tuner for the "delays" section, starting from a saved "delay_profile".
+        None unless the delays are adaptive.
+        """
+        if not delays.get('adaptive'):
+            return None
+        action, parse = float(delays['action']), float(delays['parse'])
+        profile = profile or {}
+        options = {key: delays[key] for key in ('step', 'backoff', 'margin', 'window') if key in delays}
+        return cls(float(profile.get('action', action)), float(profile.get('parse', parse)),
+                   max_action=action, max_parse=parse, rolls=int(profile.get('rolls', 0)),
+                   failures=int(profile.get('failures', 0)), **options)
+
+    def update(self, success: bool, result_wait: Optional[Dict] = None, dialog_waits: Iterable[Dict] = ()):
+        """
+        Adjust the delays after a roll. result_wait and dialog_waits are the
+        FrameWatcher and UIStateDetector last_wait dicts of the roll, if any.
+        """
+        self.rolls += 1
+        for wait in dialog_waits:
+            if not wait['timed_out']:
+                self._dialog_settles.append(wait['elapsed'])
+        result_timed_out = result_wait is not None and result_wait['timed_out']
+        if result_wait is not None and not result_timed_out:
+            self._result_settles.append(result_wait['elapsed'])
+
+        # A result that never changed usually means the game dropped the input
+        dropped = result_timed_out and not result_wait.get('changed', True)
+        action_ok = success and not dropped
+        parse_ok = success and not result_timed_out
+        if not success:
+            self.failures += 1
+
+        self.action = self._adjust(self.action, action_ok, MIN_ACTION_DELAY, self.max_action, self._dialog_settles)
+        self.parse = self._adjust(self.parse, parse_ok, MIN_PARSE_DELAY, self.max_parse, self._result_settles)
+
+    def _adjust(self, delay: float, ok: bool, lowest: float, highest: float, settles) -> float:
+        if not ok:
+            return min(delay * self.backoff, highest)
+        floor = max(lowest, self.margin * max(settles)) if settles else lowest
+        # Never raised by a clean roll, only kept from shrinking below the floor
+        return max(floor, delay - self.step) if delay > floor else delay
+
+    def profile(self) -> Dict:
+        """The learned delays as saved in the "delay_profile" section"""
+        return {
+            'action': round(self.action, 3),
+            'parse': round(self.parse, 3),
+            'rolls': self.rolls,
+            'failures': self.failures,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
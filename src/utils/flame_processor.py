@@ -1,16 +1,27 @@
+import logging
 import pytesseract
 from PIL import Image, ImageEnhance, ImageFilter
 import re
-import mss
 import numpy as np
 import os
 from difflib import get_close_matches
 from rapidfuzz import fuzz, process
 import cv2
+import threading
+from src.backends.base import frame_array, to_image
+from src.backends.capture import MssCapture
+from src.utils.flame_result import FlameResult
+from src.utils.glyph_recognizer import GlyphRecognizer
+from src.utils.tesseract_engine import get_shared_engine
+from src.utils.timing import timed
+
+logger = logging.getLogger(__name__)
 
 class FlameProcessor:
-    def __init__(self):
-        self.sct = mss.mss()
+    def __init__(self, capture=None):
+        # CaptureBackend for capture_result_region, the controller's capture service when given.
+        # Otherwise mss, created on first capture so the processor can be built without a display
+        self.capture = capture
         
         # Configure Tesseract path
         try:
@@ -24,7 +35,11 @@ class FlameProcessor:
                     pytesseract.pytesseract.tesseract_cmd = path
                     break
         except Exception as e:
-            print(f"Warning: Could not configure Tesseract path: {e}")
+            logger.warning("Could not configure Tesseract path: %s", e)
+            
+        # Tesseract stays loaded for the whole session instead of one process per roll
+        self.tesseract_engine = get_shared_engine()
+        self._warm_thread = None
             
         # Define known stat names for fuzzy matching
         self.known_stats = [
@@ -32,18 +47,38 @@ class FlameProcessor:
             'MaxHP', 'MaxMP', 'DEF', 'SPEED', 'Attack Increase', 'CP Increase'
         ]
         
+        # Glyph template matcher for the game font, Tesseract is the fallback
+        self.glyph_recognizer = GlyphRecognizer()
+        
+        # DebugSink that keeps the pipeline images of selected rolls, set by the engine
+        self.debug_sink = None
+        # StageTimer for the OCR steps, set by the engine
+        self.timer = None
+        
+    def warm_up(self):
+        """Load the Tesseract handles in the background so the UI can start immediately"""
+        if self._warm_thread is None:
+            self._warm_thread = threading.Thread(target=self.tesseract_engine.warm_up, daemon=True)
+            self._warm_thread.start()
+            
+    def is_ready(self):
+        """Whether OCR is loaded and ready to use"""
+        return (self._warm_thread is not None and not self._warm_thread.is_alive() and
+                self.tesseract_engine.error is None)
+        
+    def load_error(self):
+        """Why Tesseract could not be loaded, if it failed"""
+        return self.tesseract_engine.error
+        
     def capture_result_region(self, window_rect):
-        """Capture the region containing flame results"""
+        """Capture the region containing flame results as a BGRA array"""
         try:
-            print(f"Capturing window region: {window_rect}")
-            
             # Extract the window coordinates from the mss format
             if isinstance(window_rect, dict):
                 # mss format: {'window': (left, top, right, bottom), 'client': ...}
                 left, top, right, bottom = window_rect['window']
                 width = right - left
                 height = bottom - top
-                print(f"Window dimensions: {width}x{height}")
                 
                 # Create a new rect in the format mss expects
                 monitor = {
@@ -57,12 +92,12 @@ class FlameProcessor:
                 monitor = window_rect
                 
             # Take a screenshot of the window
-            screenshot = self.sct.grab(monitor)
-            print(f"Screenshot size: {screenshot.size}")
+            if self.capture is None:
+                self.capture = MssCapture()
+            screenshot = self.capture.grab(monitor)
             
-            # Convert to PIL Image
-            screenshot = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-            print(f"PIL Image size: {screenshot.size}")
+            # View over the grab's buffer instead of a PIL copy
+            pixels = frame_array(screenshot)
             
             # Define a fixed region for the flame results
             # This region should be adjusted based on your game window
@@ -71,19 +106,15 @@ class FlameProcessor:
             region_width = width // 2  # Take 50% of the width
             region_height = height // 3  # Take 33% of the height
             
-            print(f"Using fixed region: x={x}, y={y}, width={region_width}, height={region_height}")
+            logger.debug("Using fixed region: x=%d, y=%d, width=%d, height=%d", x, y, region_width, region_height)
             
-            # Crop the screenshot to the result region
-            result_region = screenshot.crop((x, y, x + region_width, y + region_height))
-            print(f"Cropped region size: {result_region.size}")
+            # Crop the screenshot to the result region, still a view
+            result_region = pixels[y:y + region_height, x:x + region_width]
             
             return result_region
             
-        except Exception as e:
-            print(f"Error capturing result region: {str(e)}")
-            print(f"Window rect: {window_rect}")
-            if 'screenshot' in locals():
-                print(f"Screenshot size: {screenshot.size if screenshot else 'None'}")
+        except Exception:
+            logger.exception("Error capturing result region for %s", window_rect)
             return None
             
     def _preprocess_image(self, image):
@@ -150,26 +181,54 @@ class FlameProcessor:
         return None
         
     def parse_flame_results(self, image):
-        """Parse the flame results from the captured image"""
-        if not image:
+        """Parse the flame results from the captured image (PIL image or BGRA grab array)"""
+        if image is None:
             return None
             
+        # Stages are only copied for rolls the debug sink has open
+        sink = self.debug_sink if self.debug_sink is not None and self.debug_sink.recording else None
+        if sink is not None:
+            sink.record('input', image)
+            
         try:
-            # Preprocess the image
-            processed_image = self._preprocess_image(image)
+            # Try the glyph recognizer first, its text needs no correction
+            with timed(self.timer, 'recognize'):
+                text, confidence = self.glyph_recognizer.recognize(image)
+            source = 'glyph'
             
-            # Use OCR to extract text with better configuration
-            text = pytesseract.image_to_string(
-                processed_image,
-                config='--psm 6 --oem 3'  # Assume uniform block of text, use LSTM
-            )
+            if confidence < self.glyph_recognizer.min_confidence:
+                source = 'tesseract'
+                confidence = None
+                # The Tesseract path works on PIL images
+                if not isinstance(image, Image.Image):
+                    image = to_image(image) if image.ndim == 3 and image.shape[2] == 4 else Image.fromarray(image)
+                
+                # Preprocess the image
+                with timed(self.timer, 'preprocess'):
+                    processed_image = self._preprocess_image(image)
+                if sink is not None:
+                    sink.record('tesseract_input', processed_image)
+                
+                # Use OCR to extract text (--psm 6 --oem 3: uniform block of text, use LSTM)
+                with timed(self.timer, 'tesseract'):
+                    text = self.tesseract_engine.image_to_string(processed_image)
+                
+                # Clean up and correct the text
+                text = self._correct_ocr_text(text)
             
-            # Clean up and correct the text
-            text = self._correct_ocr_text(text)
+            return self._parse_text(text, source, confidence)
+        except Exception as e:
+            # Traceback only with debug logging; a missing Tesseract would repeat it every roll
+            logger.error("OCR error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            return FlameResult(raw_text=f"OCR Error: {str(e)}")
             
+    def _parse_text(self, text, source, confidence):
+        """Parse the recognized text into a FlameResult"""
+        with timed(self.timer, 'parse'):
             # Parse currently owned flames
             currently_owned = None
-            owned_match = re.search(r'Currently owned:\s*([+-]?\d+)', text)
+            # 'l' and 'I' look the same in the game font
+            owned_match = re.search(r'Current[lI]y owned:\s*([+-]?\d+)', text)
             if owned_match:
                 currently_owned = self._parse_number(owned_match.group(1))
                 
@@ -194,17 +253,17 @@ class FlameProcessor:
             # Parse stat values with improved patterns
             stats = {}
             stat_patterns = {
-                'STR': r'STR\s*[+-]?(\d+)',
-                'DEX': r'DEX\s*[+-]?(\d+)',
-                'INT': r'INT\s*[+-]?(\d+)',
-                'LUK': r'LUK\s*[+-]?(\d+)',
-                'WA': r'WA\s*[+-]?(\d+)',
-                'MA': r'MA\s*[+-]?(\d+)',
-                'STATS%': r'All Stats\s*[+-]?(\d+)%',
-                'MaxHP': r'MaxHP\s*[+-]?(\d+)',
-                'MaxMP': r'MaxMP\s*[+-]?(\d+)',
-                'DEF': r'DEF\s*[+-]?(\d+)',
-                'SPEED': r'SPEED\s*[+-]?(\d+)'
+                'STR': r'STR\s*:?\s*[+-]?(\d+)',
+                'DEX': r'DEX\s*:?\s*[+-]?(\d+)',
+                'INT': r'INT\s*:?\s*[+-]?(\d+)',
+                'LUK': r'LUK\s*:?\s*[+-]?(\d+)',
+                'WA': r'WA\s*:?\s*[+-]?(\d+)',
+                'MA': r'MA\s*:?\s*[+-]?(\d+)',
+                'STATS%': r'All Stats\s*:?\s*[+-]?(\d+)%',
+                'MaxHP': r'MaxHP\s*:?\s*[+-]?(\d+)',
+                'MaxMP': r'MaxMP\s*:?\s*[+-]?(\d+)',
+                'DEF': r'DEF\s*:?\s*[+-]?(\d+)',
+                'SPEED': r'SPEED\s*:?\s*[+-]?(\d+)'
             }
             
             for stat, pattern in stat_patterns.items():
@@ -214,21 +273,13 @@ class FlameProcessor:
                     if value is not None:
                         stats[stat] = value
                         
-            return {
-                'currently_owned': currently_owned,
-                'remaining_flames': remaining_flames,
-                'attack_increase': attack_increase,
-                'cp_increase': cp_increase,
-                'stats': stats,
-                'raw_text': text  # Include the raw OCR text for debugging
-            }
-        except Exception as e:
-            print(f"OCR Error: {str(e)}")
-            return {
-                'currently_owned': None,
-                'remaining_flames': None,
-                'attack_increase': None,
-                'cp_increase': None,
-                'stats': {},
-                'raw_text': f"OCR Error: {str(e)}"
-            } 
\ No newline at end of file
+            return FlameResult(
+                stats=stats,
+                attack_increase=attack_increase,
+                cp_increase=cp_increase,
+                currently_owned=currently_owned,
+                remaining_flames=remaining_flames,
+                raw_text=text,  # Include the raw OCR text for debugging
+                source=source,
+                confidence=confidence
+            ) 
\ No newline at end of file
@@ -0,0 +1,64 @@
+from typing import Dict, Optional
+
+
+class FlameResult:
+    """
+    Parsed flame result as returned by the flame processors.
+    Stat values are ints; STATS% holds the All Stats percentage without the sign.
+    source names the recognizer that read the text and confidence is its
+    score (0-1) when it reports one.
+    """
+
+    __slots__ = ('stats', 'attack_increase', 'cp_increase', 'currently_owned', 'remaining_flames', 'raw_text',
+                 'source', 'confidence')
+
+    def __init__(self, stats: Optional[Dict[str, int]] = None, attack_increase: Optional[int] = None,
+                 cp_increase: Optional[int] = None, currently_owned: Optional[int] = None,
+                 remaining_flames: Optional[int] = None, raw_text: str = "", source: Optional[str] = None,
+                 confidence: Optional[float] = None):
+        self.stats = stats if stats is not None else {}
+        self.attack_increase = attack_increase
+        self.cp_increase = cp_increase
+        self.currently_owned = currently_owned
+        self.remaining_flames = remaining_flames
+        self.raw_text = raw_text
+        self.source = source
+        self.confidence = confidence
+
+    def has_stats(self) -> bool:
+        """Whether any stat was read"""
+        return bool(self.stats)
+
+    def meets(self, thresholds: Dict[str, int]) -> bool:
+        """Whether every thresholded stat was read and is at least its threshold"""
+        stats = self.stats
+        for stat, required_value in thresholds.items():
+            value = stats.get(stat)
+            if value is None or value < required_value:
+                return False
+        return True
+
+    def format_display(self) -> str:
+        """Text shown in the results panel and the preview window"""
+        text = "Extracted Stats:\n"
+        for stat, value in self.stats.items():
+            if stat == 'STATS%':
+                text += f"All Stats: {value}%\n"
+            else:
+                text += f"{stat}: {value}\n"
+
+        if self.attack_increase is not None:
+            text += f"Attack Increase: {self.attack_increase}\n"
+        if self.cp_increase is not None:
+            text += f"CP Increase: {self.cp_increase}\n"
+
+        text += f"\nRaw OCR text:\n{self.raw_text}"
+        return text
+
+    def to_dict(self) -> Dict:
+        """Plain dict with the same keys, e.g. for JSON output"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"FlameResult(stats={self.stats}, attack_increase={self.attack_increase}, "
+                f"cp_increase={self.cp_increase})")
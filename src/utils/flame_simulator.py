@@ -0,0 +1,222 @@
+import itertools
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Tier odds per flame type for items that are not boss drops. Boss drop items
+# always get 4 lines and their tiers are 2 higher.
+FLAME_TIERS = {
+    'Powerful Rebirth Flame': {1: 0.20, 2: 0.30, 3: 0.36, 4: 0.14},
+    'Eternal Rebirth Flame': {2: 0.29, 3: 0.45, 4: 0.25, 5: 0.01},
+}
+
+# Names used in older settings files
+FLAME_TYPE_ALIASES = {
+    'Res/Rainbow Flame': 'Eternal Rebirth Flame',
+    'Rainbow Flame': 'Eternal Rebirth Flame',
+    'Red Flame': 'Powerful Rebirth Flame',
+}
+
+DEFAULT_FLAME_TYPE = 'Eternal Rebirth Flame'
+
+# Stats the simulator totals; these are the ones thresholds can be set on
+STATS = ('STR', 'DEX', 'INT', 'LUK', 'STATS%', 'WA', 'MA')
+
+# Flame lines of an armor piece: (name, stat contributions, kind). kind decides
+# how a tier turns into a value: 'single' and 'double' scale with item level,
+# 'flat' is the tier itself and 'attack' a percentage of the weapon's base attack.
+ARMOR_LINES = (
+    ('STR', ('STR',), 'single'),
+    ('DEX', ('DEX',), 'single'),
+    ('INT', ('INT',), 'single'),
+    ('LUK', ('LUK',), 'single'),
+    ('STR+DEX', ('STR', 'DEX'), 'double'),
+    ('STR+INT', ('STR', 'INT'), 'double'),
+    ('STR+LUK', ('STR', 'LUK'), 'double'),
+    ('DEX+INT', ('DEX', 'INT'), 'double'),
+    ('DEX+LUK', ('DEX', 'LUK'), 'double'),
+    ('INT+LUK', ('INT', 'LUK'), 'double'),
+    ('MaxHP', (), 'other'),
+    ('MaxMP', (), 'other'),
+    ('Level Reduction', (), 'other'),
+    ('DEF', (), 'other'),
+    ('WA', ('WA',), 'flat'),
+    ('MA', ('MA',), 'flat'),
+    ('SPEED', (), 'other'),
+    ('Jump', (), 'other'),
+    ('All Stats', ('STATS%',), 'flat'),
+)
+
+# Weapons cannot roll Speed and Jump, can roll boss damage and damage, and
+# their attack lines add a percentage of the weapon's base attack
+WEAPON_LINES = tuple(
+    (name, stats, 'attack' if name in ('WA', 'MA') else kind)
+    for name, stats, kind in ARMOR_LINES if name not in ('SPEED', 'Jump')
+) + (
+    ('Boss Damage', (), 'other'),
+    ('Damage', (), 'other'),
+)
+
+# Percent of the base attack a weapon attack line adds per tier, per
+# (item level // 40 + 1). Index 0 is a missing line.
+WEAPON_ATTACK_PERCENT = (0.0, 1.0, 2.2, 3.63, 5.324, 7.3205, 9.66306, 12.400927)
+
+LINES_PER_ROLL = 4
+
+# Rolls simulated per chunk; keeps the index arrays small
+CHUNK_SIZE = 1_000_000
+
+
+def resolve_flame_type(flame_type: Optional[str]) -> str:
+    """Map a flame type name (or an older alias) to a key of FLAME_TIERS"""
+    if not flame_type:
+        return DEFAULT_FLAME_TYPE
+    flame_type = FLAME_TYPE_ALIASES.get(flame_type, flame_type)
+    if flame_type not in FLAME_TIERS:
+        raise ValueError(f"Unknown flame type {flame_type!r}, expected one of {sorted(FLAME_TIERS)}")
+    return flame_type
+
+
+def rolls_needed_percentile(probability: float, quantile: float) -> Optional[int]:
+    """Rolls needed to succeed with the given chance when each roll succeeds with probability"""
+    if probability <= 0:
+        return None
+    if probability >= 1:
+        return 1
+    return max(1, math.ceil(math.log(1 - quantile) / math.log(1 - probability)))
+
+
+class FlameSimulator:
+    """
+    Vectorized Monte Carlo model of flame rolls for one item. Each roll picks
+    4 distinct lines from the item's pool and a tier per line from the flame
+    type's odds. Every (line set, tier tuple) outcome is tabulated once per
+    stat, so simulating a roll is a random index and a table lookup.
+    """
+
+    def __init__(self, flame_type: Optional[str] = None, item_level: int = 150, boss_item: bool = True,
+                 weapon: bool = False, base_attack: Optional[int] = None, seed: Optional[int] = None):
+        self.flame_type = resolve_flame_type(flame_type)
+        self.item_level = item_level
+        self.boss_item = boss_item
+        self.weapon = weapon
+        # Weapon attack lines depend on it; without it WA and MA cannot be simulated on a weapon
+        self.base_attack = base_attack
+        self.lines = WEAPON_LINES if weapon else ARMOR_LINES
+        self.rng = np.random.default_rng(seed)
+
+        odds = FLAME_TIERS[self.flame_type]
+        shift = 2 if boss_item else 0
+        tiers = np.array([tier + shift for tier in odds], dtype=np.int16)
+        tier_odds = np.array(list(odds.values()), dtype=np.float64)
+        tier_odds /= tier_odds.sum()
+
+        # Per line, what each stat is worth at every tier (tier 0 is a missing line)
+        single = item_level // 20 + 1
+        double = item_level // 40 + 1
+        tier_range = np.arange(int(tiers.max()) + 1)
+        self.values = np.zeros((len(self.lines), len(STATS), len(tier_range)), dtype=np.int32)
+        for row, (_, stats, kind) in enumerate(self.lines):
+            if kind == 'attack':
+                percent = np.array(WEAPON_ATTACK_PERCENT)[tier_range] * double
+                per_tier = np.ceil((base_attack or 0) * percent / 100 - 1e-9).astype(np.int32)
+            else:
+                per_tier = tier_range * {'single': single, 'double': double, 'flat': 1}.get(kind, 0)
+            for stat in stats:
+                self.values[row, STATS.index(stat)] = per_tier
+
+        # Every set of 4 distinct lines is equally likely
+        self.line_sets = np.array(list(itertools.combinations(range(len(self.lines)), LINES_PER_ROLL)),
+                                  dtype=np.int32)
+
+        # Every tuple of line tiers with its probability. Non boss items get
+        # 1 to 4 lines with equal odds, a missing line is tier 0. Line sets are
+        # sorted, so which of the 4 positions are missing must be equally likely.
+        if boss_item:
+            states = tiers
+            state_odds = tier_odds
+        else:
+            states = np.concatenate(([0], tiers)).astype(np.int16)
+            state_odds = np.concatenate(([0.0], tier_odds))
+        codes = np.array(list(itertools.product(range(len(states)), repeat=LINES_PER_ROLL)))
+        self.tier_tuples = states[codes]
+        if boss_item:
+            odds_per_tuple = np.prod(state_odds[codes], axis=1)
+        else:
+            present = (codes > 0).sum(axis=1)
+            tier_odds_per_tuple = np.prod(np.where(codes > 0, state_odds[codes], 1.0), axis=1)
+            patterns = np.array([math.comb(LINES_PER_ROLL, count) for count in range(LINES_PER_ROLL + 1)])
+            odds_per_tuple = np.where(present > 0, tier_odds_per_tuple / LINES_PER_ROLL / patterns[present], 0.0)
+        self.tuple_cdf = np.cumsum(odds_per_tuple)
+        self.tuple_cdf /= self.tuple_cdf[-1]
+
+        # Stat totals per (line set, tier tuple), built per stat on first use
+        self._tables = {}
+
+    def _table(self, stat: str) -> np.ndarray:
+        """Flattened stat total of every (line set, tier tuple) outcome"""
+        if stat not in self._tables:
+            if stat not in STATS:
+                raise ValueError(f"Cannot simulate {stat}, expected one of {STATS}")
+            if self.weapon and stat in ('WA', 'MA') and not self.base_attack:
+                raise ValueError(f"Simulating {stat} on a weapon needs its base attack")
+            per_line = self.values[:, STATS.index(stat)]
+            # Sum the value of each of the 4 lines at its tier, for every line set and tier tuple
+            totals = sum(per_line[self.line_sets[:, position]][:, self.tier_tuples[:, position]]
+                         for position in range(LINES_PER_ROLL))
+            self._tables[stat] = totals.astype(np.int16).ravel()
+        return self._tables[stat]
+
+    def sample_outcomes(self, rolls: int) -> np.ndarray:
+        """Random outcome indices into the stat tables"""
+        line_set = self.rng.integers(0, len(self.line_sets), size=rolls, dtype=np.int64)
+        tier_tuple = np.searchsorted(self.tuple_cdf, self.rng.random(rolls), side='right')
+        np.minimum(tier_tuple, len(self.tuple_cdf) - 1, out=tier_tuple)
+        return line_set * len(self.tuple_cdf) + tier_tuple
+
+    def simulate(self, rolls: int, stats: Sequence[str] = STATS) -> np.ndarray:
+        """Stat totals of `rolls` simulated flames, shape (rolls, len(stats))"""
+        totals = np.empty((rolls, len(stats)), dtype=np.int16)
+        tables = [self._table(stat) for stat in stats]
+        for start in range(0, rolls, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, rolls - start)
+            outcomes = self.sample_outcomes(count)
+            for column, table in enumerate(tables):
+                totals[start:start + count, column] = table[outcomes]
+        return totals
+
+    def count_hits(self, thresholds: Dict[str, int], rolls: int) -> int:
+        """How many of `rolls` simulated flames meet every threshold"""
+        tables = [(self._table(stat), value) for stat, value in thresholds.items()]
+        hits = 0
+        for start in range(0, rolls, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, rolls - start)
+            outcomes = self.sample_outcomes(count)
+            mask = np.ones(count, dtype=bool)
+            for table, value in tables:
+                mask &= table[outcomes] >= value
+            hits += int(mask.sum())
+        return hits
+
+    def estimate(self, thresholds: Dict[str, int], rolls: int = 1_000_000, tries: Optional[int] = None,
+                 quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict:
+        """
+        Estimate how many rolls a threshold set takes.
+        Returns the per-roll success probability with its standard error, the
+        expected and percentile rolls needed, and the chance to succeed within tries.
+        """
+        hits = self.count_hits(thresholds, rolls)
+        probability = hits / rolls
+        estimate = {
+            'flame_type': self.flame_type,
+            'simulated': rolls,
+            'hits': hits,
+            'probability': probability,
+            'std_error': math.sqrt(probability * (1 - probability) / rolls),
+            'expected_rolls': 1 / probability if probability > 0 else None,
+            'rolls_needed': {q: rolls_needed_percentile(probability, q) for q in quantiles},
+        }
+        if tries is not None:
+            estimate['chance_within_tries'] = 1 - (1 - probability) ** tries
+        return estimate
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+from typing import Dict, Optional
+
+from src.backends.base import frame_array
+from src.backends.capture import MssCapture
+
+
+class FrameWatcher:
+    """
+    Polls a screen region with a reused capture handle and detects when its content
+    has changed from a baseline and then settled, so the flame result can be
+    parsed as soon as it is rendered instead of after a fixed delay.
+    """
+
+    def __init__(self, poll_interval: float = 0.02, downsample: int = 4,
+                 change_threshold: float = 6.0, settle_threshold: float = 1.0, settle_frames: int = 3,
+                 capture=None):
+        self.poll_interval = poll_interval
+        self.downsample = downsample
+        # Mean absolute difference (0-765 per pixel) that counts as a change
+        self.change_threshold = change_threshold
+        # Frames closer than this to the previous one count as settled
+        self.settle_threshold = settle_threshold
+        # Consecutive settled frames needed before the result is considered final
+        self.settle_frames = settle_frames
+
+        # CaptureBackend to grab from, mss unless another one is given
+        self.capture = capture if capture is not None else MssCapture()
+        self.last_wait = None
+
+    def grab(self, monitor: Dict):
+        """Grab the region with the shared capture handle"""
+        return self.capture.grab(monitor)
+
+    def signature(self, screenshot) -> np.ndarray:
+        """Cheap downsampled brightness signature of a grab (BGRA)"""
+        pixels = frame_array(screenshot)
+        step = self.downsample
+        sampled = pixels[::step, ::step, :3].astype(np.int16)
+        return sampled.sum(axis=2)
+
+    def snapshot(self, monitor: Dict) -> np.ndarray:
+        """Signature of the region as it is now, used as the baseline"""
+        return self.signature(self.grab(monitor))
+
+    @staticmethod
+    def difference(a: np.ndarray, b: np.ndarray) -> float:
+        """Mean absolute difference between two signatures"""
+        if a.shape != b.shape:
+            return float('inf')
+        return float(np.abs(a - b).mean())
+
+    def wait_for_result(self, monitor: Dict, baseline: np.ndarray, timeout: float):
+        """
+        Poll until the region differs from the baseline and then stays still.
+        Returns the settled screenshot, or None if the timeout was reached.
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        changed = False
+        previous = None
+        stable = 0
+        polls = 0
+
+        while True:
+            screenshot = self.grab(monitor)
+            current = self.signature(screenshot)
+            polls += 1
+
+            if not changed:
+                if self.difference(current, baseline) >= self.change_threshold:
+                    changed = True
+                    stable = 0
+            elif self.difference(current, previous) <= self.settle_threshold:
+                stable += 1
+                if stable >= self.settle_frames:
+                    self.last_wait = {
+                        'elapsed': time.perf_counter() - start,
+                        'polls': polls,
+                        'timed_out': False,
+                        'changed': True,
+                    }
+                    return screenshot
+            else:
+                stable = 0
+            previous = current
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.poll_interval, remaining))
+
+        self.last_wait = {
+            'elapsed': time.perf_counter() - start,
+            'polls': polls,
+            'timed_out': True,
+            'changed': changed,
+        }
+        return None
+
+    def close(self):
+        """Release the capture handle"""
+        self.capture.close()
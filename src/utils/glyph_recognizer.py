@@ -0,0 +1,463 @@
+import os
+import re
+import cv2
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Precomputed glyph atlas shipped with the repo (see src/tools/build_glyph_atlas.py)
+DEFAULT_ATLAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'assets', 'glyph_atlas.npz'
+)
+
+# HSV range of the dark blue result panel the stat lines are drawn on
+PANEL_HSV_LOWER = np.array([100, 120, 20])
+PANEL_HSV_UPPER = np.array([130, 255, 110])
+MIN_PANEL_AREA = 2000
+
+# Any channel above this inside the panel is text (white stats, grey labels, red numbers)
+INK_THRESHOLD = 110
+
+# Lines shorter than this are panel border corners, not text
+MIN_LINE_HEIGHT = 5
+
+# The yellow "Currently owned" counter above the panel (RGB 255, 240, 0)
+OWNED_MIN_RED = 200
+OWNED_MIN_GREEN = 180
+OWNED_MAX_BLUE = 120
+OWNED_PATTERN = re.compile(r'^Currently owned: ?\d+$')
+
+# Fixed canvas every glyph is placed on before correlation
+CANVAS_HEIGHT = 12
+CANVAS_WIDTH = 16
+
+# A column gap at least this wide (in atlas pixels) between glyphs is a space
+SPACE_GAP = 4
+
+# Minimum correlation for a glyph to count as recognized
+DEFAULT_MIN_CONFIDENCE = 0.9
+
+# Glyphs that no labelled crop contains yet, drawn after the game font.
+# 'l' is not listed: it is the same single column as 'I' (see _fix_case)
+DRAWN_GLYPHS = {
+    'A': (
+        "...#...",
+        "..#.#..",
+        "..#.#..",
+        "..#.#..",
+        ".#...#.",
+        ".#####.",
+        ".#...#.",
+        "#.....#",
+        "#.....#",
+    ),
+    'G': (
+        "..###..",
+        ".#...#.",
+        "#.....#",
+        "#......",
+        "#...###",
+        "#.....#",
+        "#.....#",
+        ".#...##",
+        "..###.#",
+    ),
+    'W': (
+        "#.......#",
+        "#.......#",
+        "#...#...#",
+        "#...#...#",
+        ".#.#.#.#.",
+        ".#.#.#.#.",
+        ".#.#.#.#.",
+        "..#...#..",
+        "..#...#..",
+    ),
+    '%': (
+        ".##....#.",
+        "#..#..#..",
+        "#..#..#..",
+        ".##..#...",
+        "....#....",
+        "...#..##.",
+        "..#..#..#",
+        "..#..#..#",
+        ".#....##.",
+    ),
+}
+
+
+def find_result_panel_box(image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Locate the dark blue result panel in an RGB image as (x, y, width, height)"""
+    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    mask = cv2.inRange(hsv, PANEL_HSV_LOWER, PANEL_HSV_UPPER)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    if count < 2:
+        return None
+
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h, area = (int(v) for v in stats[largest])
+    if area < MIN_PANEL_AREA:
+        return None
+    return x, y, w, h
+
+
+def find_result_panel(image: np.ndarray) -> Optional[np.ndarray]:
+    """Locate the dark blue result panel in an RGB image and return its crop"""
+    box = find_result_panel_box(image)
+    if box is None:
+        return None
+    x, y, w, h = box
+    return image[y:y + h, x:x + w]
+
+
+def owned_line_candidates(image: np.ndarray, box: Tuple[int, int, int, int]) -> List[np.ndarray]:
+    """
+    Binarized yellow text lines above the result panel. One of them is the
+    "Currently owned" counter; the others are item icons and header text.
+    """
+    x, y, w, _ = box
+    above = image[:y, x:x + w]
+    ink = ((above[..., 0] > OWNED_MIN_RED) & (above[..., 1] > OWNED_MIN_GREEN) &
+           (above[..., 2] < OWNED_MAX_BLUE))
+    return [ink[top:bottom] for top, bottom in _runs(ink.any(axis=1)) if bottom - top >= MIN_LINE_HEIGHT]
+
+
+def _runs(flags: np.ndarray) -> List[Tuple[int, int]]:
+    """Return (start, end) pairs of consecutive True values"""
+    padded = np.concatenate(([False], flags, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def segment_lines(panel: np.ndarray) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """Binarize the panel and split it into text line row ranges"""
+    ink = panel.max(axis=2) > INK_THRESHOLD
+    lines = [(top, bottom) for top, bottom in _runs(ink.any(axis=1))
+             if bottom - top >= MIN_LINE_HEIGHT]
+    return ink, lines
+
+
+def segment_glyphs(line: np.ndarray) -> List[Tuple[int, int]]:
+    """Split a binarized text line into glyph column ranges"""
+    return _runs(line.any(axis=0))
+
+
+def _fix_case(text: str) -> str:
+    """
+    'I' and 'l' are the same glyph in the game font. An 'I' that follows a
+    letter is an 'l' ("All Stats", "Currently"), unless a lowercase word
+    starts with it ("Increase" when the space before it is narrow).
+    """
+    return re.sub(r'(?<=[A-Za-z])I(?![a-z]{2})', 'l', text) if 'I' in text else text
+
+
+def glyph_canvas(line: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Place a glyph on the fixed size canvas, keeping its position within the line"""
+    canvas = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH), dtype=np.float32)
+    glyph = line[:CANVAS_HEIGHT, start:min(end, start + CANVAS_WIDTH)]
+    canvas[:glyph.shape[0], :glyph.shape[1]] = glyph
+    return canvas
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-norm rows so a dot product is a correlation coefficient"""
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _to_rgb_array(image) -> np.ndarray:
+    """Accept a PIL image, an RGB array or a BGRA grab array"""
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    if image.ndim == 3 and image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
+    return image
+
+
+class GlyphRecognizer:
+    """
+    Reads the flame result panel by matching each glyph against a precomputed
+    atlas of the game font. Much faster than general OCR, but only knows the
+    glyphs in the atlas; callers should fall back to OCR on low confidence.
+    """
+
+    def __init__(self, atlas_path: str = DEFAULT_ATLAS_PATH, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.labels = []
+        self.templates = None
+        self.widths = None
+        self.line_height = None
+
+        if atlas_path and os.path.exists(atlas_path):
+            self.load_atlas(atlas_path)
+
+    def is_available(self) -> bool:
+        """Whether an atlas is loaded"""
+        return self.templates is not None and len(self.labels) > 0
+
+    def load_atlas(self, atlas_path: str):
+        """Load an atlas written by save_atlas"""
+        data = np.load(atlas_path)
+        self.set_atlas(list(data['labels']), data['templates'], int(data['line_height']))
+
+    def set_atlas(self, labels: Sequence[str], templates: np.ndarray, line_height: int):
+        """Install atlas templates (n x CANVAS_HEIGHT x CANVAS_WIDTH)"""
+        self.labels = [str(label) for label in labels]
+        templates = templates.astype(np.float32)
+        self.widths = np.array([int(t.any(axis=0).nonzero()[0].max()) + 1 if t.any() else 0
+                                for t in templates])
+        self.templates = _normalize_rows(templates.reshape(len(templates), -1))
+        self.line_height = line_height
+
+    def recognize(self, image) -> Tuple[str, float]:
+        """
+        Recognize the text lines of the result panel, preceded by the
+        "Currently owned" line when it can be read.
+        Returns (text, confidence); confidence is the worst glyph correlation
+        of the panel lines and is 0.0 when the panel or atlas is unavailable.
+        """
+        if not self.is_available():
+            return "", 0.0
+
+        rgb = _to_rgb_array(image)
+        box = find_result_panel_box(rgb)
+        if box is None:
+            return "", 0.0
+        x, y, w, h = box
+        ink, lines = segment_lines(rgb[y:y + h, x:x + w])
+        if not lines:
+            return "", 0.0
+
+        panel_lines = [ink[top:bottom] for top, bottom in lines]
+        texts, scores = self._match_lines(panel_lines)
+        if not texts:
+            return "", 0.0
+        text = '\n'.join(texts)
+
+        # The owned counter is optional: it never lowers the confidence of the stats
+        scale = self.line_height / float(np.median([bottom - top for top, bottom in lines]))
+        candidates = owned_line_candidates(rgb, box)
+        if candidates:
+            for owned, score in zip(*self._match_lines(candidates, scale)):
+                if score >= self.min_confidence and OWNED_PATTERN.match(owned):
+                    text = owned + '\n' + text
+                    break
+        return text, min(scores)
+
+    def _match_lines(self, lines: List[np.ndarray], scale: Optional[float] = None) -> Tuple[List[str], List[float]]:
+        """
+        Match the glyphs of binarized text lines against the atlas in one
+        product. Lines are brought to the atlas scale, by their own height
+        unless a scale is given. Returns the text and worst score per line;
+        lines without glyphs are left out.
+        """
+        canvases = []
+        widths = []
+        layout = []
+        for line in lines:
+            line_scale = scale if scale is not None else (
+                self.line_height / float(line.shape[0]) if self.line_height else 1.0)
+            if line_scale != 1.0:
+                # Different client scale - bring the line to the atlas scale
+                line = cv2.resize(line.astype(np.uint8), None, fx=line_scale, fy=line_scale,
+                                  interpolation=cv2.INTER_NEAREST).astype(bool)
+            glyphs = segment_glyphs(line)
+            if not glyphs:
+                continue
+            layout.append(glyphs)
+            for start, end in glyphs:
+                canvases.append(glyph_canvas(line, start, end))
+                widths.append(end - start)
+
+        if not canvases:
+            return [], []
+
+        vectors = _normalize_rows(np.stack(canvases).reshape(len(canvases), -1))
+        scores = vectors @ self.templates.T
+
+        # Only compare against templates of about the same width
+        width_gap = np.abs(np.array(widths)[:, None] - self.widths[None, :])
+        scores[width_gap > 1] = -1.0
+
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+
+        text_lines = []
+        line_scores = []
+        index = 0
+        for glyphs in layout:
+            chars = []
+            previous_end = None
+            for start, end in glyphs:
+                char = self.labels[best[index]]
+                # Narrow digits leave wide gaps, so numbers and their '%' are never split
+                if (previous_end is not None and start - previous_end >= SPACE_GAP
+                        and not (chars[-1].isdigit() and (char.isdigit() or char == '%'))):
+                    chars.append(' ')
+                chars.append(char)
+                previous_end = end
+                index += 1
+            text_lines.append(_fix_case(''.join(chars)))
+            line_scores.append(float(best_scores[index - len(glyphs):index].min()))
+        return text_lines, line_scores
+
+    def read(self, image) -> Optional[str]:
+        """Return the recognized text, or None if confidence is too low"""
+        text, confidence = self.recognize(image)
+        if confidence < self.min_confidence:
+            return None
+        return text
+
+
+def _align_segments(widths: List[int], chars: str, known_widths: Dict[str, int],
+                    max_merge: int = 3) -> Optional[List[str]]:
+    """
+    Align glyph segments to the characters of a line. Touching glyphs form a
+    single segment, so each segment may cover up to max_merge characters.
+    Returns the text covered by each segment, or None if no alignment is close.
+    """
+    n, m = len(widths), len(chars)
+    inf = float('inf')
+    cost = [[inf] * (m + 1) for _ in range(n + 1)]
+    back = [[0] * (m + 1) for _ in range(n + 1)]
+    cost[0][0] = 0.0
+
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            for k in range(1, min(max_merge, j) + 1):
+                if cost[i - 1][j - k] == inf:
+                    continue
+                expected = sum(known_widths.get(c, 5) for c in chars[j - k:j])
+                c = cost[i - 1][j - k] + abs(widths[i - 1] - expected) + (k - 1) * 0.5
+                if c < cost[i][j]:
+                    cost[i][j] = c
+                    back[i][j] = k
+
+    if cost[n][m] == inf or cost[n][m] > n:
+        return None
+
+    pieces = []
+    j = m
+    for i in range(n, 0, -1):
+        k = back[i][j]
+        pieces.append(chars[j - k:j])
+        j -= k
+    return pieces[::-1]
+
+
+def label_lines(label: Dict) -> List[str]:
+    """Render a golden label as the lines the result panel shows (spaces omitted)"""
+    lines = []
+    for stat, value in label.get('stats', {}).items():
+        name = 'All Stats' if stat == 'STATS%' else stat
+        suffix = '%' if stat == 'STATS%' else ''
+        lines.append(f"{name}:+{value}{suffix}")
+    if label.get('attack_increase') is not None:
+        lines.append(f"Attack Increase:{label['attack_increase']}")
+    if label.get('cp_increase') is not None:
+        lines.append(f"CP Increase:{label['cp_increase']}")
+    return [line.replace(' ', '') for line in lines]
+
+
+def owned_line(label: Dict) -> Optional[str]:
+    """The "Currently owned" line of a golden label (spaces omitted), if labelled"""
+    if label.get('currently_owned') is None:
+        return None
+    return f"Currentlyowned:{label['currently_owned']}"
+
+
+def drawn_glyph(rows: Sequence[str]) -> np.ndarray:
+    """Canvas for one of DRAWN_GLYPHS"""
+    canvas = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH), dtype=np.float32)
+    for y, row in enumerate(rows):
+        canvas[y, :len(row)] = [char == '#' for char in row]
+    return canvas
+
+
+def build_atlas(samples: Sequence[Tuple[np.ndarray, Dict]]) -> Tuple[List[str], np.ndarray, int]:
+    """
+    Harvest glyph templates from labelled result images.
+    samples are (RGB image, golden label) pairs. Returns (labels, templates, line_height).
+    Glyphs of DRAWN_GLYPHS that no sample contains are added as drawn.
+    """
+    # (line, glyph ranges, expected text) of the panel lines, and the owned counter candidates
+    harvested = []
+    owned = []
+    for image, label in samples:
+        rgb = _to_rgb_array(image)
+        box = find_result_panel_box(rgb)
+        if box is None:
+            continue
+        x, y, w, h = box
+        ink, lines = segment_lines(rgb[y:y + h, x:x + w])
+        expected = label_lines(label)
+        if not expected or len(lines) != len(expected):
+            continue
+        for (top, bottom), chars in zip(lines, expected):
+            line = ink[top:bottom]
+            harvested.append((line, segment_glyphs(line), chars))
+        chars = owned_line(label)
+        if chars:
+            heights = {bottom - top for top, bottom in lines}
+            owned.append((heights, owned_line_candidates(rgb, box), chars))
+
+    if not harvested:
+        return [], np.zeros((0, CANVAS_HEIGHT, CANVAS_WIDTH), dtype=np.float32), 0
+
+    line_height = int(np.median([line.shape[0] for line, _, _ in harvested]))
+    lines = [(line, glyphs, chars) for line, glyphs, chars in harvested if line.shape[0] == line_height]
+
+    # The owned counter has descenders, so it is only used from crops whose panel is at atlas scale
+    for heights, candidates, chars in owned:
+        if heights != {line_height}:
+            continue
+        for line in candidates:
+            glyphs = segment_glyphs(line)
+            if line_height <= line.shape[0] <= line_height + 3 and len(glyphs) == len(chars):
+                lines.append((line, glyphs, chars))
+                break
+
+    # First pass: lines with one segment per character give single glyph widths
+    known_widths = {}
+    for line, glyphs, chars in lines:
+        if len(glyphs) == len(chars):
+            for (start, end), char in zip(glyphs, chars):
+                known_widths.setdefault(char, end - start)
+
+    # Second pass: align every line and accumulate templates per text piece.
+    # Stat lines and the red increase numbers use different weights of the
+    # font, so templates are kept apart by width as well.
+    sums = {}
+    counts = {}
+    for line, glyphs, chars in lines:
+        pieces = _align_segments([end - start for start, end in glyphs], chars, known_widths)
+        if pieces is None:
+            continue
+        for (start, end), piece in zip(glyphs, pieces):
+            key = (piece, end - start)
+            canvas = glyph_canvas(line, start, end)
+            if key in sums:
+                sums[key] += canvas
+                counts[key] = counts[key] + 1
+            else:
+                sums[key] = canvas.copy()
+                counts[key] = 1
+
+    templates = {key: (sums[key] / counts[key] >= 0.5).astype(np.float32) for key in sums}
+    harvested_chars = {piece for piece, _ in templates}
+    for char, rows in DRAWN_GLYPHS.items():
+        if char not in harvested_chars:
+            templates[(char, max(len(row) for row in rows))] = drawn_glyph(rows)
+
+    keys = sorted(templates)
+    return [piece for piece, _ in keys], np.stack([templates[key] for key in keys]), line_height
+
+
+def save_atlas(path: str, labels: Sequence[str], templates: np.ndarray, line_height: int):
+    """Write an atlas produced by build_atlas"""
+    np.savez_compressed(path, labels=np.array(labels), templates=templates.astype(np.uint8),
+                        line_height=np.array(line_height))
@@ -0,0 +1,130 @@
+"""
+Logging for the app. Modules log through `logging.getLogger(__name__)`, so
+everything lives under the 'src' logger. setup_logging() puts a QueueHandler
+on it: the rolling threads only enqueue the record, and a QueueListener thread
+formats it and writes it to the console and to rotating JSON-lines files.
+Arguments are formatted on that thread too, so objects passed to a log call
+should not be changed afterwards.
+
+Messages use %-style arguments (`logger.debug("wait %s", wait)`), so below the
+configured level a call returns after a cached level check without formatting
+anything. Loops that would log per item check `logger.isEnabledFor(DEBUG)` once.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+ROOT_LOGGER = 'src'
+DEFAULT_LOG_DIR = os.path.join('results', 'logs')
+LOG_FILENAME = 'flame.jsonl'
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+# Overrides the configured level, e.g. FLAME_LOG_LEVEL=DEBUG for one session
+LEVEL_ENV = 'FLAME_LOG_LEVEL'
+
+CONSOLE_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with extra= and is written as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_queue_handler = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread instead of the caller"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message, extra fields and the traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def resolve_level(level=None) -> int:
+    """Numeric level from a name or number, with LEVEL_ENV taking precedence"""
+    level = os.environ.get(LEVEL_ENV) or level or DEFAULT_LEVEL
+    if isinstance(level, str):
+        numeric = logging.getLevelName(level.upper())
+        if not isinstance(numeric, int):
+            raise ValueError(f"Unknown log level {level!r}")
+        return numeric
+    return int(level)
+
+
+def setup_logging(options: Optional[Dict] = None) -> logging.handlers.QueueListener:
+    """
+    Configure the 'src' logger from the "logging" section of flame_settings.json:
+    {"level": "INFO", "console": true, "dir": "results/logs", "max_bytes": 5242880, "backups": 5}.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener, _queue_handler
+    options = options or {}
+    shutdown_logging()
+
+    level = resolve_level(options.get('level'))
+    handlers = []
+    if options.get('console', True):
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(CONSOLE_FORMAT, datefmt='%H:%M:%S'))
+        handlers.append(console)
+
+    log_dir = options.get('dir', DEFAULT_LOG_DIR)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, LOG_FILENAME),
+            maxBytes=int(options.get('max_bytes', DEFAULT_MAX_BYTES)),
+            backupCount=int(options.get('backups', DEFAULT_BACKUPS)),
+            encoding='utf-8',
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    # Unbounded, so logging never blocks the roll loop
+    records = queue.SimpleQueue()
+    _queue_handler = DeferredQueueHandler(records)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and detach the handlers set up by setup_logging()"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.removeHandler(_queue_handler)
+    logger.propagate = True
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
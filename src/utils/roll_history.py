@@ -0,0 +1,218 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.utils.flame_result import FlameResult
+
+DEFAULT_DB_PATH = "results/roll_history.db"
+
+# Stats stored in their own columns so they can be filtered and aggregated in SQL
+STAT_COLUMNS = {
+    'STR': 'str',
+    'DEX': 'dex',
+    'INT': 'int',
+    'LUK': 'luk',
+    'WA': 'wa',
+    'MA': 'ma',
+    'STATS%': 'all_stats',
+    'MaxHP': 'max_hp',
+    'MaxMP': 'max_mp',
+    'DEF': 'def',
+    'SPEED': 'speed',
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    item TEXT,
+    settings TEXT,
+    end_reason TEXT
+);
+CREATE TABLE IF NOT EXISTS rolls (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    attempt INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    item TEXT,
+    {', '.join(f'"{column}" INTEGER' for column in STAT_COLUMNS.values())},
+    attack_increase INTEGER,
+    cp_increase INTEGER,
+    currently_owned INTEGER,
+    met INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    confidence REAL,
+    roll_ms REAL,
+    timings TEXT,
+    image_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rolls_session ON rolls(session_id, attempt);
+CREATE INDEX IF NOT EXISTS idx_rolls_item ON rolls(item, timestamp);
+CREATE INDEX IF NOT EXISTS idx_rolls_timestamp ON rolls(timestamp);
+"""
+
+ROLL_COLUMNS = (['session_id', 'attempt', 'timestamp', 'item'] + list(STAT_COLUMNS.values()) +
+                ['attack_increase', 'cp_increase', 'currently_owned', 'met', 'source', 'confidence',
+                 'roll_ms', 'timings', 'image_path'])
+
+# Column names are quoted because some stat names (int, def) are SQL words
+INSERT_ROLL = "INSERT INTO rolls ({}) VALUES ({})".format(
+    ', '.join(f'"{column}"' for column in ROLL_COLUMNS),
+    ', '.join('?' for _ in ROLL_COLUMNS)
+)
+
+
+class RollHistory:
+    """
+    Append-only history of every parsed roll in an SQLite database (WAL mode).
+    Rolls are buffered and written in batches, so recording a roll costs a
+    list append and a commit only happens every batch_size rolls or
+    flush_interval seconds.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, batch_size: int = 50, flush_interval: float = 5.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Rolls are recorded from the engine thread and read from the UI thread
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def start_session(self, item: Optional[str] = None, settings: Optional[Dict] = None) -> int:
+        """Open a farming session and return its id"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO sessions (started_at, item, settings) VALUES (?, ?, ?)",
+                (time.time(), item, json.dumps(settings, default=str) if settings is not None else None)
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def end_session(self, session_id: int, reason: Optional[str] = None):
+        """Write pending rolls and close the session"""
+        with self._lock:
+            self._flush_locked()
+            self.conn.execute("UPDATE sessions SET ended_at = ?, end_reason = ? WHERE id = ?",
+                              (time.time(), reason, session_id))
+            self.conn.commit()
+
+    def record_roll(self, session_id: int, attempt: int, result: Optional[FlameResult],
+                    timings: Optional[Dict[str, float]] = None, met: bool = False,
+                    item: Optional[str] = None, image_path: Optional[str] = None,
+                    timestamp: Optional[float] = None):
+        """Buffer one roll; it is written with the next batch"""
+        result = result or FlameResult()
+        stats = result.stats
+        row = ([session_id, attempt, timestamp if timestamp is not None else time.time(), item] +
+               [stats.get(stat) for stat in STAT_COLUMNS] +
+               [result.attack_increase, result.cp_increase, result.currently_owned, int(bool(met)),
+                result.source, result.confidence,
+                timings.get('roll') if timings else None,
+                json.dumps(timings) if timings else None,
+                image_path])
+
+        with self._lock:
+            self._pending.append(row)
+            if (len(self._pending) >= self.batch_size or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self.conn.executemany(INSERT_ROLL, self._pending)
+            self.conn.commit()
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write every buffered roll"""
+        with self._lock:
+            self._flush_locked()
+
+    def query_rolls(self, session_id: Optional[int] = None, item: Optional[str] = None,
+                    since: Optional[float] = None, until: Optional[float] = None,
+                    limit: Optional[int] = None) -> List[Dict]:
+        """Rolls matching the filters, oldest first, as dicts with the stats regrouped"""
+        clauses = []
+        params = []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if item is not None:
+            clauses.append("item = ?")
+            params.append(item)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        sql = "SELECT * FROM rolls"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        self.flush()
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+
+        rolls = []
+        for row in rows:
+            roll = dict(zip(names, row))
+            roll['stats'] = {stat: roll.pop(column) for stat, column in STAT_COLUMNS.items()
+                             if roll[column] is not None}
+            for column in STAT_COLUMNS.values():
+                roll.pop(column, None)
+            roll['timings'] = json.loads(roll['timings']) if roll['timings'] else None
+            rolls.append(roll)
+        return rolls
+
+    def session_summary(self, session_id: int) -> Dict:
+        """Roll count, pace and best stats of a session"""
+        best = ', '.join(f'MAX("{column}")' for column in STAT_COLUMNS.values())
+        self.flush()
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT COUNT(*), MIN(timestamp), MAX(timestamp), AVG(roll_ms), SUM(met), {best} "
+                f"FROM rolls WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
+        count, first, last, mean_roll_ms, met = row[:5]
+        minutes = (last - first) / 60.0 if count and last > first else 0.0
+        return {
+            'rolls': count,
+            'rolls_per_minute': (count - 1) / minutes if minutes else None,
+            'mean_roll_ms': mean_roll_ms,
+            'met': met or 0,
+            'best': {stat: value for stat, value in zip(STAT_COLUMNS, row[5:]) if value is not None},
+        }
+
+    def close(self):
+        """Write buffered rolls and close the database"""
+        with self._lock:
+            if self.conn is None:
+                return
+            self._flush_locked()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,167 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from src.backends.base import to_image
+
+logger = logging.getLogger(__name__)
+
+# Codec -> file extension
+CODECS = {
+    'png': 'png',   # compress_level 0-9, 1 is fast with most of the size benefit
+    'qoi': 'qoi',   # fast lossless, needs a Pillow version that can write QOI
+    'bmp': 'bmp',   # uncompressed, viewable anywhere
+    'raw': 'npy',   # uncompressed pixel array, reload with numpy.load
+}
+
+# What to do with a screenshot when the writer has fallen behind
+DROP = 'drop'
+BLOCK = 'block'
+
+DEFAULT_BASE_DIR = "results/flames"
+
+
+class ScreenshotArchiver:
+    """
+    Saves roll screenshots on a background writer thread so encoding and disk
+    writes stay off the roll loop. Files go to <base_dir>/<date>/ with names
+    that are unique and increase monotonically within a session.
+    """
+
+    def __init__(self, base_dir: str = DEFAULT_BASE_DIR, codec: str = 'png', compress_level: int = 1,
+                 max_queue: int = 32, policy: str = DROP, prefix: str = 'flame', timer=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {sorted(CODECS)}")
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"Unknown policy {policy!r}, expected '{DROP}' or '{BLOCK}'")
+
+        Image.init()
+        if codec == 'qoi' and 'QOI' not in Image.SAVE:
+            logger.warning("This Pillow version cannot write QOI, archiving as PNG instead")
+            codec = 'png'
+
+        self.base_dir = base_dir
+        self.codec = codec
+        self.compress_level = compress_level
+        self.policy = policy
+        self.prefix = prefix
+        # Optional StageTimer that gets the encode time as the 'save' stage
+        self.timer = timer
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._sequence = itertools.count(1)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.last_error = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict], **kwargs) -> 'ScreenshotArchiver':
+        """Create an archiver from the "archive" section of flame_settings.json"""
+        options = dict(settings or {})
+        options.update(kwargs)
+        return cls(**options)
+
+    def start(self):
+        """Start the writer thread"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name='flame-archiver', daemon=True)
+                self._thread.start()
+
+    def next_path(self) -> str:
+        """Reserve the path of the next screenshot"""
+        now = datetime.now()
+        save_dir = os.path.join(self.base_dir, now.strftime("%Y-%m-%d"))
+        sequence = next(self._sequence)
+        filename = f"{self.prefix}_{now.strftime('%H-%M-%S-%f')[:-3]}_{sequence:06d}.{CODECS[self.codec]}"
+        return os.path.join(save_dir, filename)
+
+    def submit(self, image) -> Optional[str]:
+        """
+        Queue a PIL image, RGB array or BGRA grab array for saving. Arrays are
+        not copied and must not be changed until they are written.
+        Returns the path it will be written to, or None if it was dropped.
+        """
+        self.start()
+        path = self.next_path()
+        item = (path, image)
+        if self.policy == BLOCK:
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return None
+        return path
+
+    def _encode(self, path: str, image):
+        """Write one screenshot with the configured codec"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # BGRA grabs are converted here on the writer thread, not on the roll path
+        grab = isinstance(image, np.ndarray) and image.ndim == 3 and image.shape[2] == 4
+        if self.codec == 'raw':
+            np.save(path, image[..., 2::-1] if grab else np.asarray(image))
+            return
+        if grab:
+            image = to_image(image)
+        elif not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        if self.codec == 'png':
+            image.save(path, format='PNG', compress_level=self.compress_level)
+        else:
+            image.save(path, format=self.codec.upper())
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, image = item
+                start = time.perf_counter()
+                self._encode(path, image)
+                if self.timer is not None:
+                    self.timer.record('save', time.perf_counter() - start, start)
+                self.written += 1
+                self.bytes_written += os.path.getsize(path)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Error archiving screenshot %s: %s", path, e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued screenshot is written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> Dict:
+        """Counters for the status display"""
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize(),
+            'bytes_written': self.bytes_written,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,248 @@
+import re
+from typing import Callable, List, Optional, Tuple
+
+from src.utils.flame_result import FlameResult
+
+# Names usable in an expression (case-insensitive) and where their value comes from.
+# Stats that were not rolled count as 0.
+STAT_NAMES = {
+    'STR': 'STR',
+    'DEX': 'DEX',
+    'INT': 'INT',
+    'LUK': 'LUK',
+    'WA': 'WA',
+    'ATT': 'WA',
+    'MA': 'MA',
+    'MATT': 'MA',
+    'STATS%': 'STATS%',
+    'ALL%': 'STATS%',
+    'ALLSTATS': 'STATS%',
+    'MAXHP': 'MaxHP',
+    'MAXMP': 'MaxMP',
+    'DEF': 'DEF',
+    'SPEED': 'SPEED',
+}
+RESULT_NAMES = {
+    'ATTACK': 'attack_increase',
+    'CP': 'cp_increase',
+}
+
+# Rough stat equivalences per class, usable as score(<class>):
+# 1 attack ~ 4 main stat, 1% all stats ~ 10 main stat, 12 secondary stat ~ 1 main stat
+CLASS_PRESETS = {
+    'warrior': 'STR + DEX / 12 + 4 * WA + 10 * ALL%',
+    'bowman': 'DEX + STR / 12 + 4 * WA + 10 * ALL%',
+    'magician': 'INT + LUK / 12 + 4 * MA + 10 * ALL%',
+    'thief': 'LUK + DEX / 12 + 4 * WA + 10 * ALL%',
+    'pirate': 'STR + DEX / 12 + 4 * WA + 10 * ALL%',
+    'pirate_dex': 'DEX + STR / 12 + 4 * WA + 10 * ALL%',
+}
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*%?)
+      | (?P<op>>=|<=|==|!=|>|<|\+|-|\*|/|\(|\))
+    )""", re.VERBOSE)
+
+KEYWORDS = ('and', 'or', 'not')
+COMPARISONS = ('>=', '<=', '==', '!=', '>', '<')
+
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    """Split an expression into (kind, value, position) tokens"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise ValueError(f"Unexpected character {text[position:].lstrip()[:1]!r} at {position}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value, start))
+        position = match.end()
+    tokens.append(('end', '', len(text)))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser producing nested tuples:
+    ('num', value), ('var', source), ('neg', x), ('arith', op, left, right),
+    ('cmp', op, left, right), ('and', [..]), ('or', [..]), ('not', x)
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self) -> Tuple[str, str, int]:
+        return self.tokens[self.index]
+
+    def take(self) -> Tuple[str, str, int]:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str):
+        kind, found, position = self.take()
+        if found != value or kind == 'end':
+            raise ValueError(f"Expected {value!r} at {position}, found {found or 'end of expression'!r}")
+
+    def accept(self, value: str) -> bool:
+        kind, found, _ = self.peek()
+        if kind in ('op', 'keyword') and found == value:
+            self.index += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.parse_or()
+        kind, value, position = self.peek()
+        if kind != 'end':
+            raise ValueError(f"Unexpected {value!r} at {position}")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.accept('or'):
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.accept('and'):
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_not(self):
+        if self.accept('not'):
+            return ('not', self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_sum()
+        kind, value, _ = self.peek()
+        if kind == 'op' and value in COMPARISONS:
+            self.take()
+            return ('cmp', value, left, self.parse_sum())
+        return left
+
+    def parse_sum(self):
+        node = self.parse_product()
+        while True:
+            kind, value, _ = self.peek()
+            if kind != 'op' or value not in ('+', '-'):
+                return node
+            self.take()
+            node = ('arith', value, node, self.parse_product())
+
+    def parse_product(self):
+        node = self.parse_unary()
+        while True:
+            kind, value, position = self.peek()
+            if kind != 'op' or value not in ('*', '/'):
+                return node
+            self.take()
+            right = self.parse_unary()
+            # Only constant divisors, so evaluating a roll can never divide by zero
+            if value == '/' and (right[0] != 'num' or right[1] == 0):
+                raise ValueError(f"Can only divide by a non-zero number at {position}")
+            node = ('arith', value, node, right)
+
+    def parse_unary(self):
+        if self.accept('-'):
+            return ('neg', self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value, position = self.take()
+        if kind == 'number':
+            return ('num', float(value))
+        if kind == 'name':
+            if value.lower() == 'score' and self.accept('('):
+                return self.parse_score(position)
+            name = value.upper()
+            if name in STAT_NAMES:
+                return ('var', f"stats.get({STAT_NAMES[name]!r}, 0)")
+            if name in RESULT_NAMES:
+                return ('var', f"(result.{RESULT_NAMES[name]} or 0)")
+            raise ValueError(f"Unknown name {value!r} at {position}")
+        if kind == 'op' and value == '(':
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        raise ValueError(f"Unexpected {value or 'end of expression'!r} at {position}")
+
+    def parse_score(self, position: int):
+        kind, preset, _ = self.take()
+        self.expect(')')
+        if kind != 'name' or preset.lower() not in CLASS_PRESETS:
+            raise ValueError(f"Unknown class preset {preset!r} at {position}, expected one of {sorted(CLASS_PRESETS)}")
+        return _Parser(CLASS_PRESETS[preset.lower()]).parse()
+
+
+def _is_bool(node) -> bool:
+    return node[0] in ('cmp', 'and', 'or', 'not')
+
+
+def _generate(node, want_bool: bool) -> str:
+    """Python source for a node, checking booleans and numbers are not mixed up"""
+    kind = node[0]
+    if _is_bool(node) != want_bool:
+        if want_bool:
+            raise ValueError("Expected a condition, e.g. 'STR >= 40' or 'STR + 10 * ALL% >= 120'")
+        raise ValueError("Expected a number but found a condition")
+    if kind == 'num':
+        return repr(node[1])
+    if kind == 'var':
+        return node[1]
+    if kind == 'neg':
+        return f"(-{_generate(node[1], False)})"
+    if kind == 'arith':
+        return f"({_generate(node[2], False)} {node[1]} {_generate(node[3], False)})"
+    if kind == 'cmp':
+        return f"({_generate(node[2], False)} {node[1]} {_generate(node[3], False)})"
+    if kind == 'not':
+        return f"(not {_generate(node[1], True)})"
+    return "(" + f" {kind} ".join(_generate(child, True) for child in node[1]) + ")"
+
+
+def _compile(text: str, want_bool: bool) -> Callable[[FlameResult], object]:
+    if not text or not text.strip():
+        raise ValueError("Empty expression")
+    body = _generate(_Parser(text).parse(), want_bool)
+    source = f"def evaluate(result):\n    stats = result.stats\n    return {body}\n"
+    namespace = {}
+    exec(compile(source, '<stop condition>', 'exec'), {'__builtins__': {}}, namespace)
+    return namespace['evaluate']
+
+
+class StopCondition:
+    """
+    Stop condition written as an expression over a roll's stats, e.g.
+        STR + 10 * ALL% >= 120 or (DEX >= 60 and WA >= 5)
+        score(thief) >= 150
+    The expression is parsed once and compiled to a Python function, so
+    checking a roll is a single function call.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        self._evaluate = _compile(self.expression, want_bool=True)
+
+    def __call__(self, result: Optional[FlameResult]) -> bool:
+        return result is not None and self._evaluate(result)
+
+    def __repr__(self):
+        return f"StopCondition({self.expression!r})"
+
+
+def compile_score(expression: str) -> Callable[[FlameResult], float]:
+    """Compile a numeric expression such as 'score(warrior)' into a function of a FlameResult"""
+    return _compile(expression, want_bool=False)
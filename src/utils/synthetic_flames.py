@@ -0,0 +1,292 @@
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.glyph_recognizer import CANVAS_HEIGHT, DEFAULT_ATLAS_PATH
+
+# Stats in the order the game lists them, with the name shown and the value range rolled
+STAT_LINES = (
+    ('STR', 'STR', (1, 150)),
+    ('DEX', 'DEX', (1, 150)),
+    ('INT', 'INT', (1, 150)),
+    ('LUK', 'LUK', (1, 150)),
+    ('MaxHP', 'MaxHP', (300, 6300)),
+    ('MaxMP', 'MaxMP', (300, 6300)),
+    ('WA', 'WA', (1, 35)),
+    ('MA', 'MA', (1, 35)),
+    ('DEF', 'DEF', (1, 100)),
+    ('SPEED', 'SPEED', (1, 7)),
+    ('STATS%', 'All Stats', (1, 7)),
+)
+
+# Colors sampled from captured result crops (RGB)
+WINDOW_COLOR = (204, 204, 204)
+HEADER_COLOR = (153, 204, 221)
+OWNED_COLOR = (255, 240, 0)
+# Dark band behind the owned counter
+OWNED_BAND_COLOR = (17, 51, 68)
+TITLE_BAR_COLOR = (34, 51, 68)
+# The result panel is dithered between these two blues
+PANEL_COLORS = ((17, 34, 68), (34, 51, 68))
+STAT_COLOR = (255, 255, 255)
+LABEL_COLOR = (153, 153, 153)
+DECREASE_COLOR = (255, 60, 0)
+INCREASE_COLOR = (102, 255, 102)
+
+# Layout of the crop at scale 1, measured on the captured crops
+WINDOW_SIZE = (188, 218)
+PANEL_BOX = (10, 92, 178, 211)
+LINE_PITCH = 14
+FIRST_LINE = 8
+INCREASE_LINES = 92
+TEXT_LEFT = 5
+OWNED_TOP = 40
+FONT_SIZE = 11
+
+# Spacing of the game font: one column between glyphs, digits on a fixed
+# 7 pixel advance, and a space wide enough for GlyphRecognizer to see it
+GLYPH_GAP = 1
+DIGIT_ADVANCE = 7
+SPACE_ADVANCE = 4
+
+
+def random_flame(rng: np.random.Generator, max_lines: int = 4, increases: bool = True) -> Dict:
+    """Random flame result as a label in the labels.json format"""
+    count = int(rng.integers(1, max_lines + 1))
+    picked = sorted(rng.choice(len(STAT_LINES), size=count, replace=False))
+    stats = {}
+    for index in picked:
+        stat, _, (low, high) = STAT_LINES[index]
+        value = int(rng.integers(low, high + 1))
+        # HP and MP roll in steps of 300
+        if stat in ('MaxHP', 'MaxMP'):
+            value = max(300, value // 300 * 300)
+        stats[stat] = value
+
+    label = {
+        'stats': stats,
+        'attack_increase': None,
+        'cp_increase': None,
+        'currently_owned': int(rng.integers(0, 1000)),
+    }
+    if increases:
+        label['attack_increase'] = int(rng.integers(-10_000_000, 10_000_000))
+        label['cp_increase'] = int(rng.integers(-30_000_000, 30_000_000))
+    return label
+
+
+def stat_line_text(stat: str, value: int) -> str:
+    """Stat line as the game writes it, e.g. 'DEX : +42' or 'All Stats : +5%'"""
+    for name, shown, _ in STAT_LINES:
+        if name == stat:
+            break
+    else:
+        shown = stat
+    return f"{shown} : +{value}%" if stat == 'STATS%' else f"{shown} : +{value}"
+
+
+def load_font(font_path: Optional[str] = None, size: int = FONT_SIZE):
+    """The given TrueType font, or Pillow's built-in font"""
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed bitmap font
+        return ImageFont.load_default()
+
+
+class AtlasFont:
+    """
+    The game font as harvested into the glyph atlas. Digits come in the
+    regular weight of the stat lines and the bold weight of the increase
+    numbers; other characters have one template.
+    """
+
+    def __init__(self, atlas_path: str = DEFAULT_ATLAS_PATH):
+        data = np.load(atlas_path)
+        self._masks = {}
+        for label, template in zip(data['labels'], data['templates']):
+            # Touching glyphs harvested as one piece ('Att') are left out
+            if len(str(label)) != 1 or not template.any():
+                continue
+            width = int(template.any(axis=0).nonzero()[0].max()) + 1
+            self._masks.setdefault(str(label), []).append(template[:, :width].astype(np.float32))
+        for masks in self._masks.values():
+            masks.sort(key=lambda mask: mask.shape[1])
+
+    def glyph(self, char: str, bold: bool = False) -> Tuple[np.ndarray, float]:
+        """Coverage mask (0-1) and advance of a character"""
+        if char == ' ':
+            return np.zeros((CANVAS_HEIGHT, 0), dtype=np.float32), SPACE_ADVANCE
+        masks = self._masks.get(char)
+        if masks is None:
+            raise ValueError(f"No glyph for {char!r} in the atlas")
+        mask = masks[-1] if bold else masks[0]
+        if char.isdigit():
+            return mask, DIGIT_ADVANCE
+        return mask, mask.shape[1] + GLYPH_GAP
+
+
+class FlameRenderer:
+    """
+    Renders flame result crops like the ones captured from the game: the
+    owned counter in the header, white stat lines on the dithered blue
+    result panel and the grey/red attack and CP increase lines. Scaling,
+    position jitter and pixel noise make each render a little different.
+
+    Without a font_path the text is drawn with the game font from the glyph
+    atlas, so renders read like captured crops. A TrueType font_path gives
+    unfamiliar text, e.g. to harvest an atlas from renders.
+
+    Text is composed from glyph masks prepared once per character, which is
+    what makes tens of thousands of renders cheap; FreeType only runs the
+    first time a character is seen.
+    """
+
+    def __init__(self, font_path: Optional[str] = None, antialias: bool = False,
+                 atlas_path: str = DEFAULT_ATLAS_PATH):
+        self.atlas_font = AtlasFont(atlas_path) if font_path is None and os.path.exists(atlas_path) else None
+        self.font = load_font(font_path)
+        self.antialias = antialias
+        if self.atlas_font is not None:
+            self.line_height = CANVAS_HEIGHT
+            # Atlas glyphs start at the cap height, TrueType ones leave room above it
+            self.text_offset = 0
+        else:
+            ascent, descent = self.font.getmetrics()
+            self.line_height = ascent + descent
+            self.text_offset = -2
+        self._glyphs = {}
+        # Unit Gaussian noise drawn once; each render adds a random window of it
+        self._noise = None
+
+        # Static parts are drawn once and copied for every render
+        self._background = self._draw_background(load_font(font_path, FONT_SIZE + 1))
+
+    def _draw_background(self, title_font) -> np.ndarray:
+        image = Image.new('RGB', WINDOW_SIZE, WINDOW_COLOR)
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((4, 4, WINDOW_SIZE[0] - 5, 60), fill=HEADER_COLOR)
+        draw.rectangle((PANEL_BOX[0], OWNED_TOP - 3, PANEL_BOX[2], OWNED_TOP + CANVAS_HEIGHT + 1),
+                       fill=OWNED_BAND_COLOR)
+        draw.rectangle((PANEL_BOX[0], PANEL_BOX[1] - 18, PANEL_BOX[2], PANEL_BOX[1] - 2), fill=TITLE_BAR_COLOR)
+        if not self.antialias:
+            draw.fontmode = "1"
+        draw.text((PANEL_BOX[0] + 4, PANEL_BOX[1] - 17), "RESULT", fill=STAT_COLOR, font=title_font)
+
+        # Checkerboard dither of the panel blues
+        left, top, right, bottom = PANEL_BOX
+        ys, xs = np.mgrid[top:bottom, left:right]
+        pixels = np.asarray(image).copy()
+        dither = ((xs + ys) % 2).astype(bool)
+        pixels[top:bottom, left:right] = np.where(dither[..., None], PANEL_COLORS[1], PANEL_COLORS[0])
+        return pixels
+
+    def _glyph(self, char: str, bold: bool = False) -> Tuple[np.ndarray, float]:
+        """Coverage mask (0-1) and advance of a character"""
+        if self.atlas_font is not None:
+            return self.atlas_font.glyph(char, bold)
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            advance = self.font.getlength(char)
+            right = max(self.font.getbbox(char)[2], int(np.ceil(advance)), 1)
+            canvas = Image.new('L', (right, self.line_height), 0)
+            draw = ImageDraw.Draw(canvas)
+            if not self.antialias:
+                draw.fontmode = "1"
+            draw.text((0, 0), char, fill=255, font=self.font)
+            glyph = self._glyphs[char] = (np.asarray(canvas, dtype=np.float32) / 255.0, advance)
+        return glyph
+
+    def _noise_window(self, shape, rng: np.random.Generator) -> np.ndarray:
+        """A random window of the noise bank, grown when a larger render needs it"""
+        height, width = shape[:2]
+        if self._noise is None or self._noise.shape[0] < 2 * height or self._noise.shape[1] < 2 * width:
+            self._noise = rng.standard_normal((2 * height, 2 * width, 3), dtype=np.float32)
+        top = int(rng.integers(0, self._noise.shape[0] - height + 1))
+        left = int(rng.integers(0, self._noise.shape[1] - width + 1))
+        return self._noise[top:top + height, left:left + width]
+
+    def text_width(self, text: str, bold: bool = False) -> float:
+        return sum(self._glyph(char, bold)[1] for char in text)
+
+    def draw_text(self, pixels: np.ndarray, x: float, y: int, text: str, color: Tuple[int, int, int],
+                  bold: bool = False) -> float:
+        """Blend text into an RGB array in place. Returns the x after the text."""
+        height, width = pixels.shape[:2]
+        color = np.array(color, dtype=np.float32)
+        for char in text:
+            mask, advance = self._glyph(char, bold)
+            left = int(round(x))
+            x += advance
+            if char == ' ':
+                continue
+            top = y
+            glyph_height, glyph_width = mask.shape
+            # Clip to the image
+            x0, y0 = max(left, 0), max(top, 0)
+            x1, y1 = min(left + glyph_width, width), min(top + glyph_height, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            alpha = mask[y0 - top:y1 - top, x0 - left:x1 - left, None]
+            region = pixels[y0:y1, x0:x1]
+            region[:] = region * (1.0 - alpha) + color * alpha
+        return x
+
+    def render(self, label: Dict, rng: Optional[np.random.Generator] = None, scale: float = 1.0,
+               jitter: int = 0, noise: float = 0.0) -> Image.Image:
+        """
+        Render a label. jitter moves the whole crop and each line by up to that
+        many pixels, noise is the standard deviation of added pixel noise.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        pixels = self._background.copy()
+
+        def line_offset():
+            return int(rng.integers(-1, 2)) if jitter else 0
+
+        if label.get('currently_owned') is not None:
+            text = f"Currently owned: {label['currently_owned']}"
+            self.draw_text(pixels, (WINDOW_SIZE[0] - self.text_width(text)) // 2, OWNED_TOP, text, OWNED_COLOR)
+
+        left, top = PANEL_BOX[0] + TEXT_LEFT, PANEL_BOX[1]
+        for i, (stat, value) in enumerate(label.get('stats', {}).items()):
+            self.draw_text(pixels, left + line_offset(), top + FIRST_LINE + i * LINE_PITCH + self.text_offset,
+                           stat_line_text(stat, value), STAT_COLOR)
+
+        increases = (('Attack Increase: ', label.get('attack_increase')), ('CP Increase: ', label.get('cp_increase')))
+        for i, (text, value) in enumerate(increases):
+            if value is None:
+                continue
+            y = top + INCREASE_LINES + i * LINE_PITCH + self.text_offset
+            x = self.draw_text(pixels, left + line_offset(), y, text, LABEL_COLOR)
+            # Unlike the stat lines, increases have no plus sign and bold digits
+            self.draw_text(pixels, x, y, str(value), INCREASE_COLOR if value > 0 else DECREASE_COLOR, bold=True)
+
+        if jitter:
+            dx, dy = (int(v) for v in rng.integers(-jitter, jitter + 1, size=2))
+            shifted = np.empty_like(pixels)
+            shifted[:] = WINDOW_COLOR
+            height, width = pixels.shape[:2]
+            shifted[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+                pixels[max(-dy, 0):height - max(dy, 0), max(-dx, 0):width - max(dx, 0)]
+            pixels = shifted
+
+        if scale != 1.0:
+            size = (max(1, round(pixels.shape[1] * scale)), max(1, round(pixels.shape[0] * scale)))
+            pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_LINEAR)
+
+        if noise:
+            pixels = np.clip(pixels + self._noise_window(pixels.shape, rng) * noise, 0, 255).astype(np.uint8)
+        return Image.fromarray(pixels)
+
+    def generate(self, rng: np.random.Generator, scales: Sequence[float] = (1.0,), jitter: int = 0,
+                 noise: float = 0.0, max_lines: int = 4) -> Tuple[Image.Image, Dict]:
+        """Random flame result and its render"""
+        label = random_flame(rng, max_lines=max_lines)
+        scale = float(scales[int(rng.integers(len(scales)))])
+        return self.render(label, rng, scale=scale, jitter=jitter, noise=noise), label
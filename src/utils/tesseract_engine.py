@@ -0,0 +1,192 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# tesserocr keeps Tesseract loaded in-process; it is optional and we fall
+# back to the pytesseract subprocess when it is not installed
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Same settings as the pytesseract call: uniform block of text, default engine (LSTM)
+DEFAULT_PSM = 6
+DEFAULT_OEM = 3
+# Raw buffers carry no resolution. pytesseract's temp PNGs have none either, and
+# Tesseract then assumes 70 DPI, so the same is set explicitly for the same output
+DEFAULT_DPI = 70
+# Seconds between checks for close() while waiting for a free handle
+WAIT_INTERVAL = 0.1
+
+
+class TesseractEngine:
+    """
+    Pool of initialized Tesseract API handles shared for the whole session.
+    Each handle loads the model once; concurrent callers each borrow a handle.
+    """
+
+    def __init__(self, pool_size: int = 2, lang: str = 'eng', psm: int = DEFAULT_PSM,
+                 oem: int = DEFAULT_OEM, dpi: int = DEFAULT_DPI, tessdata_path: Optional[str] = None):
+        self.pool_size = max(1, pool_size)
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+        self.dpi = dpi
+        self.tessdata_path = tessdata_path or self._find_tessdata()
+
+        self._handles = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        # Why warm_up() could not load Tesseract, None if it worked
+        self.error = None
+
+    @staticmethod
+    def _find_tessdata() -> Optional[str]:
+        """Use the tessdata folder next to the configured tesseract executable"""
+        cmd = pytesseract.pytesseract.tesseract_cmd
+        tessdata = os.path.join(os.path.dirname(cmd), 'tessdata') if os.path.dirname(cmd) else None
+        if tessdata and os.path.isdir(tessdata):
+            return tessdata
+        return None
+
+    def is_available(self) -> bool:
+        """Whether the in-process engine can be used"""
+        return tesserocr is not None and not self._closed
+
+    def _create_handle(self):
+        kwargs = {
+            'lang': self.lang,
+            'psm': tesserocr.PSM(self.psm),
+            'oem': tesserocr.OEM(self.oem),
+        }
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    @contextmanager
+    def _acquire(self):
+        """Borrow a handle, creating one if the pool is not full yet"""
+        try:
+            handle = self._handles.get_nowait()
+        except queue.Empty:
+            handle = None
+            with self._lock:
+                if self._created < self.pool_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    handle = self._create_handle()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                handle = self._wait_for_handle()
+        try:
+            yield handle
+        finally:
+            self._release(handle)
+
+    def _wait_for_handle(self):
+        """Block until another caller returns a handle, failing once the pool is closed"""
+        while True:
+            try:
+                return self._handles.get(timeout=WAIT_INTERVAL)
+            except queue.Empty:
+                if self._closed:
+                    raise RuntimeError("Tesseract engine is closed")
+
+    def _release(self, handle):
+        """Put a handle back in the pool, or end it if the pool was closed while it was out"""
+        with self._lock:
+            if not self._closed:
+                self._handles.put(handle)
+                return
+        handle.End()
+
+    def warm_up(self):
+        """Create every handle up front so the first roll does not pay for model loading"""
+        if self._closed:
+            return
+        if tesserocr is None:
+            # The pytesseract fallback needs the tesseract executable
+            try:
+                pytesseract.get_tesseract_version()
+            except Exception as e:
+                self.error = str(e)
+                logger.error("Could not load Tesseract: %s", e)
+            return
+        handles = []
+        try:
+            for _ in range(self.pool_size):
+                with self._lock:
+                    if self._created >= self.pool_size:
+                        break
+                    self._created += 1
+                handles.append(self._create_handle())
+        except Exception as e:
+            with self._lock:
+                self._created -= 1
+            self.error = str(e)
+            logger.error("Could not load Tesseract: %s", e)
+        finally:
+            for handle in handles:
+                self._release(handle)
+
+    def image_to_string(self, image) -> str:
+        """
+        Run OCR on a PIL image or a NumPy array (grayscale, RGB or RGBA).
+        Arrays are handed to Tesseract as raw pixel buffers without encoding.
+        """
+        if not self.is_available():
+            if not isinstance(image, Image.Image):
+                image = Image.fromarray(image)
+            return pytesseract.image_to_string(image, config=f'--psm {self.psm} --oem {self.oem}')
+
+        pixels = np.ascontiguousarray(np.asarray(image), dtype=np.uint8)
+        height, width = pixels.shape[:2]
+        bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+
+        with self._acquire() as api:
+            api.SetImageBytes(pixels.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+            api.SetSourceResolution(self.dpi)
+            text = api.GetUTF8Text()
+            api.Clear()
+        return text
+
+    def close(self):
+        """Release all Tesseract handles. Handles still in use are ended when they are returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                handle = self._handles.get_nowait()
+            except queue.Empty:
+                break
+            handle.End()
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_engine() -> TesseractEngine:
+    """Return the process-wide engine, creating it on first use"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = TesseractEngine()
+        return _shared_engine
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+# Durations kept per stage for the rolling percentiles
+DEFAULT_WINDOW = 200
+# Spans kept for the Chrome trace; the oldest are dropped first
+DEFAULT_TRACE_LIMIT = 50_000
+
+
+class StageTimer:
+    """
+    Records how long each stage of a roll takes. Stages may be timed from
+    several threads; durations are kept per roll and accumulated per stage.
+
+    The last `window` durations of every stage are kept for rolling p50/p95,
+    and every timed span (start, duration, thread) is kept for export as a
+    Chrome trace (chrome://tracing or https://ui.perfetto.dev).
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, trace_limit: int = DEFAULT_TRACE_LIMIT):
+        self._lock = threading.Lock()
+        self.window = window
+        self.current = {}
+        self.totals = {}
+        self.counts = {}
+        self.recent = {}
+        # perf_counter() when each recent roll ended, for rolls per minute
+        self._roll_ends = deque(maxlen=window)
+        # (name, start, seconds, thread id) of every span, start relative to perf_counter()
+        self._spans = deque(maxlen=trace_limit)
+        self._thread_names = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as one stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def record(self, name: str, seconds: float, start: Optional[float] = None):
+        """
+        Add a stage duration to the current roll and the running totals.
+        start (perf_counter) also puts the span in the trace.
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            self.current[name] = self.current.get(name, 0.0) + seconds
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+            recent = self.recent.get(name)
+            if recent is None:
+                recent = self.recent[name] = deque(maxlen=self.window)
+            recent.append(seconds)
+            if start is not None:
+                self._spans.append((name, start, seconds, thread.ident))
+                self._thread_names[thread.ident] = thread.name
+
+    def end_roll(self) -> Dict[str, float]:
+        """Return the stage durations (ms) of the roll that just finished and start a new one"""
+        with self._lock:
+            finished = {name: seconds * 1000.0 for name, seconds in self.current.items()}
+            self.current = {}
+            self._roll_ends.append(time.perf_counter())
+        return finished
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Mean and total duration (ms) per stage"""
+        with self._lock:
+            return {
+                name: {
+                    'count': self.counts[name],
+                    'mean_ms': self.totals[name] * 1000.0 / self.counts[name],
+                    'total_ms': self.totals[name] * 1000.0,
+                }
+                for name in self.totals
+            }
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """p50 and p95 duration (ms) per stage over its last `window` samples"""
+        with self._lock:
+            recent = {name: sorted(samples) for name, samples in self.recent.items()}
+        return {
+            name: {
+                'count': len(samples),
+                'p50_ms': samples[len(samples) // 2] * 1000.0,
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000.0,
+            }
+            for name, samples in recent.items()
+        }
+
+    def rolls_per_minute(self) -> Optional[float]:
+        """Throughput over the recent rolls, None before the second roll"""
+        with self._lock:
+            if len(self._roll_ends) < 2:
+                return None
+            elapsed = self._roll_ends[-1] - self._roll_ends[0]
+            rolls = len(self._roll_ends) - 1
+        return rolls * 60.0 / elapsed if elapsed > 0 else None
+
+    def trace_events(self) -> List[Dict]:
+        """The recorded spans as Chrome trace events (complete events, microseconds)"""
+        with self._lock:
+            spans = list(self._spans)
+            thread_names = dict(self._thread_names)
+        pid = os.getpid()
+        origin = spans[0][1] if spans else 0.0
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in thread_names.items()
+        ]
+        events.extend(
+            {'name': name, 'cat': 'roll', 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': (start - origin) * 1e6, 'dur': seconds * 1e6}
+            for name, start, seconds, tid in spans
+        )
+        return events
+
+    def export_chrome_trace(self, path: str) -> int:
+        """Write the spans as Chrome trace JSON. Returns the number of spans."""
+        events = self.trace_events()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return sum(1 for event in events if event['ph'] == 'X')
+
+    def reset(self):
+        with self._lock:
+            self.current = {}
+            self.totals = {}
+            self.counts = {}
+            self.recent = {}
+            self._roll_ends.clear()
+            self._spans.clear()
+            self._thread_names = {}
+
+
+def timed(timer: Optional[StageTimer], name: str):
+    """timer.stage(name), or a no-op when there is no timer"""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """One line summary of stage durations in ms"""
+    return ', '.join(f"{name} {ms:.0f}ms" for name, ms in timings.items())
@@ -0,0 +1,240 @@
+import logging
+import os
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.backends.capture import MssCapture
+
+logger = logging.getLogger(__name__)
+
+# Dialog templates shipped with the repo
+DEFAULT_ASSETS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'assets'
+)
+
+# UI states and the template that identifies each of them
+STATE_TEMPLATES = {
+    'reroll': 'reroll.png',              # "Use one more time" button of the flame window
+    'confirmation': 'confirmation.png',  # OK / Cancel dialog
+    'result': 'result.png',              # RESULT header of the flame result window
+}
+
+# Template scales tried until the one matching the client resolution is known.
+# 1.0 is the size the assets were captured at.
+DEFAULT_SCALES = (1.0, 0.75, 0.875, 1.25, 1.5, 2.0)
+
+# Normalized correlation needed to count a dialog as visible
+DEFAULT_MATCH_THRESHOLD = 0.8
+
+# Pixels around the last known location that are searched first
+DEFAULT_ROI_MARGIN = 24
+
+# While polling inside a ROI, search the whole client this often in case the dialog moved
+FULL_SEARCH_INTERVAL = 10
+
+
+def to_gray(pixels: np.ndarray) -> np.ndarray:
+    """Convert a BGRA/BGR/gray array to grayscale"""
+    if pixels.ndim == 2:
+        return pixels
+    if pixels.shape[2] == 4:
+        return cv2.cvtColor(pixels, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+
+
+def build_pyramid(template: np.ndarray, scales: Sequence[float]) -> Dict[float, np.ndarray]:
+    """Resize a grayscale template to every scale"""
+    pyramid = {}
+    height, width = template.shape[:2]
+    for scale in scales:
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        pyramid[scale] = template if scale == 1.0 else cv2.resize(template, size, interpolation=interpolation)
+    return pyramid
+
+
+class UIStateDetector:
+    """
+    Detects which flame dialog is on screen by matching the asset templates
+    against the game client. The matching scale is cached per state and client
+    size (each asset was captured on its own), and later searches are restricted to the area around the last hit, so polling
+    for a dialog to appear costs a small grab and a single match.
+    """
+
+    def __init__(self, assets_dir: str = DEFAULT_ASSETS_DIR, scales: Sequence[float] = DEFAULT_SCALES,
+                 threshold: float = DEFAULT_MATCH_THRESHOLD, roi_margin: int = DEFAULT_ROI_MARGIN,
+                 poll_interval: float = 0.02, capture=None):
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self.roi_margin = roi_margin
+        self.poll_interval = poll_interval
+
+        # Grayscale template pyramid per state
+        self.pyramids = {}
+        for state, filename in STATE_TEMPLATES.items():
+            path = os.path.join(assets_dir, filename)
+            template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                logger.warning("UI template not found: %s", path)
+                continue
+            self.pyramids[state] = build_pyramid(template, self.scales)
+
+        # Client rect in screen coordinates (left, top, right, bottom)
+        self.client_rect = None
+        # Scale that matched this client size, per state
+        self.state_scales = {}
+        # Last hit per state, in client coordinates (x, y, w, h)
+        self.last_boxes = {}
+
+        # CaptureBackend to grab from, mss unless another one is given
+        self.capture = capture if capture is not None else MssCapture()
+        self.last_wait = None
+
+    def is_available(self) -> bool:
+        """Whether any template was loaded"""
+        return bool(self.pyramids)
+
+    def set_client_rect(self, client_rect: Tuple[int, int, int, int]):
+        """Set the game client rect; cached scale and locations are dropped when its size changes"""
+        client_rect = tuple(int(v) for v in client_rect)
+        if self.client_rect is not None:
+            old_size = (self.client_rect[2] - self.client_rect[0], self.client_rect[3] - self.client_rect[1])
+            new_size = (client_rect[2] - client_rect[0], client_rect[3] - client_rect[1])
+            if old_size != new_size:
+                self.state_scales = {}
+                self.last_boxes = {}
+        self.client_rect = client_rect
+
+    def _candidate_scales(self, state: str):
+        """The state's cached scale once known, otherwise the whole pyramid"""
+        scale = self.state_scales.get(state)
+        if scale is not None:
+            return (scale,)
+        return self.scales
+
+    def locate(self, state: str, image: np.ndarray) -> Optional[Dict]:
+        """
+        Find a state's template in an image (gray, BGR or BGRA).
+        Returns {'x', 'y', 'w', 'h', 'score', 'scale'} relative to the image, or None.
+        """
+        pyramid = self.pyramids.get(state)
+        if pyramid is None:
+            return None
+
+        gray = to_gray(image)
+        best = None
+        for scale in self._candidate_scales(state):
+            template = pyramid[scale]
+            th, tw = template.shape[:2]
+            if gray.shape[0] < th or gray.shape[1] < tw:
+                continue
+            scores = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (x, y) = cv2.minMaxLoc(scores)
+            if best is None or score > best['score']:
+                best = {'x': x, 'y': y, 'w': tw, 'h': th, 'score': float(score), 'scale': scale}
+
+        if best is None or best['score'] < self.threshold:
+            return None
+        return best
+
+    def _roi(self, state: str) -> Optional[Tuple[int, int, int, int]]:
+        """Search area around the last hit, in client coordinates (x, y, w, h)"""
+        box = self.last_boxes.get(state)
+        if box is None or self.client_rect is None:
+            return None
+        width = self.client_rect[2] - self.client_rect[0]
+        height = self.client_rect[3] - self.client_rect[1]
+        x0 = max(0, box[0] - self.roi_margin)
+        y0 = max(0, box[1] - self.roi_margin)
+        x1 = min(width, box[0] + box[2] + self.roi_margin)
+        y1 = min(height, box[1] + box[3] + self.roi_margin)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def grab(self, monitor: Dict) -> np.ndarray:
+        """Grab a screen region as a BGRA array with the shared capture handle"""
+        return self.capture.grab_array(monitor)
+
+    def detect(self, state: str, full_search: bool = False) -> Optional[Dict]:
+        """
+        Look for a state's dialog in the client. Only the area around the last
+        hit is grabbed unless there is none yet or full_search is set.
+        Returns the match in client coordinates, or None.
+        """
+        if self.client_rect is None or state not in self.pyramids:
+            return None
+
+        left, top, right, bottom = self.client_rect
+        roi = None if full_search else self._roi(state)
+        if roi is None:
+            roi = (0, 0, right - left, bottom - top)
+
+        x0, y0, w, h = roi
+        pixels = self.grab({'left': left + x0, 'top': top + y0, 'width': w, 'height': h})
+        match = self.locate(state, pixels)
+        if match is None:
+            return None
+
+        match['x'] += x0
+        match['y'] += y0
+        self.state_scales[state] = match['scale']
+        self.last_boxes[state] = (match['x'], match['y'], match['w'], match['h'])
+        return match
+
+    def current_state(self) -> Optional[str]:
+        """Best matching state on screen, or None"""
+        best = None
+        for state in self.pyramids:
+            match = self.detect(state, full_search=True)
+            if match is not None and (best is None or match['score'] > best[1]):
+                best = (state, match['score'])
+        return best[0] if best else None
+
+    def _poll(self, state: str, visible: bool, timeout: float) -> Optional[Dict]:
+        start = time.perf_counter()
+        deadline = start + timeout
+        polls = 0
+        match = None
+
+        while True:
+            # Periodically look at the whole client in case the dialog moved
+            full_search = polls > 0 and polls % FULL_SEARCH_INTERVAL == 0
+            match = self.detect(state, full_search=full_search)
+            polls += 1
+            if (match is not None) == visible:
+                self.last_wait = {
+                    'state': state,
+                    'visible': visible,
+                    'elapsed': time.perf_counter() - start,
+                    'polls': polls,
+                    'timed_out': False,
+                }
+                return match if visible else {}
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.poll_interval, remaining))
+
+        self.last_wait = {
+            'state': state,
+            'visible': visible,
+            'elapsed': time.perf_counter() - start,
+            'polls': polls,
+            'timed_out': True,
+        }
+        return None
+
+    def wait_for(self, state: str, timeout: float) -> Optional[Dict]:
+        """Poll until a state's dialog is visible. Returns the match, or None on timeout."""
+        return self._poll(state, True, timeout)
+
+    def wait_until_gone(self, state: str, timeout: float) -> bool:
+        """Poll until a state's dialog is no longer visible. Returns False on timeout."""
+        return self._poll(state, False, timeout) is not None
+
+    def close(self):
+        """Release the capture handle"""
+        self.capture.close()
@@ -0,0 +1,124 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+
+def capture_monitor(client_rect, region: Dict) -> Dict:
+    """mss monitor dict of a region given relative to the client rect"""
+    width = client_rect[2] - client_rect[0]
+    height = client_rect[3] - client_rect[1]
+    left = client_rect[0] + int(region['left'] * width)
+    top = client_rect[1] + int(region['top'] * height)
+    right = client_rect[0] + int(region['right'] * width)
+    bottom = client_rect[1] + int(region['bottom'] * height)
+    return {'left': left, 'top': top, 'width': right - left, 'height': bottom - top}
+
+
+def click_position(client_rect, position: Dict) -> Tuple[int, int]:
+    """Absolute screen position of a point given relative to the client rect"""
+    width = client_rect[2] - client_rect[0]
+    height = client_rect[3] - client_rect[1]
+    return client_rect[0] + int(position['x'] * width), client_rect[1] + int(position['y'] * height)
+
+
+class WindowGeometry:
+    """Handle and screen rectangles of the tracked window"""
+
+    __slots__ = ('handle', 'window', 'client', 'version')
+
+    def __init__(self, handle, window, client, version: int):
+        self.handle = handle
+        self.window = window
+        self.client = client
+        self.version = version
+
+    def to_dict(self) -> Dict:
+        """Same shape as WindowManager.get_window_rect"""
+        return {'window': self.window, 'client': self.client}
+
+
+class RollLayout:
+    """Screen coordinates a roll needs, computed once per geometry change"""
+
+    __slots__ = ('handle', 'client', 'click', 'monitor')
+
+    def __init__(self, handle, client, click: Tuple[int, int], monitor: Dict):
+        self.handle = handle
+        self.client = client
+        self.click = click
+        self.monitor = monitor
+
+
+class WindowTracker:
+    """
+    Caches the game window handle and its client rect. Finding the window
+    (EnumWindows over every top-level window) only happens when the cached
+    handle stops being a window; otherwise each call costs one GetWindowRect
+    to notice the window moved or was resized, and the client rect and roll
+    coordinates are only recomputed when it did.
+    """
+
+    def __init__(self, window_manager, title: str = "MapleStory"):
+        self.window_manager = window_manager
+        self.title = title
+        self._lock = threading.Lock()
+        self._geometry = None
+        self._version = 0
+        self._layouts = {}
+        self.lookups = 0
+
+    def geometry(self) -> Optional[WindowGeometry]:
+        """Current window geometry, or None if the window is not open"""
+        with self._lock:
+            geometry = self._geometry
+            if geometry is not None:
+                window = self.window_manager.get_outer_rect(geometry.handle)
+                if window == geometry.window:
+                    return geometry
+                # Moved or resized keeps the handle, destroyed needs a new lookup
+                return self._refresh_locked(geometry.handle if window is not None else None)
+            return self._refresh_locked(None)
+
+    def handle(self):
+        """Handle of the window, or None"""
+        geometry = self.geometry()
+        return geometry.handle if geometry is not None else None
+
+    def invalidate(self):
+        """Forget the cached window, the next call looks it up again"""
+        with self._lock:
+            self._geometry = None
+            self._layouts = {}
+
+    def _refresh_locked(self, handle) -> Optional[WindowGeometry]:
+        self._geometry = None
+        self._layouts = {}
+        if handle is None:
+            self.lookups += 1
+            handle = self.window_manager.get_window(self.title)
+            if not handle:
+                return None
+
+        rects = self.window_manager.get_window_rect(handle)
+        if not rects or 'client' not in rects:
+            return None
+
+        self._version += 1
+        self._geometry = WindowGeometry(handle, tuple(rects['window']), tuple(rects['client']), self._version)
+        return self._geometry
+
+    def layout(self, position: Dict, region: Dict) -> Optional[RollLayout]:
+        """Click position and capture monitor for the current geometry, or None if the window is gone"""
+        geometry = self.geometry()
+        if geometry is None:
+            return None
+
+        key = (geometry.version, position['x'], position['y'],
+               region['left'], region['top'], region['right'], region['bottom'])
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is None:
+                layout = RollLayout(geometry.handle, geometry.client,
+                                    click_position(geometry.client, position),
+                                    capture_monitor(geometry.client, region))
+                self._layouts = {key: layout}
+        return layout